@@ -3,18 +3,26 @@
 Fetches and saves individual option contracts
 """
 import os
+import numpy as np
 import pandas as pd
 from loguru import logger
-from utils.api_client import init_pool_worker, fetch_reference_option, fetch_redis
-from utils.storage import save_to_redis
-from utils.data_processing import find_reference_target_expiries, get_ATM, get_top_bottom_strikes
+from utils.api_client import fetch_reference_option, fetch_redis, fetch_redis_bulk
+from utils import async_api_client
+from utils.worker_pool import run_tasks, shared_limiter
+from utils.jobs import track, Progress
+from utils.timing import timed_call, timed_call_async, log_slowest, StageClock
+from utils.storage import ChainStreamWriter
+from utils.contract_batch import ContractBatch
+from utils.data_processing import get_top_bottom_strikes, to_day_array, select_atm_contracts
 from config_chain import MAX_THREADS, ATM_TICKER_DIR, DATA_LOCATE, ATM_STRIKE_PRICE_SETTING, TARGETS_DAYS, API_KEY
+from config_chain import FETCH_MODE, ASYNC_CONCURRENCY, RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST
+import asyncio
 import time
+from functools import partial
 from datetime import datetime, timezone, timedelta
 from zoneinfo import ZoneInfo
 import re
 import redis
-from tqdm import tqdm
 from multiprocessing import Pool, get_context
 import multiprocessing as mp
 
@@ -47,53 +55,53 @@ def process_option_contract_data(data, ticker, underlying_price):
         ticker (str): Stock symbol (passed to expiry_dates)
         option type (str): must be 'call' or 'put'
    Returns:
-       tuple: (underlying_price, sorted_expiries, filtered_options) or (None, [], []) on error
+       tuple: (underlying_price, sorted_expiries, ContractBatch) or (None, [], []) on error
    """
     try:
-        expiries_days = find_reference_target_expiries(data, ticker, target_days=TARGETS_DAYS)
         utc_now = datetime.now(timezone.utc)
         edt_time = utc_now.astimezone(ZoneInfo("America/New_York"))
-        filtered_options = []
-        for expiry_date, closest_days in expiries_days:
-            strike_prices = [
-                contract['strike_price']
-                for contract in data
-                if contract['expiration_date'] == expiry_date
-            ]
-            closest_strikes = get_ATM(underlying_price, strike_prices, ATM_STRIKE_PRICE_SETTING)
-            target_strikes = closest_strikes.keys()
-            for contract in data:
-                expiry = contract['expiration_date']
-                strike_price = contract['strike_price']
-                if contract['expiration_date'] == expiry_date and strike_price in target_strikes:
-                    filtered_options.append({
-                        'Date': edt_time.strftime('%Y-%m-%d'),
-                        'Time': edt_time.strftime('%H:%M'),
-                        'Ticker': contract['ticker'],
-                        'Symbol': ticker,
-                        'Type': contract["contract_type"].capitalize(),
-                        'Expiry_X': closest_days,
-                        'SP_Price_X': strike_price,
-                        'ATM_X': closest_strikes[strike_price],
-                        'Expiry_Date': expiry,
-                    })
-        unique_expiries = list(set(pair[0] for pair in expiries_days))
+        date_str, time_str = edt_time.strftime('%Y-%m-%d'), edt_time.strftime('%H:%M')
+        expiries = to_day_array([contract['expiration_date'] for contract in data])
+        strikes = np.array([contract['strike_price'] for contract in data], dtype=float)
+        selections = select_atm_contracts(expiries, strikes, underlying_price, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING,
+                                          symbol=ticker)
+        rows, days, atm_labels = [], [], []
+        for expiry_date, closest_days, indices, labels in selections:
+            rows.extend(data[i] for i in indices.tolist())
+            days.extend([closest_days] * len(labels))
+            atm_labels.extend(labels)
+        filtered_options = ContractBatch(date_str, time_str, {
+            'Ticker': [contract['ticker'] for contract in rows],
+            'Symbol': [ticker] * len(rows),
+            'Type': [contract["contract_type"].capitalize() for contract in rows],
+            'Expiry_X': days,
+            'SP_Price_X': [contract['strike_price'] for contract in rows],
+            'ATM_X': atm_labels,
+            'Expiry_Date': [contract['expiration_date'] for contract in rows],
+        })
+        unique_expiries = list(set(selection[0] for selection in selections))
         return underlying_price, sorted(unique_expiries), filtered_options
     except Exception as e:
         logger.warning(f"Processing failed for {ticker} | Error: {e}")
         return None, [], []
 
 
-def process_ticker(ticker):
+def reference_date_window():
+    today = datetime.utcnow().date()
+    start_date = today + timedelta(days=sorted(TARGETS_DAYS)[0] - 30)  # update this based on
+    end_date = today + timedelta(days=sorted(TARGETS_DAYS)[-1] + 30)  # update this based on
+    return start_date, end_date
+
+
+def process_ticker(ticker, underlying_price=None):
     """Pipeline for Multi Threads - handles both calls and puts"""
     try:
-        today = datetime.utcnow().date()
-        start_date = today + timedelta(days=sorted(TARGETS_DAYS)[0] - 30)  # update this based on
-        end_date = today + timedelta(days=sorted(TARGETS_DAYS)[-1] + 30)  # update this based on
+        start_date, end_date = reference_date_window()
         logger.debug(f"Starting processing for {ticker}")
 
         # Process both call and put options
-        underlying_price = fetch_redis(ticker, attribute="last")
+        if underlying_price is None:
+            underlying_price = fetch_redis(ticker, attribute="last")
         if underlying_price is None:
             raise ValueError(f"Underlying price for {ticker} not found in Redis")
         
@@ -120,7 +128,73 @@ def process_ticker(ticker):
         return [], False, ticker
 
 
-def run_optionchain():
+def process_ticker_wrapper(args):
+    """Helper function to unpack arguments for use with imap_unordered."""
+    return process_ticker(*args)
+
+
+async def process_ticker_async(ticker, underlying_price=None):
+    """Event loop version of process_ticker, used when FETCH_MODE is "async" """
+    try:
+        start_date, end_date = reference_date_window()
+        logger.debug(f"Starting processing for {ticker}")
+
+        if underlying_price is None:
+            underlying_price = await asyncio.to_thread(fetch_redis, ticker, "last")
+        if underlying_price is None:
+            raise ValueError(f"Underlying price for {ticker} not found in Redis")
+
+        top_sp, bottom_sp = get_top_bottom_strikes(underlying_price=underlying_price)
+
+        data = await async_api_client.fetch_reference_option(ticker,
+                                                             top_sp=top_sp,
+                                                             bottom_sp=bottom_sp,
+                                                             start_date=start_date,
+                                                             end_date=end_date)
+        if not data:
+            raise ValueError(f"No data found for {ticker} in the specified date range")
+
+        uprice, expiries, options = process_option_contract_data(data, ticker, underlying_price)
+
+        return options, True, ticker
+
+    except Exception as e:
+        logger.warning(f"Processing failed for {ticker}: {str(e)}")
+        return [], False, ticker
+
+
+async def farm_tickers_async(args_list, limiter=None, job=None, on_result=None):
+    """
+    Run the whole universe on one event loop, at most ASYNC_CONCURRENCY requests in flight.
+
+    Args:
+        on_result: Called with every result as it completes; the returned list is then empty
+    """
+    await async_api_client.init_async_client(API_KEY, ASYNC_CONCURRENCY, limiter)
+    tasks = []
+    try:
+        tasks = [asyncio.create_task(timed_call_async(process_ticker_async, *args)) for args in args_list]
+        progress = Progress(len(tasks), "Processing tickers", job, succeeded=lambda item: item[0][1], limiter=limiter)
+        results = []
+        try:
+            for task in asyncio.as_completed(tasks):
+                item = await task
+                progress.update(item)
+                if on_result is None:
+                    results.append(item)
+                else:
+                    on_result(item)
+        finally:
+            progress.close()
+        return results
+    finally:
+        # a cancelled job or a failing callback leaves tickers running
+        await async_api_client.cancel_pending(tasks)
+        await async_api_client.close_async_client()
+
+
+def run_optionchain(mode=FETCH_MODE, job=None):
+    clock = StageClock("optionchain")
     os.makedirs(ATM_TICKER_DIR, exist_ok=True)
     edt_time = ny_now()
     path_call = csv_path_for_today()
@@ -142,21 +216,46 @@ def run_optionchain():
     except Exception as e:
         logger.warning(f"Error loading tickers: {str(e)}")
 
-    all_options = []
     No_Stock = []
+    # one pipelined Redis round trip for every underlying instead of one connection per worker call
+    clock.lap("load_tickers")
+    prices = fetch_redis_bulk(tickers, attribute="last")
+    args_list = [(ticker, prices.get(ticker)) for ticker in tickers]
+    clock.lap("redis_prices")
     ctx = get_context('spawn')
-    # Multithreading setup
-    with ctx.Pool(processes=MAX_THREADS, initializer=init_pool_worker, initargs=(API_KEY,), ) as pool:
-        
-        results_iterator = pool.imap_unordered(process_ticker, tickers)
+    limiter = shared_limiter(RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST, ctx)
+    ticker_timings = {}
+    # every ticker goes to the CSV and Redis as it finishes, nothing is held until the end
+    writer = ChainStreamWriter(path_call, edt_time)
 
-        for option, result, ticker in tqdm(results_iterator, total=len(tickers), desc="Processing tickers"):
+    def collect(item):
+        nonlocal success_count
+        (option, result, ticker), elapsed = item
+        ticker_timings[ticker] = elapsed
+        if result:
+            success_count += 1
+            writer.put(option)
+        else:
+            No_Stock.append(ticker)
 
-            if result:
-                success_count += 1
-                all_options.extend(option)
-            else:
-                No_Stock.append(ticker)
+    try:
+        if mode == "async":
+            asyncio.run(farm_tickers_async(args_list, limiter, job=job, on_result=collect))
+        else:
+            # Multiprocessing setup, on the warm worker pool when the API started one
+            results_iterator = run_tasks(partial(timed_call, process_ticker_wrapper), args_list,
+                                         processes=MAX_THREADS, limiter=limiter)
+            for item in track(results_iterator, len(tickers), "Processing tickers", job,
+                              succeeded=lambda item: item[0][1], limiter=limiter):
+                collect(item)
+    except BaseException:
+        # keep the rows written so far, then let the error (or cancellation) through
+        rows = writer.close(complete=False)
+        logger.warning(f"Option chain run stopped, {rows} contracts were saved to {path_call}")
+        raise
+    clock.lap("fetch")
+    rows = writer.close()
+    clock.lap("write_flush")
 
     # Single thread setup
     # for t in tqdm(tickers, total=len(tickers), desc="Processing tickers"):
@@ -171,17 +270,15 @@ def run_optionchain():
     total_time = time.time() - start_time
     logger.debug(f"Processing complete: {success_count}/{len(tickers)} succeeded in {total_time / 60:.1f} minutes")
     logger.debug(f"Invalid Stock are {No_Stock}")
+    log_slowest(ticker_timings, total_time)
 
-    if all_options:
-        logger.info(f"Successfully farm {len(all_options)} option contracts.")
-
-        final_df = pd.DataFrame(all_options)
-
-        final_df.to_csv(f"{ATM_TICKER_DIR}/OptionChain_{edt_time.strftime('%Y%m%d')}.csv", index=False)
+    if rows:
+        logger.info(f"Successfully farm {rows} option contracts.")
         logger.success(f"Data saved successfully to /OptionChain_{edt_time.strftime('%Y%m%d')}.csv")
-        save_to_redis(final_df, edt_time)
-        return final_df, path_call, success_count, No_Stock
+        clock.done()
+        return rows, path_call, success_count, No_Stock
     else:
+        os.remove(path_call)
         logger.warning("No data was collected to save.")
 
 def ny_now():
@@ -3,17 +3,25 @@
 Fetches and saves individual option contracts
 """
 import os
+import numpy as np
 import pandas as pd
 from loguru import logger
-from config_contract import TICKER_DIR, ATM_TICKER_DIR, API_KEY, MAX_THREADS
-from utils.api_client import init_pool_worker, fetch_contract_option, fetch_redis
+from config_contract import TICKER_DIR, ATM_TICKER_DIR, API_KEY, MAX_THREADS, FETCH_MODE, ASYNC_CONCURRENCY
+from config_contract import RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST
+from utils.api_client import fetch_contract_option, fetch_redis, fetch_redis_bulk
+from utils import async_api_client
+from utils.worker_pool import run_tasks, shared_limiter
+from utils.jobs import track, Progress
+from utils.timing import timed_call, timed_call_async, log_slowest, StageClock
 from utils.storage import save_single_to_redis, save_contract_option_tickers
-from utils.data_processing import  get_ATM, convert_atm_string_to_number, find_target_expiries
+from utils.data_processing import convert_atm_string_to_number, to_day_array, select_atm_contracts
+from utils.contract_batch import snapshot_batch
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
 import sys
 import time
-from tqdm import tqdm
+import asyncio
+from functools import partial
 from multiprocessing import get_context
 
 # Logger setup
@@ -35,16 +43,16 @@ logger.add(
 )
 
 
-def process_contract_data(data, ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, valid_option_tickers):
+def process_contract_data(data, ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, valid_option_tickers, underlying_price=None):
     """
    Process raw option chain data to extract key information
 
    Args:
-       data (dict): Raw option chain data from Polygon.io
+       data (dict): {'results': [SnapshotContract, ...]} from fetch_contract_option
        ticker (str): Stock symbol (passed to expiry_dates)
 
    Returns:
-       tuple: (underlying_price, sorted_expiries, filtered_options) or (None, [], []) on error
+       tuple: (result, underlying_price, ContractBatch, processed option tickers) or (None, [], [], []) on error
    """
     if 'results' not in data or not data['results']:
         return None, [], [], []
@@ -52,69 +60,42 @@ def process_contract_data(data, ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING,
     try:
         contracts = [
             contract for contract in data['results']
-            if contract.get('details', {}).get('ticker') in valid_option_tickers
+            if contract.ticker in valid_option_tickers
         ]
-        expiries_days = find_target_expiries({'results': contracts}, ticker, target_days=TARGETS_DAYS)
-        underlying_price = fetch_redis(ticker, attribute="last")
+        if underlying_price is None:
+            underlying_price = fetch_redis(ticker, attribute="last")
         utc_now = datetime.now(timezone.utc)
         edt_time = utc_now.astimezone(ZoneInfo("America/New_York"))
-        filtered_options = []
-        for expiry_date, closest_days in expiries_days:
-            strike_prices = [
-                contract['details']['strike_price']
-                for contract in contracts
-                if contract['details']['expiration_date'] == expiry_date
-            ]
-
-            closest_strikes = get_ATM(underlying_price, strike_prices, ATM_STRIKE_PRICE_SETTING)
-            target_strikes = closest_strikes.keys()
-
-            for contract in contracts:
-                details = contract.get('details', {})
-                greeks = contract.get('greeks', {})
-                last_quote = contract.get('last_quote', {})
-                day_data = contract.get('day', {})
-                expiry = details['expiration_date']
-                strike_price = details['strike_price']
-                if details['expiration_date'] == expiry_date and strike_price in target_strikes:
-                    try:
-                        filtered_options.append({
-                            'Date': edt_time.strftime('%Y-%m-%d'),
-                            'Time': edt_time.strftime('%H:%M'),
-                            'Option_Ticker': details.get('ticker'),
-                            'Strike_Price': strike_price,
-                            'Expiry': expiry,
-                            'Contract_Type': str(details.get('contract_type', '')).capitalize(),
-                            'Expiry_X': closest_days,
-                            'ATM_X': closest_strikes.get(strike_price),
-                            'IV': contract.get('implied_volatility'),
-                            'Open_interest': contract.get("open_interest"),
-                            'Delta': greeks.get('delta'),
-                            'Gamma': greeks.get('gamma'),
-                            'Theta': greeks.get('theta'),
-                            'Vega': greeks.get('vega'),
-                            'Bid': last_quote.get('bid'),
-                            'Ask': last_quote.get('ask'),
-                            "Open": day_data.get('open'),
-                            'High': day_data.get('high'),
-                            'Low': day_data.get('low'),
-                            'Close': day_data.get('close'),
-                            'Volume': day_data.get('volume'),
-                            'VWAP': day_data.get('vwap'),
-                        })
-                    except (KeyError, TypeError) as e:
-                        option_ticker_for_log = details.get('ticker', 'UNKNOWN')
-                        logger.warning(
-                            f"Data for {option_ticker_for_log} ({ticker}) is incomplete. Missing field: {e}. Skipping."
-                        )
-        processed_tickers = [opt['Option_Ticker'] for opt in filtered_options]
-        return True, underlying_price, filtered_options, processed_tickers
+        date_str, time_str = edt_time.strftime('%Y-%m-%d'), edt_time.strftime('%H:%M')
+        expiries = to_day_array([contract.expiration_date for contract in contracts])
+        strikes = np.array([contract.strike_price for contract in contracts], dtype=float)
+        picks = []
+        for expiry_date, closest_days, indices, labels in select_atm_contracts(
+                expiries, strikes, underlying_price, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, symbol=ticker):
+            picks.extend((contracts[i], closest_days, atm_label) for i, atm_label in zip(indices.tolist(), labels))
+        options = snapshot_batch(picks, date_str, time_str)
+        return True, underlying_price, options, list(options.columns['Option_Ticker'])
     except Exception as e:
         logger.warning(f"Processing failed for {ticker} | Error: {e}")
         return False, [], [], []
 
 
-def process_ticker(ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, valid_option_tickers):
+def save_ticker_data(data, ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, valid_option_tickers, underlying_price=None):
+    """Process a fetched chain and save the selected contracts"""
+    result, underlying_price, options, processed_tickers = process_contract_data(data, ticker, TARGETS_DAYS,
+                                                                        ATM_STRIKE_PRICE_SETTING,
+                                                                        valid_option_tickers,
+                                                                        underlying_price)
+    # Save results
+    if result:
+        save_contract_option_tickers(ticker=ticker, options=options,DIR=TICKER_DIR)
+        save_single_to_redis(options=options, ticker=ticker)
+        logger.debug(f"Saved call/put options for {ticker}")
+
+    return result, ticker, processed_tickers
+
+
+def process_ticker(ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, valid_option_tickers, underlying_price=None):
     """Pipeline for Multi Threads"""
     try:
         logger.debug(f"Starting processing for {ticker}")
@@ -123,27 +104,59 @@ def process_ticker(ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, valid_option_
             logger.warning(f"No call data for {ticker}")
             return False, ticker, []
 
-        # Process data
-        result, underlying_price, options, processed_tickers = process_contract_data(data, ticker, TARGETS_DAYS,
-                                                                            ATM_STRIKE_PRICE_SETTING,
-                                                                            valid_option_tickers)
-        # Save results
-        if result:
-            save_contract_option_tickers(ticker=ticker, options=options,DIR=TICKER_DIR)
-            save_single_to_redis(options=options, ticker=ticker, DIR=TICKER_DIR)
-            logger.debug(f"Saved call/put options for {ticker}")
-        
-        return result, ticker, processed_tickers
+        return save_ticker_data(data, ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, valid_option_tickers,
+                                underlying_price)
 
     except Exception as e:
         logger.error(f"Processing failed for {ticker}: {str(e)}", exc_info=True)
         return False, ticker, []
-    
+
+
+async def process_ticker_async(ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, valid_option_tickers,
+                               underlying_price=None):
+    """Event loop version of process_ticker; disk and Redis writes run on a helper thread"""
+    try:
+        logger.debug(f"Starting processing for {ticker}")
+        data = await async_api_client.fetch_contract_option(ticker, contract_type=None)
+        if not data or not data.get('results'):
+            logger.warning(f"No call data for {ticker}")
+            return False, ticker, []
+
+        return await asyncio.to_thread(save_ticker_data, data, ticker, TARGETS_DAYS,
+                                       ATM_STRIKE_PRICE_SETTING, valid_option_tickers, underlying_price)
+
+    except Exception as e:
+        logger.error(f"Processing failed for {ticker}: {str(e)}", exc_info=True)
+        return False, ticker, []
+
+
+async def farm_tickers_async(args_list, limiter=None, job=None):
+    """Run the whole universe on one event loop, at most ASYNC_CONCURRENCY requests in flight."""
+    await async_api_client.init_async_client(API_KEY, ASYNC_CONCURRENCY, limiter)
+    tasks = []
+    try:
+        tasks = [asyncio.create_task(timed_call_async(process_ticker_async, *args)) for args in args_list]
+        progress = Progress(len(tasks), "Processing tickers", job, succeeded=lambda item: item[0][0], limiter=limiter)
+        results = []
+        try:
+            for task in asyncio.as_completed(tasks):
+                results.append(await task)
+                progress.update(results[-1])
+        finally:
+            progress.close()
+        return results
+    finally:
+        # a cancelled job or a failing callback leaves tickers running
+        await async_api_client.cancel_pending(tasks)
+        await async_api_client.close_async_client()
+
+
 def process_ticker_wrapper(args):
     """Helper function to unpack arguments for use with imap_unordered."""
     return process_ticker(*args)
 
-def run_optioncontract():
+def run_optioncontract(mode=FETCH_MODE, job=None):
+    clock = StageClock("optioncontract")
     os.makedirs(TICKER_DIR, exist_ok=True)
     start_time = time.time()
     edt_time = ny_now()
@@ -168,20 +181,33 @@ def run_optioncontract():
         logger.error("Please run OptionChainFarmer.py first to generate the input file.")
         sys.exit(1)
 
-    args_list = [(ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, valid_option_tickers) for ticker in tickers]
+    clock.lap("load_chain")
+    prices = fetch_redis_bulk(tickers, attribute="last")
+    args_list = [(ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, valid_option_tickers, prices.get(ticker))
+                 for ticker in tickers]
+    clock.lap("redis_prices")
     No_Stock = []
     found_option_tickers = set()
-    # Multiprocessing setup
     ctx = get_context('spawn')
-    with ctx.Pool(processes=MAX_THREADS, initializer=init_pool_worker, initargs=(API_KEY,), ) as pool:
-        results_iterator = pool.imap_unordered(process_ticker_wrapper, args_list)
-
-        for result, ticker, processed_tickers in tqdm(results_iterator, total=len(tickers), desc="Processing tickers"):
-            if result:
-                success_count += 1
-                found_option_tickers.update(processed_tickers)
-            else:
-                No_Stock.append(ticker)
+    limiter = shared_limiter(RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST, ctx)
+    if mode == "async":
+        results = asyncio.run(farm_tickers_async(args_list, limiter, job=job))
+    else:
+        # Multiprocessing setup, on the warm worker pool when the API started one
+        results_iterator = run_tasks(partial(timed_call, process_ticker_wrapper), args_list,
+                                     processes=MAX_THREADS, limiter=limiter)
+        results = list(track(results_iterator, len(tickers), "Processing tickers", job,
+                             succeeded=lambda item: item[0][0], limiter=limiter))
+
+    clock.lap("fetch_and_write")
+    ticker_timings = {}
+    for (result, ticker, processed_tickers), elapsed in results:
+        ticker_timings[ticker] = elapsed
+        if result:
+            success_count += 1
+            found_option_tickers.update(processed_tickers)
+        else:
+            No_Stock.append(ticker)
 
     # Single Thread setup  
     # for t in tqdm(tickers, total=len(tickers), desc="Processing tickers"):
@@ -203,6 +229,9 @@ def run_optioncontract():
         logger.success("All option tickers from the input file were successfully found and processed.")
     total_time = time.time() - start_time
     logger.debug(f"Processing complete: {success_count}/{len(tickers)} succeeded in {total_time / 60:.1f} minutes")
+    log_slowest(ticker_timings, total_time)
+    clock.lap("summary")
+    clock.done()
     return {
         "tickers_total": len(tickers),
         "success_count": success_count,
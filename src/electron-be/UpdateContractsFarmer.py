@@ -3,21 +3,29 @@
 Update and saves exist individual option contracts
 """
 import os
+import numpy as np
 import pandas as pd
 from loguru import logger
 import time
-from config_contract import TICKER_DIR, ATM_TICKER_DIR, API_KEY
-from utils.api_client import init_pool_worker, fetch_contract_option, fetch_redis
-from utils.storage import save_single_to_redis
-from utils.data_processing import find_target_expiries, get_ATM, convert_atm_string_to_number
+from config_contract import TICKER_DIR, ATM_TICKER_DIR, API_KEY, FETCH_MODE, ASYNC_CONCURRENCY
+from config_contract import RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST, UPDATER_CSV_SNAPSHOTS, UPDATE_SCOPE
+from utils.api_client import fetch_contract_option, fetch_contract_windows, fetch_redis, fetch_redis_bulk
+from utils import async_api_client
+from utils.worker_pool import run_tasks, shared_limiter
+from utils.jobs import track, Progress
+from utils.timing import timed_call, timed_call_async, log_slowest, StageClock
+from utils.metrics import CYCLE_SECONDS, CYCLE_OVERRUNS, TIMEFRAME
+from utils.storage import ContractPublisher
+from utils.history_store import append_snapshot, cycle_timestamp
+from utils.contract_batch import snapshot_batch, batches_frame
+from utils.data_processing import convert_atm_string_to_number, to_day_array, select_atm_contracts
+from utils.data_processing import chain_windows, window_partitions
 from utils.config import load_timeframe
+from utils.scheduler import UpdateScheduler, past_deadline
 from datetime import datetime, timezone
 from zoneinfo import ZoneInfo
-import sys
-# import asyncio
-# import aiohttp
-# from tqdm.asyncio import tqdm_asyncio
-from tqdm import tqdm
+import asyncio
+from functools import partial
 from multiprocessing import Pool, get_context
 from OptionChainFarmer import csv_path_for_today
 from concurrent.futures import ThreadPoolExecutor, as_completed
@@ -41,105 +49,234 @@ logger.add(
 )
 
 
-def process_update_contract_data(data, ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING):
+def process_update_contract_data(data, ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, underlying_price=None):
     """
    Process raw option chain data to extract key information
 
    Args:
-       data (dict): Raw option chain data from Polygon.io
+       data (dict): {'results': [SnapshotContract, ...]} from fetch_contract_option
        ticker (str): Stock symbol (passed to expiry_dates)
 
    Returns:
-       tuple: (underlying_price, sorted_expiries, filtered_options) or (None, [], []) on error
+       tuple: (result, underlying_price, ContractBatch) or (None, [], []) on error
    """
     if 'results' not in data or not data['results']:
         return None, [], []
 
     try:
-        expiries_days = find_target_expiries(data, ticker, target_days=TARGETS_DAYS)
-        underlying_price = fetch_redis(ticker, attribute='last')
+        contracts = data['results']
+        if underlying_price is None:
+            underlying_price = fetch_redis(ticker, attribute='last')
         utc_now = datetime.now(timezone.utc)
         edt_time = utc_now.astimezone(ZoneInfo("America/New_York"))
-        filtered_options = []
-        for expiry_date, closest_days in expiries_days:
-            strike_prices = [
-                contract['details']['strike_price']
-                for contract in data['results']
-                if contract['details']['expiration_date'] == expiry_date
-            ]
-
-            closest_strikes = get_ATM(underlying_price, strike_prices, ATM_STRIKE_PRICE_SETTING)
-            target_strikes = closest_strikes.keys()
-
-            for contract in data['results']:
-                details = contract.get('details', {})
-                greeks = contract.get('greeks', {})
-                last_quote = contract.get('last_quote', {})
-                day_data = contract.get('day', {})
-                
-                expiry = details['expiration_date']
-                strike_price = details['strike_price']
-                if details['expiration_date'] == expiry_date and strike_price in target_strikes:
-                    try:
-                        filtered_options.append({
-                            'Date': edt_time.strftime('%Y-%m-%d'),
-                            'Time': edt_time.strftime('%H:%M'),
-                            'Option_Ticker': details.get('ticker'),
-                            'Strike_Price': strike_price,
-                            'Expiry': expiry,
-                            'Contract_Type': str(details.get('contract_type', '')).capitalize(),
-                            'Expiry_X': closest_days,
-                            'ATM_X': closest_strikes.get(strike_price),
-                            'IV': contract.get('implied_volatility'),
-                            'Open_interest': contract.get("open_interest"),
-                            'Delta': greeks.get('delta'),
-                            'Gamma': greeks.get('gamma'),
-                            'Theta': greeks.get('theta'),
-                            'Vega': greeks.get('vega'),
-                            'Bid': last_quote.get('bid'),
-                            'Ask': last_quote.get('ask'),
-                            "Open": day_data.get('open'),
-                            'High': day_data.get('high'),
-                            'Low': day_data.get('low'),
-                            'Close': day_data.get('close'),
-                            'Volume': day_data.get('volume'),
-                            'VWAP': day_data.get('vwap'),
-                        })
-                    except (KeyError, TypeError) as e:
-                        option_ticker_for_log = details.get('ticker', 'UNKNOWN')
-                        logger.warning(
-                            f"Data for {option_ticker_for_log} ({ticker}) is incomplete. Missing field: {e}. Skipping."
-                        )
-        return True, underlying_price, filtered_options
+        date_str, time_str = edt_time.strftime('%Y-%m-%d'), edt_time.strftime('%H:%M')
+        expiries = to_day_array([contract.expiration_date for contract in contracts])
+        strikes = np.array([contract.strike_price for contract in contracts], dtype=float)
+        picks = []
+        for expiry_date, closest_days, indices, labels in select_atm_contracts(
+                expiries, strikes, underlying_price, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, symbol=ticker):
+            picks.extend((contracts[i], closest_days, atm_label) for i, atm_label in zip(indices.tolist(), labels))
+        return True, underlying_price, snapshot_batch(picks, date_str, time_str)
     except Exception as e:
         logger.warning(f"Processing failed for {ticker} | Error: {e}")
         return False, [], []
 
-def update_metrics_for_ticker(ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING):
+def collect_update_data(data, ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, underlying_price=None):
+    """Process a fetched chain; run_updatecontract publishes the cycle's changes to Redis"""
+    result, underlying_price, options = process_update_contract_data(data, ticker, TARGETS_DAYS,
+                                                                     ATM_STRIKE_PRICE_SETTING, underlying_price)
+    return options, result, ticker
+
+
+def process_window_update_data(data, ticker, windows, ATM_STRIKE_PRICE_SETTING, underlying_price=None):
+    """
+    Process the windowed snapshots of one symbol (UPDATE_SCOPE "chain").
+
+    Windows the underlying stayed inside keep the morning ATM labels; only the ones whose
+    ATM strike changed are re-selected from the fetched strike range.
+
+    Args:
+        data (dict): {'results': [...]} from fetch_contract_windows
+        ticker (str): Stock symbol
+        windows (list): ChainWindows of the symbol
+
+    Returns:
+        tuple: (result, underlying_price, ContractBatch)
+    """
+    if 'results' not in data or not data['results']:
+        return None, [], []
+
+    try:
+        by_expiry = {}
+        for contract in data['results']:
+            by_expiry.setdefault(contract.expiration_date, []).append(contract)
+        utc_now = datetime.now(timezone.utc)
+        edt_time = utc_now.astimezone(ZoneInfo("America/New_York"))
+        date_str, time_str = edt_time.strftime('%Y-%m-%d'), edt_time.strftime('%H:%M')
+        picks = []
+        recomputed = 0
+        for window in windows:
+            group = by_expiry.get(window.expiry, [])
+            if window.moved(underlying_price):
+                recomputed += 1
+                expiries = to_day_array([contract.expiration_date for contract in group])
+                strikes = np.array([contract.strike_price for contract in group], dtype=float)
+                picks.extend((group[i], window.target, atm_label)
+                             for _, _, indices, labels in select_atm_contracts(
+                                 expiries, strikes, underlying_price, [window.target], ATM_STRIKE_PRICE_SETTING)
+                             for i, atm_label in zip(indices.tolist(), labels))
+            else:
+                picks.extend((contract, window.target, window.labels[contract.strike_price]) for contract in group
+                             if contract.strike_price in window.labels)
+        if recomputed:
+            logger.debug(f"{ticker}: ATM window recomputed for {recomputed}/{len(windows)} expiries")
+        return True, underlying_price, snapshot_batch(picks, date_str, time_str)
+    except Exception as e:
+        logger.warning(f"Processing failed for {ticker} | Error: {e}")
+        return False, [], []
+
+
+def collect_window_update_data(data, ticker, windows, ATM_STRIKE_PRICE_SETTING, underlying_price=None):
+    """Process windowed snapshots; run_updatecontract publishes the cycle's changes to Redis"""
+    result, underlying_price, options = process_window_update_data(data, ticker, windows,
+                                                                   ATM_STRIKE_PRICE_SETTING, underlying_price)
+    return options, result, ticker
+
+
+def update_windows_for_ticker(ticker, windows, ATM_STRIKE_PRICE_SETTING, underlying_price=None, deadline=None):
+    """Refresh only the morning chain contracts of one symbol"""
+    if past_deadline(deadline):
+        return [], None, ticker  # carried over to the next cycle
+    try:
+        if underlying_price is None:
+            underlying_price = fetch_redis(ticker, attribute='last')
+        partitions = window_partitions(windows, underlying_price, ATM_STRIKE_PRICE_SETTING)
+        data = fetch_contract_windows(ticker, partitions)
+        if not data or not data.get('results'):
+            logger.warning(f"No data for {ticker}")
+            return [], False, ticker
+        return collect_window_update_data(data, ticker, windows, ATM_STRIKE_PRICE_SETTING, underlying_price)
+    except Exception as e:
+        logger.warning(f"Error Update contract for {ticker}: {str(e)}")
+        return [], False, ticker
+
+
+async def update_windows_for_ticker_async(ticker, windows, ATM_STRIKE_PRICE_SETTING, underlying_price=None, deadline=None):
+    """Event loop version of update_windows_for_ticker"""
+    if past_deadline(deadline):
+        return [], None, ticker  # carried over to the next cycle
+    try:
+        if underlying_price is None:
+            underlying_price = await asyncio.to_thread(fetch_redis, ticker, 'last')
+        partitions = window_partitions(windows, underlying_price, ATM_STRIKE_PRICE_SETTING)
+        data = await async_api_client.fetch_contract_windows(ticker, partitions)
+        if not data or not data.get('results'):
+            logger.warning(f"No data for {ticker}")
+            return [], False, ticker
+        return await asyncio.to_thread(collect_window_update_data, data, ticker, windows, ATM_STRIKE_PRICE_SETTING,
+                                       underlying_price)
+    except Exception as e:
+        logger.warning(f"Error Update contract for {ticker}: {str(e)}")
+        return [], False, ticker
+
+
+def update_metrics_for_ticker(ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, underlying_price=None, deadline=None):
+    if past_deadline(deadline):
+        return [], None, ticker  # carried over to the next cycle
     try:
         data = fetch_contract_option(ticker, contract_type=None)
         if not data or not data.get('results'):
             logger.warning(f"No data for {ticker}")
             return [], False, ticker
-        result, underlying_price, options = process_update_contract_data(data, ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING)
-        
-        # Save results to Redis
-        if result:
-            save_single_to_redis(options=options, ticker=ticker, DIR=TICKER_DIR)
-            
-        return options, result, ticker
+        return collect_update_data(data, ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, underlying_price)
     except Exception as e:
         logger.warning(f"Error Update contract for {ticker}: {str(e)}")
         return [], False, ticker
-    
+
+
+async def update_metrics_for_ticker_async(ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, underlying_price=None, deadline=None):
+    """Event loop version of update_metrics_for_ticker; processing the chain runs on a helper thread"""
+    if past_deadline(deadline):
+        return [], None, ticker  # carried over to the next cycle
+    try:
+        data = await async_api_client.fetch_contract_option(ticker, contract_type=None)
+        if not data or not data.get('results'):
+            logger.warning(f"No data for {ticker}")
+            return [], False, ticker
+        return await asyncio.to_thread(collect_update_data, data, ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING,
+                                       underlying_price)
+    except Exception as e:
+        logger.warning(f"Error Update contract for {ticker}: {str(e)}")
+        return [], False, ticker
+
+
+async def farm_tickers_async(args_list, limiter=None, worker=update_metrics_for_ticker_async, job=None,
+                             deadline=None):
+    """
+    Run the whole universe on one event loop, at most ASYNC_CONCURRENCY requests in flight.
+
+    Tickers still running at the deadline are cancelled and returned as not
+    started, ([], None, ticker), like the pool workers skip them.
+    """
+    await async_api_client.init_async_client(API_KEY, ASYNC_CONCURRENCY, limiter)
+    tasks = {}
+    try:
+        tasks = {asyncio.create_task(timed_call_async(worker, *args)): args[0] for args in args_list}
+        progress = Progress(len(tasks), "Processing tickers", job, succeeded=lambda item: item[0][1], limiter=limiter)
+        results = []
+        timeout = None if deadline is None else max(0.0, deadline - time.time())
+        try:
+            for task in asyncio.as_completed(tasks, timeout=timeout):
+                results.append(await task)
+                progress.update(results[-1])
+        except asyncio.TimeoutError:
+            finished = {ticker for (_, _, ticker), _ in results}
+            late = [task for task, ticker in tasks.items() if ticker not in finished]
+            for task in late:
+                if task.done() and not task.cancelled() and task.exception() is None:
+                    results.append(task.result())
+                else:
+                    task.cancel()
+                    results.append((([], None, tasks[task]), 0.0))
+            await asyncio.gather(*late, return_exceptions=True)
+        finally:
+            progress.close()
+        return results
+    finally:
+        # a cancelled job or a failing callback leaves tickers running
+        await async_api_client.cancel_pending(tasks)
+        await async_api_client.close_async_client()
+
+
+# Last state written to the Redis contract hashes, kept across the cycles of this process
+PUBLISHER = ContractPublisher()
+
+
 def process_ticker_wrapper(args):
     """Helper function to unpack arguments for use with imap_unordered."""
     return update_metrics_for_ticker(*args)
 
-def run_updatecontract():
-    
+
+def process_windows_wrapper(args):
+    """imap_unordered helper for the UPDATE_SCOPE "chain" workers."""
+    return update_windows_for_ticker(*args)
+
+def run_updatecontract(mode=FETCH_MODE, scope=UPDATE_SCOPE, job=None, publisher=None, deadline=None, scheduler=None):
+    """
+    Run one updater cycle over the symbols of today's OptionChain CSV.
+
+    Args:
+        deadline (float): time.time() after which symbols are no longer started (run_update_loop)
+        scheduler (UpdateScheduler): Orders the symbols and books their results across cycles
+
+    Returns:
+        tuple: (DataFrame of the updated contracts, cycle timestamp), or (None, None) when nothing was collected
+
+    Raises:
+        FileNotFoundError: Today's OptionChain CSV does not exist yet
+    """
+    clock = StageClock("updatecontract")
     os.makedirs(TICKER_DIR, exist_ok=True)
-    edt_time = ny_now()
     filename = csv_path_for_today()
     output_dir = os.path.join(TICKER_DIR, "Updater")
     os.makedirs(output_dir, exist_ok=True)
@@ -155,87 +292,144 @@ def run_updatecontract():
         ATM_STRIKE_PRICE_SETTING = df['ATM_X_Numeric'].abs().max()
         
         total = len(tickers)
-        success_count = 0
-    except FileNotFoundError:
+    except FileNotFoundError as e:
         logger.error(f"Error: The file was not found at {filename}")
         logger.error("Please run OptionChainFarmer.py first to generate the input file.")
-        sys.exit(1)
+        raise FileNotFoundError(f"{filename} not found, run the option chain first") from e
+    if scheduler is not None:
+        tickers = scheduler.order(tickers)
     success_count = 0
-    counter = 1
-    completed = 1
-    args_list = [(ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING) for ticker in tickers]
+    completed = 0
+    batches = []
+    start = time.time()
+    logger.info(f"Starting update cycle for {total} symbols")
+    # one pipelined Redis round trip for every underlying instead of one connection per worker call
+    clock.lap("load_chain")
+    prices = fetch_redis_bulk(tickers, attribute="last")
+    clock.lap("redis_prices")
+    if scope == "chain":
+        # only the morning OptionChain contracts, one filtered snapshot per expiry
+        windows = chain_windows(df)
+        args_list = [(ticker, windows[ticker], ATM_STRIKE_PRICE_SETTING, prices.get(ticker), deadline)
+                     for ticker in tickers]
+        async_worker, pool_worker = update_windows_for_ticker_async, process_windows_wrapper
+    else:
+        args_list = [(ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, prices.get(ticker), deadline)
+                     for ticker in tickers]
+        async_worker, pool_worker = update_metrics_for_ticker_async, process_ticker_wrapper
+    ctx = get_context('spawn')
+    limiter = shared_limiter(RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST, ctx)
+    if mode == "async":
+        results = asyncio.run(farm_tickers_async(args_list, limiter, async_worker, job=job, deadline=deadline))
+    else:
+        # Multiprocessing setup, on the warm worker pool when the API started one
+        results_iterator = run_tasks(partial(timed_call, pool_worker), args_list,
+                                     processes=os.cpu_count(), limiter=limiter)
+        results = list(track(results_iterator, len(tickers), "Processing tickers", job,
+                             succeeded=lambda item: item[0][1], limiter=limiter))
 
-    frame = load_timeframe()  # in minutes, dynamic
-    if counter >= frame:
-        all_options = []
-        start = time.time()
-        logger.info(f"Starting update cycle (every {frame} min)")
-        print("START UPDATE!!!")
-        utc_now = datetime.now(timezone.utc)
-        edt_time = utc_now.astimezone(ZoneInfo("America/New_York"))
-        success_count = 0
-        # Multiprocessing setup
-        ctx = get_context('spawn')
-        with ctx.Pool(processes=os.cpu_count(), initializer=init_pool_worker, initargs=(API_KEY,), ) as pool:
-            results_iterator = pool.imap_unordered(process_ticker_wrapper, args_list)
+    clock.lap("fetch")
+    ticker_timings = {}
+    for (option, result, ticker), elapsed in results:
+        # result None: not started before the deadline
+        ticker_timings[ticker] = None if result is None else elapsed
+        completed += 1
 
-            for option, result, ticker in tqdm(results_iterator, total=len(tickers), desc="Processing tickers"):
+        if result:
+            success_count += 1
+            batches.append((ticker, option))
 
-                if result:
-                    success_count += 1
-                    completed += 1
-                    all_options.extend(option)
+        if completed % 10 == 0:
+            logger.debug(f"Progress: {completed}/{total} tickers ({success_count} successful)")
+    if scheduler is not None:
+        scheduler.record(ticker_timings)
 
+    # Single Thread setup
+    # for ticker in tqdm(tickers, total=total, desc="Processing tickers"):
+    #     option, result, _ = update_metrics_for_ticker(ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING)
 
-                if completed % 10 == 0:
-                    logger.debug(f"Progress: {completed}/{total} tickers ({success_count} successful)")
-        
-        # Single Thread setup
-        # for ticker in tqdm(tickers, total=total, desc="Processing tickers"):
-        #     option, result, _ = update_metrics_for_ticker(ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING)
-
-        #     if result:
-        #         success_count += 1
-        #         completed += 1
-        #         all_options.extend(option)
-
-        #     if completed % 10 == 0:
-        #         logger.debug(f"Progress: {completed}/{total} tickers ({success_count} successful)")
-        total_time = time.time() - start
-        logger.debug(f"Processing complete: {success_count}/{total} succeeded in {total_time / 60:.1f} minutes")
-        
-        counter = 0
-        success_count = 0   
-        completed = 0
-        path = csv_updater_path_for_today()
-        if all_options:
-            logger.info(f"Successfully Update {len(all_options)} option contracts.")
-
-            df = pd.DataFrame(all_options)
-            df.to_csv(path,
-                      index=False)
-            logger.success(
-                f"Data saved successfully to {TICKER_DIR}/Updater/OptionContracts_{edt_time.strftime('%Y%m%d')}_{edt_time.strftime('%H%M')}.csv")
-            return df, path
-        else:
-            logger.warning("No data was collected to save.")
-            return None, None
+    #     if result:
+    #         success_count += 1
+    #         completed += 1
+    #         all_options.extend(option)
+
+    #     if completed % 10 == 0:
+    #         logger.debug(f"Progress: {completed}/{total} tickers ({success_count} successful)")
+    total_time = time.time() - start
+    logger.debug(f"Processing complete: {success_count}/{total} succeeded in {total_time / 60:.1f} minutes")
+    log_slowest({t: e for t, e in ticker_timings.items() if e is not None}, total_time)
+
+    df = batches_frame([batch for _, batch in batches])
+    if len(df):
+        logger.info(f"Successfully Update {len(df)} option contracts.")
+
+        clock.lap("frame")
+        cycle_ts = append_snapshot(df, cycle_timestamp())
+        clock.lap("history")
+        logger.success(f"Cycle {cycle_ts} appended to the updater history")
+        publisher = publisher or PUBLISHER
+        try:
+            stats = publisher.publish(batches, cycle_ts)
+            logger.info(f"Redis: {stats['written']}/{stats['contracts']} contracts changed, "
+                        f"{stats['fields']} fields written")
+        except Exception as e:
+            # unknown what reached Redis: rewrite everything next cycle
+            publisher.reset()
+            logger.warning(f"Publishing cycle {cycle_ts} to Redis failed: {str(e)}")
+        clock.lap("publish")
+        if UPDATER_CSV_SNAPSHOTS:
+            path = csv_updater_path_for_today()
+            df.to_csv(path, index=False)
+            logger.success(f"Data saved successfully to {path}")
+            clock.lap("write_csv")
+        clock.done()
+        return df, cycle_ts
     else:
-        time.sleep(60)
-        counter += 1
-        
-        
-def run_update_loop(stop_event, status_holder):
-    # status_holder is a dict shared in-process to publish last result
+        logger.warning("No data was collected to save.")
+        return None, None
+
+
+def run_update_loop(stop_event, status_holder, on_cycle=None, scheduler=None):
+    """
+    Run updater cycles until stop_event is set.
+
+    Cycles start on the timeframe's wall-clock boundaries (see utils.scheduler),
+    a cycle that overran its timeframe is followed by the next one right away.
+
+    Args:
+        status_holder (dict): Shared in-process, receives the last cycle's metadata, error and the achieved cadence
+        on_cycle: Called with (df, cycle_ts) after every finished cycle (CycleBroadcaster.publish)
+    """
+    scheduler = scheduler or UpdateScheduler()
     while not stop_event.is_set():
-        frame_min = max(1, int(load_timeframe()))  # minutes
-        df,path = run_updatecontract()
-        status_holder["last_df"] = df.to_dict(orient="records")
-        status_holder["last_path"] = path
+        period = max(1, int(load_timeframe())) * 60
+        TIMEFRAME.set(period)
+        start = time.time()
+        deadline = scheduler.start_cycle(start, period)
+        try:
+            df, cycle_ts = run_updatecontract(deadline=deadline, scheduler=scheduler)
+            status_holder["last_error"] = None
+        except Exception as e:
+            # e.g. no OptionChain CSV yet: reported, and tried again next cycle
+            logger.error(f"Updater cycle failed: {str(e)}")
+            status_holder["last_error"] = str(e)
+            df, cycle_ts = None, None
+        elapsed = time.time() - start
+        CYCLE_SECONDS.observe(elapsed)
+        if elapsed > period:
+            CYCLE_OVERRUNS.inc()
+            logger.warning(f"Updater cycle took {elapsed:.0f}s, longer than the {period // 60} min timeframe")
+        status_holder["last_rows"] = 0 if df is None else len(df)
+        status_holder["last_cycle"] = cycle_ts
         status_holder["last_time"] = ny_now().isoformat()
-        # wait until next cycle or stop
-        print(df.head(),path)
-        if stop_event.wait(frame_min * 60):
+        status_holder["cadence"] = scheduler.cadence(period)
+        if on_cycle is not None and df is not None:
+            try:
+                on_cycle(df, cycle_ts)
+            except Exception as e:
+                logger.warning(f"Publishing cycle {cycle_ts} failed: {str(e)}")
+        # wait until the next boundary or stop
+        if stop_event.wait(scheduler.wait_seconds(time.time(), period)):
             break
 def ny_now():
     return datetime.now(timezone.utc).astimezone(ZoneInfo("America/New_York"))
@@ -245,4 +439,5 @@ def csv_updater_path_for_today():
     return f"{TICKER_DIR}/Updater/OptionContracts_{edt_time.strftime('%Y%m%d')}_{edt_time.strftime('%H%M')}.csv"
 
 if __name__ == "__main__":
-    run_update_loop()
\ No newline at end of file
+    from threading import Event
+    run_update_loop(Event(), {})
\ No newline at end of file
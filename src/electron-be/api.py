@@ -1,65 +1,152 @@
 # api.py
-from fastapi import FastAPI, HTTPException, Response
+from fastapi import FastAPI, HTTPException, Request, Response, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse, FileResponse, JSONResponse
+from fastapi.responses import HTMLResponse, FileResponse, StreamingResponse
+from loguru import logger
 import pandas as pd
 import os
-import multiprocessing as mp
+import asyncio
 import uvicorn
 import json
 from OptionChainFarmer import run_optionchain, csv_path_for_today, ny_now
 from UpdateContractsFarmer import run_updatecontract, run_update_loop
 from OptionContractsFarmer import run_optioncontract
+from utils.history_store import latest_snapshot, contract_history
 
+from utils.worker_pool import start_pool, stop_pool
+from utils.jobs import JobManager, FINAL_STATES
+from utils.live_updates import CycleBroadcaster
+from utils.chain_table import ChainTableCache
+from utils.responses import FastJSONResponse, frame_response, frame_records
+from utils.http_cache import reference_cache
+from utils import metrics
+
+from contextlib import asynccontextmanager
 from threading import Thread, Event
-import numpy as np
-app = FastAPI(title="OptionChain API")
+
+
+@asynccontextmanager
+async def lifespan(app):
+    # counters restart with the API; spawn the farmer workers once, every run below
+    # reuses their imports, sessions and Redis pools
+    metrics.reset()
+    start_pool()
+    yield
+    if _stop_event is not None:
+        _stop_event.set()
+    stop_pool()
+
+
+JOBS = JobManager()
+UPDATES = CycleBroadcaster()
+CHAIN_TABLES = ChainTableCache()
+app = FastAPI(title="OptionChain API", lifespan=lifespan, default_response_class=FastJSONResponse)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]
 )
 
 #OPTION CHAIN
-@app.post("/optionchain/run")
-def run():
-    # synchronous run; client waits until done
-    mp.set_start_method("spawn", force=True)
-    df, path, success, bad = run_optionchain()
+def _chain_summary(result):
+    if result is None:
+        raise HTTPException(status_code=502, detail="No option chain data was collected")
+    rows, path, success, bad = result
     return {
         "saved_to": path,
-        "rows": int(df.shape[0]) if not df.empty else 0,
+        "rows": rows,
         "succeeded": success,
         "invalid_symbols": bad,
         "as_of": ny_now().isoformat()
     }
 
+@app.post("/optionchain/run")
+def run():
+    # synchronous run; client waits until done. The renderer uses POST /jobs/optionchain
+    return _chain_summary(run_optionchain())
+
 #UPDATER
 _updater_thread: Thread | None = None
 _stop_event: Event | None = None
-_status = {"running": False, "last_result": None, "last_run_iso": None}
+_status = {"running": False, "last_rows": None, "last_cycle": None, "last_time": None, "last_error": None,
+           "cadence": None}
+def _latest_frame(limit):
+    return latest_snapshot(limit=limit).drop(columns=["Cycle_TS"])
+
 @app.post("/optionupdater/run")
-def run(limit: int = 200):
+def run(limit: int = 200, format: str = "records"):
     # synchronous run; client waits until done
-    mp.set_start_method("spawn", force=True)
-    df, path = run_updatecontract()
-    df = pd.read_csv(path, nrows=limit)
-    df = df.replace([np.inf, -np.inf], np.nan) 
-    records = json.loads(
-        df.to_json(orient="records", date_format="iso", date_unit="s")  # NaN -> null
-    )
-    return JSONResponse(content=records)
+    _require_csv_path()
+    run_updatecontract()
+    return frame_response(_latest_frame(limit), format)
+
+@app.get("/optionupdater/latest")
+def updater_latest(limit: int = 200, format: str = "records"):
+    """format: records, columns (one array per column) or arrow (Arrow IPC stream)."""
+    return frame_response(latest_snapshot(limit=limit), format)
+
+@app.get("/optionupdater/history")
+def updater_history(option_ticker: str, start: str | None = None, end: str | None = None, format: str = "records"):
+    df = contract_history(option_ticker, start=start, end=end)
+    if df.empty:
+        raise HTTPException(status_code=404, detail=f"No history for {option_ticker}")
+    return frame_response(df, format)
+
+def _run_updater(stop_event):
+    try:
+        run_update_loop(stop_event, _status, UPDATES.publish)
+    finally:
+        _status["running"] = False
 
 @app.post("/optionupdater/start")
 def start_updater():
     global _updater_thread, _stop_event
-    if _status["running"]:
+    if _updater_thread is not None and _updater_thread.is_alive():
+        if _stop_event.is_set():
+            # a second loop would run its cycles alongside the one still finishing
+            raise HTTPException(status_code=409, detail="Updater is stopping, its last cycle is still running")
         return {"running": True, "message": "already running", **_status}
     _stop_event = Event()
     _status["running"] = True
-    _updater_thread = Thread(target=run_update_loop, args=(_stop_event, _status), daemon=True)
+    _updater_thread = Thread(target=_run_updater, args=(_stop_event,), daemon=True)
     _updater_thread.start()
     logger.info("Updater loop started")
     return {"running": True}
+
+@app.post("/optionupdater/stop")
+def stop_updater():
+    if _stop_event is not None:
+        _stop_event.set()
+    _status["running"] = False
+    # the cycle in flight finishes and is still published; start answers 409 until then
+    stopping = _updater_thread is not None and _updater_thread.is_alive()
+    return {"running": False, "stopping": stopping, **_status}
+
+@app.websocket("/optionupdater/ws")
+async def updater_ws(websocket: WebSocket):
+    """Pushes every finished updater cycle: a `snapshot` first, then `cycle` diffs by Option_Ticker."""
+    await websocket.accept()
+    if UPDATES.cycle_ts is None:
+        # nothing published since startup: start watchers from the stored cycle, read once
+        df = await asyncio.to_thread(latest_snapshot)
+        if len(df):
+            UPDATES.seed(df, df["Cycle_TS"].iloc[0])
+    queue = UPDATES.subscribe()
+
+    async def pump():
+        while True:
+            await websocket.send_text(await queue.get())
+
+    sender = asyncio.create_task(pump())
+    try:
+        # clients only listen; receiving notices the disconnect without waiting for the next cycle
+        while True:
+            await websocket.receive_text()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        UPDATES.unsubscribe(queue)
+
 #OPTION CONTRACT
 @app.post("/optioncontract/run")
 def run():
@@ -67,6 +154,89 @@ def run():
     return run_optioncontract()
 
 
+#JOBS
+# Background farmer runs: POST returns the job right away, progress comes from the farmer's tqdm counters
+def _chain_job(job):
+    return _chain_summary(run_optionchain(job=job))
+
+def _contract_job(job):
+    return run_optioncontract(job=job)
+
+def _updater_job(job, limit=200):
+    run_updatecontract(job=job)
+    return frame_records(_latest_frame(limit))
+
+JOB_KINDS = {
+    "optionchain": _chain_job,
+    "optioncontract": _contract_job,
+    "optionupdater": _updater_job,
+}
+EVENT_POLL_SEC = 0.5
+EVENT_HEARTBEAT_SEC = 15
+
+def _require_job(job_id):
+    job = JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+@app.post("/jobs/{kind}", status_code=202)
+def start_job(kind: str):
+    if kind not in JOB_KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown job kind {kind}, expected one of {list(JOB_KINDS)}")
+    # a second POST while one runs joins it instead of starting another farm
+    job, created = JOBS.submit(kind, JOB_KINDS[kind])
+    return {**job.snapshot(), "joined": not created}
+
+@app.get("/jobs")
+def list_jobs():
+    return JOBS.list()
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    return _require_job(job_id).snapshot()
+
+@app.post("/jobs/{job_id}/cancel")
+def cancel_job(job_id: str):
+    job = _require_job(job_id)
+    # takes effect at the next finished ticker; tasks not yet started are dropped
+    job.cancel()
+    return job.snapshot()
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = _require_job(job_id)
+    if not job.done:
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job.state}")
+    if job.state != "succeeded":
+        raise HTTPException(status_code=409, detail=f"Job {job_id} {job.state}: {job.error}")
+    return FastJSONResponse(content=job.result)
+
+@app.get("/jobs/{job_id}/events")
+async def job_events(job_id: str):
+    """Server-sent events: one `progress` event per change, `done` when the job ends."""
+    job = _require_job(job_id)
+
+    async def stream():
+        version, idle = -1, 0.0
+        while True:
+            if job.version != version:
+                version, idle = job.version, 0.0
+                snapshot = job.snapshot()
+                event = "done" if snapshot["state"] in FINAL_STATES else "progress"
+                yield f"event: {event}\ndata: {json.dumps(snapshot)}\n\n"
+                if event == "done":
+                    return
+            elif idle >= EVENT_HEARTBEAT_SEC:
+                idle = 0.0
+                yield ": keep-alive\n\n"
+            await asyncio.sleep(EVENT_POLL_SEC)
+            idle += EVENT_POLL_SEC
+
+    return StreamingResponse(stream(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
 #TOOLS AND VIEWS
 def _require_csv_path():
     path = csv_path_for_today()
@@ -74,30 +244,54 @@ def _require_csv_path():
         raise HTTPException(status_code=404, detail="CSV not found. Run /optionchain/run first.")
     return path
 
+def _csv_list(value):
+    return tuple(v.strip() for v in value.split(",") if v.strip()) if value else ()
+
 @app.get("/optionchain/preview.csv")
-def preview_csv(page: int = 1, page_size: int = 200):
-    path = _require_csv_path()
+def preview_csv(request: Request, page: int = 1, page_size: int = 200, symbol: str | None = None,
+                expiry_x: str | None = None, atm_x: str | None = None, sort: str | None = None):
+    """
+    One page of today's OptionChain CSV.
 
-    with open(path, "r", encoding="utf-8", errors="ignore") as f:
-        total = sum(1 for _ in f) - 1
-    total = max(total, 0)
+    symbol, expiry_x and atm_x take comma separated values to keep; sort takes
+    comma separated columns out of Symbol, Expiry_X and ATM_X, `-` for descending.
+    The file is parsed once per version and the ETag changes with it, so an
+    unchanged page answers 304.
+    """
+    path = _require_csv_path()
+    table = CHAIN_TABLES.get(path)
+    headers = {"ETag": table.etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == table.etag:
+        return Response(status_code=304, headers=headers)
 
     page = max(1, int(page))
     page_size = max(1, int(page_size))
-    offset = (page - 1) * page_size
-
-    df = pd.read_csv(
-        path,
-        skiprows=range(1, 1 + offset) if offset > 0 else None,
-        nrows=page_size,
-    )
-
-    return {
+    filters = tuple((column, values) for column, values in
+                    (("Symbol", _csv_list(symbol)), ("Expiry_X", _csv_list(expiry_x)), ("ATM_X", _csv_list(atm_x)))
+                    if values)
+    try:
+        df, total = table.page(page, page_size, filters, _csv_list(sort))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return FastJSONResponse(content={
         "page": page,
         "page_size": page_size,
         "total": int(total),
-        "rows": df.to_dict(orient="records"),
-    }
+        "rows": frame_records(df),
+    }, headers=headers)
+
+@app.get("/metrics")
+def prometheus_metrics():
+    """Prometheus text format, counters and histograms summed over the API process and every worker."""
+    return Response(content=metrics.render(), media_type=metrics.CONTENT_TYPE)
+
+@app.get("/cache/reference")
+def reference_cache_stats():
+    """Hits, misses, bytes saved and size of the reference listing cache, summed over all workers."""
+    cache = reference_cache()
+    if cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
 
 if __name__ == "__main__":
     uvicorn.run("api:app", host="127.0.0.1", port=6789, reload=True)
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+"""
+Cost of moving updater rows through the pipeline: per-row dicts (the former
+layout) vs one ContractBatch per ticker. Measures row building, the pickle
+payload a pool worker sends back, and the final DataFrame construction.
+
+Run from src/electron-be:
+
+    python bench/bench_batches.py --tickers 500 --rows 110
+"""
+import argparse
+import os
+import pickle
+import sys
+import time
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+from bench.fake_polygon import build_chain
+from config_chain import DATA_LOCATE
+from utils.contract_batch import snapshot_batch, batches_frame
+from utils.snapshot_records import project_snapshot
+
+
+def option_rows(picks):
+    """Reference copy of the former per-row builder, Date/Time formatted per row."""
+    rows = []
+    for contract, closest_days, atm_label in picks:
+        edt_time = datetime.now(timezone.utc).astimezone(ZoneInfo("America/New_York"))
+        rows.append({
+            'Date': edt_time.strftime('%Y-%m-%d'),
+            'Time': edt_time.strftime('%H:%M'),
+            'Option_Ticker': contract.ticker,
+            'Strike_Price': contract.strike_price,
+            'Expiry': contract.expiration_date,
+            'Contract_Type': str(contract.contract_type).capitalize(),
+            'Expiry_X': closest_days,
+            'ATM_X': atm_label,
+            'IV': contract.implied_volatility,
+            'Open_interest': contract.open_interest,
+            'Delta': contract.delta,
+            'Gamma': contract.gamma,
+            'Theta': contract.theta,
+            'Vega': contract.vega,
+            'Bid': contract.bid,
+            'Ask': contract.ask,
+            "Open": contract.open,
+            'High': contract.high,
+            'Low': contract.low,
+            'Close': contract.close,
+            'Volume': contract.volume,
+            'VWAP': contract.vwap,
+        })
+    return rows
+
+
+def timed(func):
+    start = time.perf_counter()
+    result = func()
+    return result, (time.perf_counter() - start) * 1000
+
+
+def run(name, build, frame, ticker_picks):
+    per_ticker, build_ms = timed(lambda: [build(picks) for picks in ticker_picks])
+    payloads, dump_ms = timed(lambda: [pickle.dumps(item) for item in per_ticker])
+    received, load_ms = timed(lambda: [pickle.loads(payload) for payload in payloads])
+    df, frame_ms = timed(lambda: frame(received))
+    print(f"{name:<8} rows={len(df):<7} build={build_ms:7.1f}ms  IPC={sum(map(len, payloads)) / 1e6:6.2f}MB "
+          f"pickle+unpickle={dump_ms + load_ms:7.1f}ms  DataFrame={frame_ms:7.1f}ms")
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=110, help="selected contracts per ticker")
+    args = parser.parse_args()
+
+    symbols = pd.read_csv(DATA_LOCATE["DATA_STOCKS_CSV"])["Symbol"].unique().tolist()[:args.tickers]
+    ticker_picks = []
+    for symbol in symbols:
+        records = [project_snapshot(c) for c in build_chain(symbol, 30, 5)][:args.rows]
+        ticker_picks.append([(record, 30, "ATM") for record in records])
+
+    now = datetime.now(timezone.utc).astimezone(ZoneInfo("America/New_York"))
+    date_str, time_str = now.strftime('%Y-%m-%d'), now.strftime('%H:%M')
+    dicts = run("dicts", option_rows, lambda lists: pd.DataFrame([row for rows in lists for row in rows]),
+                ticker_picks)
+    batches = run("batches", lambda picks: snapshot_batch(picks, date_str, time_str), batches_frame, ticker_picks)
+    same = dicts.drop(columns=['Date', 'Time']).equals(batches.drop(columns=['Date', 'Time']))
+    print(f"parity={'OK' if same else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+Peak memory and decode time of a large snapshot chain: full json pages kept
+until the end (the old resp.json() path) vs per-page projection onto
+SnapshotContract records.
+
+The chain is recorded once into a fixture, one page body per line, either from
+the fake server or from Polygon itself (--live, uses config_chain.API_KEY):
+
+    python bench/bench_decode.py --record --strikes 200 --expiries 60
+    python bench/bench_decode.py --record --live --ticker SPY
+    python bench/bench_decode.py
+
+Every variant runs in a fresh spawn process so ru_maxrss is its own.
+"""
+import argparse
+import json
+import os
+import resource
+import sys
+import time
+from multiprocessing import get_context
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PORT = int(os.environ.get("FAKE_POLYGON_PORT", 8767))
+FIXTURE = "../../bench_data/chain_pages.jsonl"
+
+
+def record(path, ticker, strikes, expiries, live):
+    if not live:
+        os.environ["POLYGON_BASE_URL"] = f"http://127.0.0.1:{PORT}"
+    from bench.fake_polygon import start_in_thread
+    from config_chain import API_KEY
+    from utils import api_client
+    from utils.snapshot_records import loads
+
+    apikey = API_KEY if live else "bench"
+    if not live:
+        start_in_thread(PORT, strikes=strikes, expiries=expiries, latency_ms=0)
+    sess = api_client.build_session()
+    url = f"{api_client.POLYGON_BASE_URL}/v3/snapshot/options/{ticker}"
+    params = {"limit": 250, "apiKey": apikey}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pages = contracts = 0
+    with open(path, "wb") as f:
+        while url:
+            resp = api_client.limited_get(sess, url, params)
+            resp.raise_for_status()
+            page = loads(resp.content)
+            # one compact line per page, keeping the body as served
+            f.write(json.dumps(page, separators=(",", ":")).encode() + b"\n")
+            pages += 1
+            contracts += len(page.get("results", []))
+            url, params = page.get("next_url"), {"apiKey": apikey}
+    print(f"recorded {contracts} contracts in {pages} pages to {path} ({os.path.getsize(path) / 1e6:.1f} MB)")
+
+
+def decode_fixture(variant, path, queue):
+    from utils.snapshot_records import decode_snapshot_page
+    import orjson
+
+    decode = {
+        "json": json.loads,
+        "orjson": orjson.loads,
+        "projected": decode_snapshot_page,
+    }[variant]
+    baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    start = time.perf_counter()
+    pages = []
+    with open(path, "rb") as f:
+        for body in f:  # pages arrive one at a time, like the HTTP responses
+            pages.append(decode(body).get("results", []))
+    elapsed = time.perf_counter() - start
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    queue.put((variant, sum(len(p) for p in pages), elapsed, (peak - baseline) / 1024))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--fixture", default=FIXTURE)
+    parser.add_argument("--record", action="store_true", help="(re)record the fixture first")
+    parser.add_argument("--live", action="store_true", help="record from Polygon instead of the fake server")
+    parser.add_argument("--ticker", default="SPY")
+    parser.add_argument("--strikes", type=int, default=200)
+    parser.add_argument("--expiries", type=int, default=60)
+    args = parser.parse_args()
+
+    ctx = get_context("spawn")
+    if args.record or not os.path.exists(args.fixture):
+        # in its own process: ru_maxrss survives exec, the decoders would inherit the recorder's peak
+        proc = ctx.Process(target=record, args=(args.fixture, args.ticker, args.strikes, args.expiries, args.live))
+        proc.start()
+        proc.join()
+    queue = ctx.Queue()
+    print(f"{'decode':<10} {'contracts':>9} {'time':>9} {'peak RSS':>10}")
+    for variant in ("json", "orjson", "projected"):
+        proc = ctx.Process(target=decode_fixture, args=(variant, args.fixture, queue))
+        proc.start()
+        name, contracts, elapsed, peak_mb = queue.get()
+        proc.join()
+        print(f"{name:<10} {contracts:>9} {elapsed * 1000:7.0f}ms {peak_mb:8.1f}MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+"""
+Offline throughput comparison: spawn Pool + requests vs one asyncio event loop.
+
+Run from src/electron-be:
+
+    python bench/bench_fetch.py --tickers 500 --latency-ms 80
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PORT = int(os.environ.get("FAKE_POLYGON_PORT", 8765))
+# must be set before config_chain is imported, spawn workers inherit it
+os.environ["POLYGON_BASE_URL"] = f"http://127.0.0.1:{PORT}"
+
+import pandas as pd
+from loguru import logger
+from multiprocessing import get_context
+
+from bench.fake_polygon import start_in_thread
+from config_chain import DATA_LOCATE, MAX_THREADS, ASYNC_CONCURRENCY, RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST
+from utils import api_client, async_api_client
+from utils.rate_limiter import build_rate_limiter
+
+FAKE_KEY = "bench"
+
+
+def fetch_sync(ticker):
+    data = api_client.fetch_contract_option(ticker, contract_type=None, apikey=FAKE_KEY)
+    return len(data["results"]) if data else 0
+
+
+async def fetch_all_async(tickers, concurrency, limiter):
+    await async_api_client.init_async_client(FAKE_KEY, concurrency, limiter)
+    try:
+        results = await asyncio.gather(*[
+            async_api_client.fetch_contract_option(t, contract_type=None) for t in tickers
+        ])
+    finally:
+        await async_api_client.close_async_client()
+    return [len(r["results"]) if r else 0 for r in results]
+
+
+def report(name, tickers, contracts, elapsed, stats):
+    print(f"{name:<8} tickers={len(tickers):<5} contracts={sum(contracts):<8} "
+          f"requests={stats['requests']:<6} 429s={stats['throttled']:<5} "
+          f"wall={elapsed:7.2f}s  req/s={stats['requests'] / elapsed:8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=500)
+    parser.add_argument("--strikes", type=int, default=40)
+    parser.add_argument("--expiries", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=80.0)
+    parser.add_argument("--concurrency", type=int, default=ASYNC_CONCURRENCY)
+    parser.add_argument("--server-rate-limit", type=int, default=0,
+                        help="answer 429 above this many requests per second")
+    parser.add_argument("--rate", type=float, default=RATE_LIMIT_PER_SEC,
+                        help="client side shared budget, 0 disables the limiter")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="INFO")
+    tickers = pd.read_csv(DATA_LOCATE["DATA_STOCKS_CSV"])["Symbol"].unique().tolist()[:args.tickers]
+    _, app = start_in_thread(PORT, strikes=args.strikes, expiries=args.expiries, latency_ms=args.latency_ms,
+                             rate_limit=args.server_rate_limit)
+    stats = app["stats"]
+    ctx = get_context("spawn")
+
+    stats.update(requests=0, throttled=0)
+    limiter = build_rate_limiter(args.rate, RATE_LIMIT_BURST, ctx)
+    start = time.perf_counter()
+    with ctx.Pool(processes=MAX_THREADS, initializer=api_client.init_pool_worker,
+                  initargs=(FAKE_KEY, limiter)) as pool:
+        contracts = list(pool.imap_unordered(fetch_sync, tickers))
+    report("pool", tickers, contracts, time.perf_counter() - start, stats)
+
+    stats.update(requests=0, throttled=0)
+    limiter = build_rate_limiter(args.rate, RATE_LIMIT_BURST, ctx)
+    start = time.perf_counter()
+    contracts = asyncio.run(fetch_all_async(tickers, args.concurrency, limiter))
+    report("async", tickers, contracts, time.perf_counter() - start, stats)
+
+
+if __name__ == "__main__":
+    main()
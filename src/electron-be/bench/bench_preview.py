@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+"""
+Latency of /optionchain/preview.csv pages: the former count-lines + skiprows
+read per request vs the cached ChainTable, shallow and deep pages, with and
+without a filter/sort view.
+
+Writes a synthetic OptionChain CSV in the OptionChainFarmer layout:
+
+    python bench/bench_preview.py --rows 500000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+
+from utils.chain_table import ChainTableCache
+
+
+def write_chain(path, rows):
+    rng = np.random.default_rng(0)
+    symbols = np.array([f"S{i:04d}" for i in range(rows // 110 + 1)])
+    atm = np.array(["ATM-5", "ATM-4", "ATM-3", "ATM-2", "ATM-1", "ATM", "ATM1", "ATM2", "ATM3", "ATM4", "ATM5"])
+    pd.DataFrame({
+        'Date': "2025-01-02",
+        'Time': "09:31",
+        'Ticker': [f"O:X{i:09d}" for i in range(rows)],
+        'Symbol': np.repeat(symbols, 110)[:rows],
+        'Type': np.tile(["Call", "Put"], rows // 2 + 1)[:rows],
+        'Expiry_X': rng.choice([7, 30, 45, 75, 90], rows),
+        'SP_Price_X': rng.uniform(5, 500, rows).round(1),
+        'ATM_X': np.tile(np.repeat(atm, 2), rows // 22 + 1)[:rows],
+        'Expiry_Date': "2025-02-21",
+    }).to_csv(path, index=False)
+
+
+def old_page(path, page, page_size):
+    """Reference copy of the former preview_csv body."""
+    with open(path, "r", encoding="utf-8", errors="ignore") as f:
+        total = sum(1 for _ in f) - 1
+    offset = (page - 1) * page_size
+    df = pd.read_csv(path, skiprows=range(1, 1 + offset) if offset > 0 else None, nrows=page_size)
+    return df.to_dict(orient="records"), total
+
+
+def timed(func, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--page-size", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "OptionChain_bench.csv")
+        write_chain(path, args.rows)
+        cache = ChainTableCache()
+        load_ms = timed(lambda: ChainTableCache().get(path), repeat=1)
+        cache.get(path)
+        last = args.rows // args.page_size
+        view = ((('Expiry_X', ('30', '45')),), ('Symbol', '-ATM_X'))
+        print(f"rows={args.rows} page_size={args.page_size} table load={load_ms:.0f}ms (once per file version)")
+        for page in (1, last // 2, last):
+            old = timed(lambda: old_page(path, page, args.page_size), repeat=2)
+            new = timed(lambda: cache.get(path).page(page, args.page_size)[0].to_dict(orient="records"))
+            print(f"page {page:>6}: skiprows={old:8.1f}ms  cached={new:6.2f}ms")
+        fresh = ChainTableCache().get(path)
+        first = timed(lambda: fresh.view(*view), repeat=1)
+        again = timed(lambda: cache.get(path).page(last // 4, args.page_size, *view)[0].to_dict(orient="records"))
+        print(f"filter+sort view: build={first:.1f}ms (once per view)  cached page={again:.2f}ms")
+
+
+if __name__ == "__main__":
+    main()
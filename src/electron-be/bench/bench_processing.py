@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Parity check and microbenchmark of the columnar chain processing against the
+per-expiry Python loops it replaced (kept below as *_loop reference copies).
+
+The timed chain is a thinned synthetic one. Parity is also checked on edge
+cases of the ATM and expiry selection: the price below or above every strike,
+exactly half-way between two strikes, expiries listing a single strike,
+targets far past the last expiry, and a chain with no future expiry.
+
+Run from src/electron-be:
+
+    python bench/bench_processing.py --strikes 110 --expiries 100     # ~20k contracts
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, datetime, timedelta, timezone
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from loguru import logger
+
+from bench.fake_polygon import build_chain, underlying_price_for
+from config_chain import TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING
+from utils.snapshot_records import project_snapshot
+from utils.data_processing import find_target_expiries, find_reference_target_expiries
+import OptionChainFarmer
+import OptionContractsFarmer
+import UpdateContractsFarmer
+
+
+def get_ATM_loop(underlying_price, strike_prices, settings):
+    """Reference copy of the former utils.data_processing.get_ATM."""
+    if not strike_prices:
+        return []
+    unique_strikes = sorted(list(set(strike_prices)))
+    atm_strike = min(unique_strikes, key=lambda x: abs(x - underlying_price))
+    atm_index = unique_strikes.index(atm_strike)
+    n = len(unique_strikes)
+    atm_map = {atm_strike: "ATM"}
+    for i in range(1, settings + 1):
+        strike_price = unique_strikes[max(atm_index - i, 0)]
+        if strike_price not in atm_map:
+            atm_map[strike_price] = f"ATM-{i}"
+    for i in range(1, settings + 1):
+        strike_price = unique_strikes[min(atm_index + i, n - 1)]
+        if strike_price not in atm_map:
+            atm_map[strike_price] = f"ATM{i}"
+    return atm_map
+
+
+def snapshot_row(contract, closest_days, atm_label, edt_time):
+    """Output row of the former updater and contract loops."""
+    details = contract.get('details', {})
+    greeks = contract.get('greeks', {})
+    last_quote = contract.get('last_quote', {})
+    day_data = contract.get('day', {})
+    return {
+        'Date': edt_time.strftime('%Y-%m-%d'),
+        'Time': edt_time.strftime('%H:%M'),
+        'Option_Ticker': details.get('ticker'),
+        'Strike_Price': details['strike_price'],
+        'Expiry': details['expiration_date'],
+        'Contract_Type': str(details.get('contract_type', '')).capitalize(),
+        'Expiry_X': closest_days,
+        'ATM_X': atm_label,
+        'IV': contract.get('implied_volatility'),
+        'Open_interest': contract.get("open_interest"),
+        'Delta': greeks.get('delta'),
+        'Gamma': greeks.get('gamma'),
+        'Theta': greeks.get('theta'),
+        'Vega': greeks.get('vega'),
+        'Bid': last_quote.get('bid'),
+        'Ask': last_quote.get('ask'),
+        "Open": day_data.get('open'),
+        'High': day_data.get('high'),
+        'Low': day_data.get('low'),
+        'Close': day_data.get('close'),
+        'Volume': day_data.get('volume'),
+        'VWAP': day_data.get('vwap'),
+    }
+
+
+def update_contract_data_loop(data, ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, underlying_price):
+    """Reference copy of the former UpdateContractsFarmer.process_update_contract_data."""
+    expiries_days = find_target_expiries(data, ticker, target_days=TARGETS_DAYS)
+    edt_time = datetime.now(timezone.utc).astimezone(ZoneInfo("America/New_York"))
+    filtered_options = []
+    for expiry_date, closest_days in expiries_days:
+        strike_prices = [c['details']['strike_price'] for c in data['results']
+                         if c['details']['expiration_date'] == expiry_date]
+        closest_strikes = get_ATM_loop(underlying_price, strike_prices, ATM_STRIKE_PRICE_SETTING)
+        for contract in data['results']:
+            strike_price = contract['details']['strike_price']
+            if contract['details']['expiration_date'] == expiry_date and strike_price in closest_strikes:
+                filtered_options.append(snapshot_row(contract, closest_days, closest_strikes.get(strike_price),
+                                                     edt_time))
+    return True, underlying_price, filtered_options
+
+
+def contract_data_loop(data, ticker, TARGETS_DAYS, ATM_STRIKE_PRICE_SETTING, valid_option_tickers, underlying_price):
+    """Reference copy of the former OptionContractsFarmer.process_contract_data."""
+    contracts = [c for c in data['results'] if c.get('details', {}).get('ticker') in valid_option_tickers]
+    expiries_days = find_target_expiries({'results': contracts}, ticker, target_days=TARGETS_DAYS)
+    edt_time = datetime.now(timezone.utc).astimezone(ZoneInfo("America/New_York"))
+    filtered_options = []
+    for expiry_date, closest_days in expiries_days:
+        strike_prices = [c['details']['strike_price'] for c in contracts
+                         if c['details']['expiration_date'] == expiry_date]
+        closest_strikes = get_ATM_loop(underlying_price, strike_prices, ATM_STRIKE_PRICE_SETTING)
+        for contract in contracts:
+            strike_price = contract['details']['strike_price']
+            if contract['details']['expiration_date'] == expiry_date and strike_price in closest_strikes:
+                filtered_options.append(snapshot_row(contract, closest_days, closest_strikes.get(strike_price),
+                                                     edt_time))
+    return True, underlying_price, filtered_options, [opt['Option_Ticker'] for opt in filtered_options]
+
+
+def option_contract_data_loop(data, ticker, underlying_price, TARGETS_DAYS=TARGETS_DAYS):
+    """Reference copy of the former OptionChainFarmer.process_option_contract_data."""
+    expiries_days = find_reference_target_expiries(data, ticker, target_days=TARGETS_DAYS)
+    edt_time = datetime.now(timezone.utc).astimezone(ZoneInfo("America/New_York"))
+    filtered_options = []
+    for expiry_date, closest_days in expiries_days:
+        strike_prices = [c['strike_price'] for c in data if c['expiration_date'] == expiry_date]
+        closest_strikes = get_ATM_loop(underlying_price, strike_prices, ATM_STRIKE_PRICE_SETTING)
+        for contract in data:
+            if contract['expiration_date'] == expiry_date and contract['strike_price'] in closest_strikes:
+                filtered_options.append({
+                    'Date': edt_time.strftime('%Y-%m-%d'),
+                    'Time': edt_time.strftime('%H:%M'),
+                    'Ticker': contract['ticker'],
+                    'Symbol': ticker,
+                    'Type': contract["contract_type"].capitalize(),
+                    'Expiry_X': closest_days,
+                    'SP_Price_X': contract['strike_price'],
+                    'ATM_X': closest_strikes[contract['strike_price']],
+                    'Expiry_Date': contract['expiration_date'],
+                })
+    unique_expiries = list(set(pair[0] for pair in expiries_days))
+    return underlying_price, sorted(unique_expiries), filtered_options
+
+
+def strip_clock(rows):
+    rows = rows.records() if hasattr(rows, 'records') else rows
+    return [{k: v for k, v in row.items() if k not in ('Date', 'Time')} for row in rows]
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def chain_cases(ticker, strikes, expiries):
+    """
+    (name, chain, underlying price, target days) to check. Every case has its own
+    symbol, so the strike ladder cache never serves one case's ladder to another.
+    """
+    rng = random.Random(0)
+    chain = build_chain(ticker, strikes, expiries)
+    rng.shuffle(chain)
+    # thin the ladders so expiries do not all share the same strikes
+    thinned = [c for c in chain if rng.random() > 0.1]
+    price = underlying_price_for(ticker)
+    yield "main", thinned, price + 0.37, TARGETS_DAYS
+
+    small = build_chain("EDGE", 12, 16)
+    all_strikes = sorted({c['details']['strike_price'] for c in small})
+    yield "below", small, all_strikes[0] - 50, TARGETS_DAYS
+    yield "above", small, all_strikes[-1] + 50, TARGETS_DAYS
+    # exactly half-way: the old min() kept the lower strike
+    yield "halfway", small, (all_strikes[5] + all_strikes[6]) / 2, TARGETS_DAYS
+    expiry_dates = sorted({c['details']['expiration_date'] for c in small})
+    single = {e: all_strikes[i % len(all_strikes)] for i, e in enumerate(expiry_dates[::2])}
+    lonely = [c for c in small if single.get(c['details']['expiration_date'], c['details']['strike_price'])
+              == c['details']['strike_price']]
+    yield "one_strike", lonely, all_strikes[3] + 0.2, TARGETS_DAYS
+    yield "far_target", small, all_strikes[4] + 0.3, [1, 30, 400, 1000]
+    expired = build_chain("GONE", 12, 8, today=date.today() - timedelta(days=200))
+    yield "expired", expired, all_strikes[4], TARGETS_DAYS
+
+
+def parity_cases(chain, ticker, price, targets):
+    """(function name, old loop, columnar function, index of the rows in their results)."""
+    records = {'results': [project_snapshot(c) for c in chain]}
+    data = {'results': chain}
+    reference = [{
+        'ticker': c['details']['ticker'], 'strike_price': c['details']['strike_price'],
+        'expiration_date': c['details']['expiration_date'], 'contract_type': c['details']['contract_type'],
+    } for c in chain]
+    rng = random.Random(1)
+    valid = {c['details']['ticker'] for c in chain if rng.random() > 0.2}
+
+    def chain_columnar():
+        with mock.patch.object(OptionChainFarmer, "TARGETS_DAYS", targets):
+            return OptionChainFarmer.process_option_contract_data(reference, ticker, price)
+
+    # the contract farmer filters the same chain, its ladders are cached under another symbol
+    return [
+        ("updater", lambda: update_contract_data_loop(data, ticker, targets, ATM_STRIKE_PRICE_SETTING, price),
+         lambda: UpdateContractsFarmer.process_update_contract_data(
+             records, ticker, targets, ATM_STRIKE_PRICE_SETTING, price), 2),
+        ("contract", lambda: contract_data_loop(data, ticker, targets, ATM_STRIKE_PRICE_SETTING, valid, price),
+         lambda: OptionContractsFarmer.process_contract_data(
+             records, ticker + "_C", targets, ATM_STRIKE_PRICE_SETTING, valid, price), 2),
+        ("chain", lambda: option_contract_data_loop(reference, ticker, price, targets), chain_columnar, 2),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--ticker", default="SPY")
+    parser.add_argument("--strikes", type=int, default=110)
+    parser.add_argument("--expiries", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logger.remove()
+
+    failed = False
+    for case, chain, price, targets in chain_cases(args.ticker, args.strikes, args.expiries):
+        timed = case == "main"
+        if timed:
+            print(f"{len(chain)} contracts, {args.expiries} expiries, targets {TARGETS_DAYS}")
+        ticker = args.ticker if timed else case.upper()
+        for name, loop_impl, columnar_impl, rows_at in parity_cases(chain, ticker, price, targets):
+            loop_time, loop_result = best_of(loop_impl, args.repeat if timed else 1)
+            columnar_time, columnar_result = best_of(columnar_impl, args.repeat if timed else 1)
+            same = strip_clock(loop_result[rows_at]) == strip_clock(columnar_result[rows_at])
+            failed |= not same
+            line = f"{case:<10} {name:<8} rows={len(columnar_result[rows_at]):<5} " \
+                   f"parity={'OK' if same else 'MISMATCH'}"
+            if timed:
+                line += f"  loop={loop_time * 1000:8.2f} ms  columnar={columnar_time * 1000:8.2f} ms  " \
+                        f"speedup={loop_time / columnar_time:5.1f}x"
+            print(line)
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+"""
+Latency of one cycle of underlying price lookups for the S&P 500 universe.
+
+    per-call  a new redis.Redis per lookup (the old fetch_redis)
+    pooled    fetch_redis on the per-process connection pool
+    bulk      fetch_redis_bulk, one pipelined round trip
+
+Run from src/electron-be against fakeredis (default) or the redis-server in config_chain:
+
+    python bench/bench_redis.py --real
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redis
+from loguru import logger
+
+from bench.seed_redis import load_universe, fake_redis_pool, seed_prices
+from config_chain import REDIS_HOST, REDIS_PORT, REDIS_PASSWORD
+from utils import api_client
+
+
+def per_call_lookups(tickers, new_client):
+    for ticker in tickers:
+        new_client().hgetall("TRADE_US_" + ticker)["last"]
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--real", action="store_true", help="use the redis-server from config_chain")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logger.remove()
+
+    tickers = load_universe()
+    if args.real:
+        def new_client():
+            return redis.Redis(host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PASSWORD, db=0,
+                               decode_responses=True)
+        api_client._REDIS_POOL = None
+    else:
+        pool = fake_redis_pool()
+        server = pool.connection_kwargs["server"]
+
+        def new_client():
+            return redis.Redis(connection_pool=redis.ConnectionPool(
+                connection_class=pool.connection_class, server=server, decode_responses=True))
+        api_client._REDIS_POOL = pool
+    seed_prices(api_client.get_redis(), tickers)
+
+    results = {
+        "per-call": best_of(lambda: per_call_lookups(tickers, new_client), args.repeat),
+        "pooled": best_of(lambda: [api_client.fetch_redis(t) for t in tickers], args.repeat),
+        "bulk": best_of(lambda: api_client.fetch_redis_bulk(tickers), args.repeat),
+    }
+    backend = f"redis {REDIS_HOST}:{REDIS_PORT}" if args.real else "fakeredis"
+    print(f"{len(tickers)} tickers per cycle on {backend}, best of {args.repeat}")
+    for name, seconds in results.items():
+        print(f"{name:<9} {seconds * 1000:9.2f} ms/cycle  {seconds / len(tickers) * 1e6:8.1f} us/ticker")
+
+
+if __name__ == "__main__":
+    main()
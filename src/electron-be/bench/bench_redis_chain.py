@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Redis layout of the day's option chain: the former single indent=4 JSON blob
+vs one compact columnar value per symbol plus a symbol index (save_to_redis).
+Reports the bytes written, the write time and the latency of reading one or
+ten symbols back.
+
+Run from src/electron-be against fakeredis (default) or the redis-server in config_chain:
+
+    python bench/bench_redis_chain.py --symbols 500
+    python bench/bench_redis_chain.py --real
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from bench.seed_redis import fake_redis_pool
+from utils import api_client
+from utils.storage import save_to_redis, load_chain_from_redis, chain_redis_key
+
+
+def chain_frame(symbols, rows_per_symbol):
+    """Synthetic OptionChainFarmer output."""
+    rng = np.random.default_rng(0)
+    rows = symbols * rows_per_symbol
+    atm = ["ATM-5", "ATM-4", "ATM-3", "ATM-2", "ATM-1", "ATM", "ATM1", "ATM2", "ATM3", "ATM4", "ATM5"]
+    return pd.DataFrame({
+        'Date': "2025-01-02",
+        'Time': "09:31",
+        'Ticker': [f"O:S{i // rows_per_symbol:04d}250221C{i:08d}" for i in range(rows)],
+        'Symbol': np.repeat([f"S{i:04d}" for i in range(symbols)], rows_per_symbol),
+        'Type': np.tile(["Call", "Put"], rows // 2 + 1)[:rows],
+        'Expiry_X': rng.choice([7, 30, 45, 75, 90], rows),
+        'SP_Price_X': rng.uniform(5, 500, rows).round(1),
+        'ATM_X': np.resize(np.repeat(atm, 2), rows),
+        'Expiry_Date': "2025-02-21",
+    })
+
+
+def save_blob(df, edt_time):
+    """Reference copy of the former save_to_redis."""
+    key = f"OptionChain_{edt_time.strftime('%Y%m%d')}"
+    api_client.get_redis().set(key, df.to_json(orient="records", indent=4))
+
+
+def load_blob(edt_time, symbols):
+    """What a reader of the blob had to do for a few symbols."""
+    data = json.loads(api_client.get_redis().get(f"OptionChain_{edt_time.strftime('%Y%m%d')}"))
+    wanted = set(symbols)
+    return pd.DataFrame([row for row in data if row['Symbol'] in wanted])
+
+
+def best_of(func, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--real", action="store_true", help="use the redis-server from config_chain")
+    parser.add_argument("--symbols", type=int, default=500)
+    parser.add_argument("--rows", type=int, default=110, help="contracts per symbol")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logger.remove()
+
+    if not args.real:
+        api_client._REDIS_POOL = fake_redis_pool()
+    r = api_client.get_redis()
+    df = chain_frame(args.symbols, args.rows)
+    edt_time = datetime(2025, 1, 2)
+    blob_key = f"OptionChain_{edt_time.strftime('%Y%m%d')}"
+
+    blob_ms = best_of(lambda: save_blob(df, edt_time), args.repeat)
+    split_ms = best_of(lambda: save_to_redis(df, edt_time), args.repeat)
+    blob_bytes = r.strlen(blob_key)
+    split_bytes = sum(r.strlen(chain_redis_key(edt_time, s)) for s in r.smembers(chain_redis_key(edt_time)))
+    print(f"{len(df)} contracts, {args.symbols} symbols")
+    print(f"write   blob={blob_ms:7.1f}ms {blob_bytes / 1e6:6.2f}MB   per-symbol={split_ms:7.1f}ms "
+          f"{split_bytes / 1e6:6.2f}MB")
+
+    symbols = sorted(df['Symbol'].unique())
+    for count in (1, 10):
+        wanted = symbols[:count]
+        old = best_of(lambda: load_blob(edt_time, wanted), args.repeat)
+        new = best_of(lambda: load_chain_from_redis(edt_time, wanted), args.repeat)
+        same = load_blob(edt_time, wanted).equals(load_chain_from_redis(edt_time, wanted))
+        print(f"read {count:>2} symbol(s)  blob={old:7.2f}ms  per-symbol={new:6.2f}ms  "
+              f"parity={'OK' if same else 'MISMATCH'}")
+    r.delete(blob_key)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+"""
+Redis traffic of updater cycles: every field of every contract per cycle (the
+former per-ticker save_single_to_redis) vs ContractPublisher, which writes only
+changed fields. Later cycles re-quote a given fraction of the contracts; bytes
+are the command arguments sent through the pipelines.
+
+Run from src/electron-be against fakeredis (default) or the redis-server in config_chain:
+
+    python bench/bench_redis_delta.py --tickers 100 --changed 0.1 0.5 1.0
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import redis
+from loguru import logger
+
+from bench.fake_polygon import build_chain
+from bench.seed_redis import load_universe, fake_redis_pool
+from utils import api_client
+from utils.contract_batch import snapshot_batch
+from utils.snapshot_records import project_snapshot
+from utils.storage import save_single_to_redis, ContractPublisher
+
+SENT = {"bytes": 0, "commands": 0}
+_execute = redis.client.Pipeline.execute
+
+
+def counting_execute(self, *args, **kwargs):
+    for args_, _ in self.command_stack:
+        SENT["commands"] += 1
+        SENT["bytes"] += sum(len(str(a)) for a in args_)
+    return _execute(self, *args, **kwargs)
+
+
+def requote(contracts, fraction, rng):
+    """New greeks and quotes for a fraction of the contracts, the rest unchanged."""
+    return [
+        c._replace(delta=rng.uniform(-1, 1), gamma=rng.uniform(0, 0.1), bid=rng.uniform(0.1, 20),
+                   ask=rng.uniform(0.1, 20), volume=rng.randint(0, 10000))
+        if rng.random() < fraction else c
+        for c in contracts
+    ]
+
+
+def measure(name, write):
+    SENT.update(bytes=0, commands=0)
+    start = time.perf_counter()
+    write()
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"  {name:<10} commands={SENT['commands']:<7} sent={SENT['bytes'] / 1e6:7.2f}MB  {elapsed:7.1f}ms")
+    return SENT["bytes"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--real", action="store_true", help="use the redis-server from config_chain")
+    parser.add_argument("--tickers", type=int, default=100)
+    parser.add_argument("--rows", type=int, default=110, help="selected contracts per ticker")
+    parser.add_argument("--changed", type=float, nargs="+", default=[0.0, 0.1, 0.5, 1.0],
+                        help="fraction of contracts re-quoted per cycle")
+    args = parser.parse_args()
+    logger.remove()
+
+    if not args.real:
+        api_client._REDIS_POOL = fake_redis_pool()
+    redis.client.Pipeline.execute = counting_execute
+    rng = random.Random(0)
+    chains = {ticker: [project_snapshot(c) for c in build_chain(ticker, 30, 5)][:args.rows]
+              for ticker in load_universe(args.tickers)}
+    publisher = ContractPublisher(events="stream")
+
+    def cycle_batches(minute):
+        return [(ticker, snapshot_batch([(c, 30, "ATM") for c in contracts], "2025-01-02", f"09:{minute:02d}"))
+                for ticker, contracts in chains.items()]
+
+    publisher.publish(cycle_batches(0), "2025-01-02T14:30:00Z")  # first cycle writes everything
+    for minute, fraction in enumerate(args.changed, start=1):
+        chains = {ticker: requote(contracts, fraction, rng) for ticker, contracts in chains.items()}
+        batches = cycle_batches(minute)
+        print(f"cycle with {fraction:.0%} of {args.tickers * args.rows} contracts re-quoted")
+        full = measure("every", lambda: [save_single_to_redis(batch, ticker) for ticker, batch in batches])
+        delta = measure("changed", lambda: publisher.publish(batches, f"2025-01-02T14:{30 + minute}:00Z"))
+        print(f"  changed/every = {delta / full:.1%} (incl. the stream event)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# -*- coding: utf-8 -*-
+"""
+Reference listing traffic of repeated option chain runs during a day: every run
+re-paginating /v3/reference/options/contracts vs the on-disk ReferenceCache.
+Between runs the underlying prices drift by up to --drift, so the strike
+windows move a little like they do in production. Also checks the cached
+listings match a direct fetch.
+
+Run from src/electron-be:
+
+    python bench/bench_reference_cache.py --tickers 200 --runs 5
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PORT = int(os.environ.get("FAKE_POLYGON_PORT", 8766))
+os.environ["POLYGON_BASE_URL"] = f"http://127.0.0.1:{PORT}"
+
+from loguru import logger
+
+from bench.fake_polygon import start_in_thread, underlying_price_for
+from bench.seed_redis import load_universe
+from utils import api_client, http_cache
+from utils.http_cache import ReferenceCache
+from OptionChainFarmer import reference_date_window
+from utils.data_processing import get_top_bottom_strikes
+
+FAKE_KEY = "bench"
+
+
+def run_day(tickers, runs, drift, fetch, stats):
+    rng = random.Random(0)
+    prices = {t: underlying_price_for(t) for t in tickers}
+    before = dict(stats)
+    start = time.perf_counter()
+    contracts = 0
+    for _ in range(runs):
+        start_date, end_date = reference_date_window()
+        for ticker in tickers:
+            prices[ticker] *= 1 + rng.uniform(-drift, drift)
+            top_sp, bottom_sp = get_top_bottom_strikes(underlying_price=prices[ticker])
+            contracts += len(fetch(ticker, top_sp, bottom_sp, start_date, end_date) or [])
+    return contracts, stats["requests"] - before["requests"], stats["bytes"] - before["bytes"], \
+        time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--drift", type=float, default=0.01, help="max relative price move between runs")
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    args = parser.parse_args()
+    logger.remove()
+
+    _, app = start_in_thread(PORT, strikes=60, expiries=26, latency_ms=args.latency_ms)
+    stats = app["stats"]
+    tickers = load_universe(args.tickers)
+
+    def direct(*window):
+        return api_client._fetch_reference_listing(*window, apikey=FAKE_KEY)
+
+    def cached(*window):
+        return api_client.fetch_reference_option(*window, apikey=FAKE_KEY)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        http_cache._CACHE = ReferenceCache(os.path.join(tmp, "reference_cache.sqlite"))
+        print(f"{args.tickers} tickers, {args.runs} runs, price drift <= {args.drift:.1%}")
+        for name, fetch in (("uncached", direct), ("cached", cached)):
+            contracts, requests, sent, elapsed = run_day(tickers, args.runs, args.drift, fetch, stats)
+            print(f"{name:<9} contracts={contracts:<8} requests={requests:<6} "
+                  f"received={sent / 1e6:7.2f}MB  wall={elapsed:6.2f}s")
+        print(f"cache     {http_cache._CACHE.stats()}")
+
+        start_date, end_date = reference_date_window()
+        same = True
+        for ticker in tickers[:20]:
+            top_sp, bottom_sp = get_top_bottom_strikes(underlying_price=underlying_price_for(ticker) * 1.004)
+            window = (ticker, top_sp, bottom_sp, start_date, end_date)
+            same &= sorted(c["ticker"] for c in direct(*window)) == sorted(c["ticker"] for c in cached(*window))
+        print(f"parity={'OK' if same else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
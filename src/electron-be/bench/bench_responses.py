@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+Serialization cost of an updater snapshot response: the former
+to_json -> json.loads -> JSONResponse path vs utils.responses (orjson records,
+columnar JSON and Arrow IPC). Reports wall and CPU time per 10k rows and the
+body size, and checks the records bodies decode to the same rows.
+
+    python bench/bench_responses.py --rows 100000
+"""
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+import pandas as pd
+from fastapi.responses import JSONResponse
+
+from utils.contract_batch import CONTRACT_COLUMNS
+from utils.responses import frame_response
+
+
+def updater_frame(rows):
+    """Synthetic updater cycle in the history layout, ~5% missing greeks."""
+    rng = np.random.default_rng(0)
+    data = {'Cycle_TS': "2025-01-02T14:30:00Z", 'Date': "2025-01-02", 'Time': "09:30"}
+    for name in CONTRACT_COLUMNS[2:]:
+        if name in ('Option_Ticker', 'Expiry', 'Contract_Type', 'ATM_X'):
+            data[name] = [f"{name[:3]}{i % 997}" for i in range(rows)]
+        elif name in ('Expiry_X', 'Open_interest', 'Volume'):
+            data[name] = rng.integers(0, 10_000, rows)
+        else:
+            values = rng.normal(size=rows)
+            values[rng.random(rows) < 0.05] = np.nan
+            data[name] = values
+    df = pd.DataFrame(data)
+    df.loc[df.index[:3], 'IV'] = np.inf
+    return df
+
+
+def old_response(df):
+    """Reference copy of the former /optionupdater/latest body."""
+    df = df.replace([np.inf, -np.inf], np.nan)
+    records = json.loads(df.to_json(orient="records"))
+    return JSONResponse(content=records)
+
+
+def measure(func, df, repeat):
+    best_wall = best_cpu = float("inf")
+    for _ in range(repeat):
+        wall, cpu = time.perf_counter(), time.process_time()
+        body = func(df).body
+        best_wall = min(best_wall, time.perf_counter() - wall)
+        best_cpu = min(best_cpu, time.process_time() - cpu)
+    return body, best_wall, best_cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = updater_frame(args.rows)
+    per_10k = 10_000 / args.rows * 1000
+    variants = {
+        "to_json+loads": old_response,
+        "records": lambda d: frame_response(d, "records"),
+        "columns": lambda d: frame_response(d, "columns"),
+        "arrow": lambda d: frame_response(d, "arrow"),
+    }
+    print(f"rows={args.rows}")
+    print(f"{'path':<14} {'wall/10k':>10} {'cpu/10k':>10} {'body':>9}")
+    bodies = {}
+    for name, func in variants.items():
+        body, wall, cpu = measure(func, df, args.repeat)
+        bodies[name] = body
+        print(f"{name:<14} {wall * per_10k:8.1f}ms {cpu * per_10k:8.1f}ms {len(body) / 1e6:7.2f}MB")
+    # to_json rounds floats to 10 digits, orjson keeps them exact
+    same = all(
+        old.keys() == new.keys() and all(
+            old[k] == new[k] or (isinstance(new[k], float) and math.isclose(old[k], new[k], abs_tol=1e-9))
+            for k in old)
+        for old, new in zip(json.loads(bodies["to_json+loads"]), json.loads(bodies["records"]))
+    )
+    print(f"records parity={'OK' if same else 'MISMATCH'} (to 1e-9)")
+
+
+if __name__ == "__main__":
+    main()
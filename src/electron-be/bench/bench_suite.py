@@ -0,0 +1,195 @@
+# -*- coding: utf-8 -*-
+"""
+Offline benchmark of the three farmers: run_optionchain, run_optioncontract and
+one run_updatecontract cycle, against the fake Polygon server and a fakeredis
+TCP server seeded with TRADE_US_* prices (or against a recording of an earlier
+run). Every farmer runs in its own process inside a scratch working directory,
+so outputs never touch the real ../../ folders and peak RSS is per farmer.
+
+Reports wall time, Polygon requests and requests/sec, peak RSS of the farmer
+process and of its workers, and the farmer's stage split (utils.timing.StageClock).
+
+Run from src/electron-be:
+
+    python bench/bench_suite.py                               # 503 tickers, pool mode
+    python bench/bench_suite.py --mode async --latency-ms 80 --page-size 100
+    python bench/bench_suite.py --record ../../bench_data/http    # also record every response
+    python bench/bench_suite.py --replay ../../bench_data/http    # no server, same day only
+    python bench/bench_suite.py --json ../../bench_data/report.json
+
+Recordings are keyed by URL without the API key; the expiry windows in the URLs
+move with the date, so a recording replays on the day it was made.
+"""
+import argparse
+import json
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    import resource
+except ImportError:  # Windows: no peak RSS
+    resource = None
+
+import pandas as pd
+import redis
+from multiprocessing import get_context
+
+from bench.fake_polygon import start_in_thread
+from bench.seed_redis import load_universe, seed_prices
+from config_chain import DATA_LOCATE
+
+FARMERS = ("optionchain", "optioncontract", "updatecontract")
+FAKE_KEY = "bench"
+UNTHROTTLED = 1_000_000  # requests are still counted by the limiter
+
+
+def start_fake_redis(port):
+    from fakeredis import TcpFakeServer
+
+    server = TcpFakeServer(("127.0.0.1", port))
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def peak_rss_mb(who):
+    if resource is None:
+        return None
+    # kilobytes on Linux, bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return resource.getrusage(who).ru_maxrss * scale / 1e6
+
+
+def run_farmer(name, mode, workdir, rate_limit, results):
+    """Child process: run one farmer in workdir and put its measurements on results."""
+    os.chdir(workdir)
+    from loguru import logger
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+
+    import OptionChainFarmer
+    import OptionContractsFarmer
+    import UpdateContractsFarmer
+    from utils.jobs import Job
+    from utils.timing import LAST_STAGES
+
+    module, run = {
+        "optionchain": (OptionChainFarmer, OptionChainFarmer.run_optionchain),
+        "optioncontract": (OptionContractsFarmer, OptionContractsFarmer.run_optioncontract),
+        "updatecontract": (UpdateContractsFarmer, UpdateContractsFarmer.run_updatecontract),
+    }[name]
+    module.RATE_LIMIT_PER_SEC = rate_limit or UNTHROTTLED
+    job = Job(name)
+    start = time.perf_counter()
+    run(mode=mode, job=job)
+    wall = time.perf_counter() - start
+    results.put({
+        "farmer": name,
+        "wall_sec": wall,
+        "tickers": job.progress.get("total"),
+        "succeeded": job.progress.get("succeeded"),
+        "requests": job.progress.get("requests"),
+        "requests_per_sec": job.progress.get("requests", 0) / wall,
+        "peak_rss_mb": peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+        "workers_peak_rss_mb": peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None,
+        "stages": LAST_STAGES.get(name, {}),
+    })
+
+
+def prepare_workdir(root, tickers):
+    """root/work/run is the farmers' cwd, so their ../../ outputs land in root."""
+    workdir = os.path.join(root, "work", "run")
+    os.makedirs(workdir)
+    pd.DataFrame({"Symbol": tickers}).to_csv(os.path.join(workdir, DATA_LOCATE["DATA_STOCKS_CSV"]), index=False)
+    with open(os.path.join(workdir, "timeframe.txt"), "w") as f:
+        f.write("1")  # run_updatecontract updates right away
+    return workdir
+
+
+def print_report(report):
+    print(f"{report['tickers']} tickers, mode={report['mode']}, source={report['source']}")
+    print(f"{'farmer':<15} {'ok':>9} {'wall':>8} {'requests':>9} {'req/s':>8} {'rss':>8} {'workers':>8}  stages")
+    for r in report["farmers"]:
+        rss = f"{r['peak_rss_mb']:6.0f}MB" if r["peak_rss_mb"] is not None else "     n/a"
+        workers = f"{r['workers_peak_rss_mb']:6.0f}MB" if r["workers_peak_rss_mb"] is not None else "     n/a"
+        stages = ", ".join(f"{s} {t:.2f}s" for s, t in r["stages"].items())
+        ok = f"{r['succeeded']}/{r['tickers']}"
+        print(f"{r['farmer']:<15} {ok:>9} {r['wall_sec']:7.2f}s {r['requests'] or 0:>9} {r['requests_per_sec']:8.1f} "
+              f"{rss} {workers}  {stages}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tickers", type=int, default=None, help="first N of SnP500List.csv (default all)")
+    parser.add_argument("--mode", choices=("pool", "async"), default="pool")
+    parser.add_argument("--farmers", nargs="+", choices=FARMERS, default=list(FARMERS))
+    parser.add_argument("--strikes", type=int, default=40)
+    parser.add_argument("--expiries", type=int, default=20)
+    parser.add_argument("--page-size", type=int, default=None, help="results per fake page (more pages)")
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--rate-limit", type=int, default=0, help="requests/sec budget (0 = unthrottled)")
+    parser.add_argument("--fake-polygon-port", type=int, default=8767)
+    parser.add_argument("--fake-redis-port", type=int, default=6390)
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument("--record", metavar="DIR", help="record every Polygon response into DIR")
+    group.add_argument("--replay", metavar="DIR", help="answer Polygon requests from a recording in DIR")
+    parser.add_argument("--json", metavar="PATH", help="also write the report as JSON")
+    args = parser.parse_args()
+
+    tickers = load_universe(args.tickers)
+    # read by config_chain / config_contract in the farmer processes
+    os.environ.update(POLYGON_API_KEY=FAKE_KEY, REDIS_HOST="127.0.0.1", REDIS_PORT=str(args.fake_redis_port),
+                      TQDM_DISABLE="1")
+    stats = None
+    if args.replay:
+        os.environ.update(HTTP_REPLAY_MODE="replay", HTTP_REPLAY_DIR=os.path.abspath(args.replay))
+    else:
+        _, app = start_in_thread(args.fake_polygon_port, strikes=args.strikes, expiries=args.expiries,
+                                 latency_ms=args.latency_ms, page_size=args.page_size)
+        stats = app["stats"]
+        os.environ["POLYGON_BASE_URL"] = f"http://127.0.0.1:{args.fake_polygon_port}"
+        if args.record:
+            os.environ.update(HTTP_REPLAY_MODE="record", HTTP_REPLAY_DIR=os.path.abspath(args.record))
+
+    start_fake_redis(args.fake_redis_port)
+    seed_prices(redis.Redis(host="127.0.0.1", port=args.fake_redis_port), tickers)
+
+    ctx = get_context("spawn")
+    results = ctx.Queue()
+    report = {"tickers": len(tickers), "mode": args.mode, "farmers": [],
+              "source": f"replay {args.replay}" if args.replay else
+              f"fake polygon, {args.strikes} strikes x {args.expiries} expiries, {args.latency_ms:g}ms"}
+    root = tempfile.mkdtemp(prefix="bench_suite_")
+    try:
+        workdir = prepare_workdir(root, tickers)
+        for name in FARMERS:
+            if name not in args.farmers:
+                continue
+            served = stats["requests"] if stats else 0
+            proc = ctx.Process(target=run_farmer, args=(name, args.mode, workdir, args.rate_limit, results))
+            proc.start()
+            proc.join()
+            if proc.exitcode != 0:
+                print(f"{name} failed with exit code {proc.exitcode}", file=sys.stderr)
+                break
+            result = results.get()
+            if stats:
+                result["server_requests"] = stats["requests"] - served
+            report["farmers"].append(result)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
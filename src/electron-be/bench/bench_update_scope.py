@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+"""
+Bytes per updater cycle: full chain snapshots (UPDATE_SCOPE "full") vs only the
+morning OptionChain windows (UPDATE_SCOPE "chain"), with a parity check of the rows.
+
+Run from src/electron-be:
+
+    python bench/bench_update_scope.py --tickers 60 --strikes 80 --expiries 30
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+PORT = int(os.environ.get("FAKE_POLYGON_PORT", 8766))
+os.environ["POLYGON_BASE_URL"] = f"http://127.0.0.1:{PORT}"
+
+import pandas as pd
+from loguru import logger
+
+from bench.fake_polygon import start_in_thread, build_chain, underlying_price_for
+from config_chain import DATA_LOCATE
+from utils import api_client
+from utils.contract_batch import batches_frame
+from utils.data_processing import chain_windows, window_partitions, convert_atm_string_to_number
+import OptionChainFarmer
+import UpdateContractsFarmer
+
+FAKE_KEY = "bench"
+
+
+def morning_chain(tickers, strikes, expiries):
+    """OptionChain_YYYYMMDD.csv rows as OptionChainFarmer would write them."""
+    batches = []
+    for ticker in tickers:
+        reference = [{"ticker": c["details"]["ticker"], "strike_price": c["details"]["strike_price"],
+                      "expiration_date": c["details"]["expiration_date"],
+                      "contract_type": c["details"]["contract_type"]}
+                     for c in build_chain(ticker, strikes, expiries)]
+        _, _, options = OptionChainFarmer.process_option_contract_data(reference, ticker, underlying_price_for(ticker))
+        batches.append(options)
+    return batches_frame(batches)
+
+
+def full_cycle(ticker, targets, settings, price):
+    data = api_client.fetch_contract_option(ticker, contract_type=None, apikey=FAKE_KEY)
+    _, _, options = UpdateContractsFarmer.process_update_contract_data(data, ticker, targets, settings, price)
+    return options
+
+
+def chain_cycle(ticker, windows, settings, price):
+    partitions = window_partitions(windows, price, settings)
+    data = api_client.fetch_contract_windows(ticker, partitions, apikey=FAKE_KEY)
+    _, _, options = UpdateContractsFarmer.process_window_update_data(data, ticker, windows, settings, price)
+    return options
+
+
+def run(name, func, args_list, stats, threads):
+    stats.update(requests=0, bytes=0)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as executor:
+        results = list(executor.map(lambda args: func(*args), args_list))
+    elapsed = time.perf_counter() - start
+    rows = sum(len(batch) for batch in results)
+    print(f"{name:<6} rows={rows:<7} requests={stats['requests']:<6} "
+          f"MB={stats['bytes'] / 1e6:9.2f}  wall={elapsed:6.2f}s")
+    return results, stats["bytes"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=60)
+    parser.add_argument("--strikes", type=int, default=80)
+    parser.add_argument("--expiries", type=int, default=30)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--drifts", type=float, nargs="+", default=[0.0, 0.4, 3.0],
+                        help="underlying moves since the morning run, in percent")
+    args = parser.parse_args()
+
+    logger.remove()
+    logger.add(sys.stderr, level="WARNING")
+    tickers = pd.read_csv(DATA_LOCATE["DATA_STOCKS_CSV"])["Symbol"].unique().tolist()[:args.tickers]
+    _, app = start_in_thread(PORT, strikes=args.strikes, expiries=args.expiries, latency_ms=0)
+    stats = app["stats"]
+
+    df = morning_chain(tickers, args.strikes, args.expiries)
+    targets = sorted(set(df['Expiry_X']))
+    settings = df['ATM_X'].apply(convert_atm_string_to_number).abs().max()
+    windows = chain_windows(df)
+    tickers = [t for t in tickers if t in windows]
+
+    for drift in args.drifts:
+        prices = {t: underlying_price_for(t) * (1 + drift / 100) for t in tickers}
+        print(f"--- underlying drift {drift:+.1f}%")
+        full, full_bytes = run("full", full_cycle,
+                               [(t, targets, settings, prices[t]) for t in tickers], stats, args.threads)
+        scoped, chain_bytes = run("chain", chain_cycle,
+                                  [(t, windows[t], settings, prices[t]) for t in tickers], stats, args.threads)
+        key = lambda rows: sorted((r['Option_Ticker'], r['Expiry_X'], r['ATM_X']) for batch in rows for r in batch.records())
+        print(f"bytes ratio {full_bytes / max(chain_bytes, 1):.1f}x  parity={'OK' if key(full) == key(scoped) else 'MISMATCH'}")
+
+
+if __name__ == "__main__":
+    main()
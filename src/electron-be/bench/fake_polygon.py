@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+Local fake Polygon.io server serving synthetic option chains.
+
+Point the clients at it with POLYGON_BASE_URL=http://127.0.0.1:<port> (set before
+config_chain / config_contract are imported) to measure the farmers offline.
+
+    python bench/fake_polygon.py --port 8765 --strikes 40 --expiries 20 --latency-ms 80
+"""
+import argparse
+import asyncio
+import random
+import re
+import threading
+import time
+import zlib
+from datetime import date, timedelta
+from urllib.parse import urlencode
+
+from aiohttp import web
+
+
+FILTER_OPS = {
+    "gte": lambda value, bound: value >= bound,
+    "gt": lambda value, bound: value > bound,
+    "lte": lambda value, bound: value <= bound,
+    "lt": lambda value, bound: value < bound,
+}
+
+OPTION_TICKER_RE = re.compile(r"O:(.+?)\d{6}[CP]\d{8}$")
+
+
+def underlying_price_for(ticker):
+    """Deterministic pseudo price so the Redis seeder and the chains agree."""
+    return float(20 + zlib.crc32(ticker.encode()) % 480)
+
+
+def build_chain(ticker, strikes=40, expiries=20, today=None):
+    """Snapshot-style contracts for one underlying, calls and puts."""
+    today = today or date.today()
+    rng = random.Random(ticker)
+    price = underlying_price_for(ticker)
+    step = 1.0 if price < 100 else 5.0
+    base = round(price / step) * step - step * (strikes // 2)
+    chain = []
+    for e in range(expiries):
+        expiry = (today + timedelta(days=7 * (e + 1))).isoformat()
+        for s in range(strikes):
+            strike = base + s * step
+            if strike <= 0:
+                continue
+            for side in ("call", "put"):
+                option_ticker = f"O:{ticker}{expiry[2:4]}{expiry[5:7]}{expiry[8:10]}" \
+                                f"{side[0].upper()}{int(strike * 1000):08d}"
+                mid = max(0.05, rng.uniform(0.1, 25))
+                chain.append({
+                    "details": {
+                        "ticker": option_ticker,
+                        "strike_price": strike,
+                        "expiration_date": expiry,
+                        "contract_type": side,
+                        "exercise_style": "american",
+                        "shares_per_contract": 100,
+                    },
+                    "greeks": {
+                        "delta": rng.uniform(-1, 1),
+                        "gamma": rng.uniform(0, 0.1),
+                        "theta": -rng.uniform(0, 0.5),
+                        "vega": rng.uniform(0, 0.5),
+                    },
+                    "implied_volatility": rng.uniform(0.1, 1.2),
+                    "open_interest": rng.randint(0, 50000),
+                    "last_quote": {"bid": mid * 0.98, "ask": mid * 1.02, "midpoint": mid},
+                    "last_trade": {"price": mid},
+                    "day": {
+                        "open": mid, "high": mid * 1.1, "low": mid * 0.9, "close": mid,
+                        "volume": rng.randint(0, 10000), "vwap": mid,
+                    },
+                    "underlying_asset": {"ticker": ticker, "price": price},
+                })
+    return chain
+
+
+def make_app(strikes=40, expiries=20, latency_ms=50.0, rate_limit=0, page_size=None):
+    """
+    Build the fake server.
+
+    Args:
+        strikes (int): Strikes per expiry in every synthetic chain.
+        expiries (int): Weekly expiries per chain.
+        latency_ms (float): Delay added to every response, to mimic the network.
+        rate_limit (int): Requests per second before answering 429 (0 = unlimited).
+        page_size (int): Cap on results per page below Polygon's own, to force more pages.
+    """
+    chains = {}
+    contracts = {}  # option ticker -> contract of the chains built so far
+    stats = {"requests": 0, "bytes": 0, "throttled": 0, "window": 0, "window_count": 0}
+
+    def chain_for(ticker):
+        if ticker not in chains:
+            chains[ticker] = build_chain(ticker, strikes, expiries)
+            contracts.update((c["details"]["ticker"], c) for c in chains[ticker])
+        return chains[ticker]
+
+    def page(request, rows, max_limit):
+        query = dict(request.query)
+        query.pop("apiKey", None)
+        cursor = int(query.pop("cursor", 0))
+        limit = min(int(query.pop("limit", max_limit)), max_limit, page_size or max_limit)
+        body = {"status": "OK", "results": rows[cursor:cursor + limit]}
+        if cursor + limit < len(rows):
+            next_query = {**query, "limit": limit, "cursor": cursor + limit}
+            body["next_url"] = f"{request.url.origin()}{request.path}?{urlencode(next_query)}"
+        return body
+
+    @web.middleware
+    async def throttle(request, handler):
+        if rate_limit:
+            window = int(time.time())
+            if window != stats["window"]:
+                stats["window"], stats["window_count"] = window, 0
+            stats["window_count"] += 1
+            if stats["window_count"] > rate_limit:
+                stats["throttled"] += 1
+                return web.json_response({"status": "ERROR", "error": "rate limited"}, status=429,
+                                         headers={"Retry-After": "1"})
+        response = await handler(request)
+        stats["bytes"] += len(response.body or b"")
+        return response
+
+    async def delay():
+        stats["requests"] += 1
+        if latency_ms:
+            await asyncio.sleep(latency_ms / 1000)
+
+    def matches(details, query):
+        for field, cast in (("strike_price", float), ("expiration_date", str)):
+            value = details[field]
+            if field in query and value != cast(query[field]):
+                return False
+            for op, check in FILTER_OPS.items():
+                key = f"{field}.{op}"
+                if key in query and not check(value, cast(query[key])):
+                    return False
+        return True
+
+    async def snapshot_chain(request):
+        await delay()
+        q = request.query
+        rows = [c for c in chain_for(request.match_info["ticker"]) if matches(c["details"], q)]
+        if q.get("contract_type"):
+            rows = [c for c in rows if c["details"]["contract_type"] == q["contract_type"]]
+        return web.json_response(page(request, rows, 250))
+
+    async def snapshot_contract(request):
+        await delay()
+        option_ticker = request.match_info["option_ticker"]
+        for contract in chain_for(request.match_info["ticker"]):
+            if contract["details"]["ticker"] == option_ticker:
+                return web.json_response({"status": "OK", "results": contract})
+        return web.json_response({"status": "NOT_FOUND"}, status=404)
+
+    async def snapshot_multi(request):
+        await delay()
+        rows = []
+        for option_ticker in request.query.get("ticker.any_of", "").split(","):
+            match = OPTION_TICKER_RE.match(option_ticker)
+            if match:
+                chain_for(match.group(1))
+            contract = contracts.get(option_ticker)
+            if contract is None:
+                rows.append({"ticker": option_ticker, "error": "NOT_FOUND", "message": "Ticker not found."})
+            else:
+                rows.append({**contract, "ticker": option_ticker, "type": "options"})
+        return web.json_response(page(request, rows, 250))
+
+    async def reference_contracts(request):
+        await delay()
+        q = request.query
+        rows = [{
+            "ticker": c["details"]["ticker"],
+            "underlying_ticker": q["underlying_ticker"],
+            "strike_price": c["details"]["strike_price"],
+            "expiration_date": c["details"]["expiration_date"],
+            "contract_type": c["details"]["contract_type"],
+        } for c in chain_for(q["underlying_ticker"]) if matches(c["details"], q)]
+        return web.json_response(page(request, rows, 1000))
+
+    app = web.Application(middlewares=[throttle])
+    app["stats"] = stats
+    app.router.add_get("/v3/snapshot/options/{ticker}", snapshot_chain)
+    app.router.add_get("/v3/snapshot/options/{ticker}/{option_ticker}", snapshot_contract)
+    app.router.add_get("/v3/reference/options/contracts", reference_contracts)
+    app.router.add_get("/v3/snapshot", snapshot_multi)
+    return app
+
+
+def start_in_thread(port=8765, **kwargs):
+    """Run the fake server on a daemon thread; returns (base_url, app)."""
+    app = make_app(**kwargs)
+    ready = threading.Event()
+
+    def serve():
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        runner = web.AppRunner(app)
+        loop.run_until_complete(runner.setup())
+        loop.run_until_complete(web.TCPSite(runner, "127.0.0.1", port).start())
+        ready.set()
+        loop.run_forever()
+
+    threading.Thread(target=serve, daemon=True).start()
+    ready.wait()
+    return f"http://127.0.0.1:{port}", app
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fake Polygon.io option endpoints")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--strikes", type=int, default=40)
+    parser.add_argument("--expiries", type=int, default=20)
+    parser.add_argument("--latency-ms", type=float, default=50.0)
+    parser.add_argument("--rate-limit", type=int, default=0)
+    parser.add_argument("--page-size", type=int, default=None)
+    args = parser.parse_args()
+    web.run_app(make_app(args.strikes, args.expiries, args.latency_ms, args.rate_limit, args.page_size),
+                host="127.0.0.1", port=args.port)
@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+"""
+Seed TRADE_US_<ticker> price hashes, in a local redis-server or in fakeredis.
+
+    python bench/seed_redis.py                 # local redis from config_chain
+    python bench/seed_redis.py --tickers 100
+"""
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+import redis
+
+from bench.fake_polygon import underlying_price_for
+from config_chain import DATA_LOCATE, REDIS_HOST, REDIS_PORT, REDIS_PASSWORD
+
+
+def load_universe(limit=None):
+    tickers = pd.read_csv(DATA_LOCATE["DATA_STOCKS_CSV"])["Symbol"].unique().tolist()
+    return tickers[:limit] if limit else tickers
+
+
+def fake_redis_pool():
+    """ConnectionPool over one in-memory fakeredis server, drop-in for api_client._REDIS_POOL."""
+    import fakeredis
+
+    return redis.ConnectionPool(connection_class=fakeredis.FakeConnection, server=fakeredis.FakeServer(),
+                                decode_responses=True)
+
+
+def seed_prices(client, tickers):
+    """Write the same pseudo prices the fake Polygon chains are centred on."""
+    pipe = client.pipeline(transaction=False)
+    for ticker in tickers:
+        price = underlying_price_for(ticker)
+        pipe.hset("TRADE_US_" + ticker, mapping={"last": price, "bid": price - 0.01, "ask": price + 0.01})
+    pipe.execute()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--tickers", type=int, default=None)
+    args = parser.parse_args()
+    tickers = load_universe(args.tickers)
+    seed_prices(redis.Redis(host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PASSWORD, db=0), tickers)
+    print(f"Seeded {len(tickers)} TRADE_US_* hashes on {REDIS_HOST}:{REDIS_PORT}")
@@ -4,9 +4,47 @@ Shared configuration
 """
 import os
 
-API_KEY = ""
+API_KEY = os.environ.get("POLYGON_API_KEY", "")
+POLYGON_BASE_URL = os.environ.get("POLYGON_BASE_URL", "https://api.polygon.io")
+
+# "record": save every Polygon response under HTTP_REPLAY_DIR, "replay": answer from it offline
+HTTP_REPLAY_MODE = os.environ.get("HTTP_REPLAY_MODE")
+HTTP_REPLAY_DIR = os.environ.get("HTTP_REPLAY_DIR", "../../bench_data/http")
+
+# Counters and histograms of spawn workers, one file per process, summed by GET /metrics
+METRICS_DIR = os.environ.get("METRICS_DIR", "../../metrics")
 
 MAX_THREADS = os.cpu_count()
+
+# "pool": one spawn process per CPU, "async": whole universe on one event loop
+FETCH_MODE = "pool"
+ASYNC_CONCURRENCY = 64
+# Seconds per async request (connect, send, read the body); timeouts are retried
+ASYNC_TIMEOUT_SEC = 30
+ASYNC_CONNECT_TIMEOUT_SEC = 10
+
+# Polygon request budget shared by every worker process (0 disables the limiter)
+RATE_LIMIT_PER_SEC = 80
+RATE_LIMIT_BURST = 20
+
+# Chains longer than one page are re-fetched as expiry partitions paged in parallel.
+# Snapshot chains split at today + N days, reference windows into equal slices.
+PAGINATION_EXPIRY_BOUNDS_DAYS = [10, 30, 60, 120, 250]
+PAGINATION_SPLITS = 4
+
+# Single contracts are snapshotted through /v3/snapshot?ticker.any_of=..., at most
+# MULTI_SNAPSHOT_TICKERS per request (Polygon's cap), MULTI_SNAPSHOT_THREADS requests at a time
+MULTI_SNAPSHOT_TICKERS = 250
+MULTI_SNAPSHOT_THREADS = 8
+
+# On-disk cache of /v3/reference/options/contracts listings, shared by every worker process.
+# Strike windows are widened to multiples of REFERENCE_CACHE_STRIKE_GRID so a moved price still hits.
+REFERENCE_CACHE = True
+REFERENCE_CACHE_DB = "../../option_chain_ATM_tickers/reference_cache.sqlite"
+REFERENCE_CACHE_TTL_SEC = 6 * 3600
+REFERENCE_CACHE_MAX_BYTES = 256 * 1024 * 1024
+REFERENCE_CACHE_STRIKE_GRID = 25
+
 ATM_STRIKE_PRICE_SETTING = 5
 TARGETS_DAYS = [7, 30, 45, 75, 90]
 
@@ -23,6 +61,10 @@ OUTPUT_DIR = "expiry_data"
 TICKER_DIR = "../../option_tickers"
 ATM_TICKER_DIR = "../../option_chain_ATM_tickers"
 
-REDIS_HOST = 'localhost'
-REDIS_PORT = 6379
+REDIS_HOST = os.environ.get("REDIS_HOST", 'localhost')
+REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
 REDIS_PASSWORD = None
+# Ticker results queued for the option chain CSV/Redis writer before the farm waits for it
+CHAIN_WRITE_QUEUE = 64
+# save_to_redis also writes the old single-blob OptionChain_YYYYMMDD key for external readers
+LEGACY_REDIS_CHAIN = False
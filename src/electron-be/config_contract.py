@@ -4,13 +4,40 @@ Shared configuration
 """
 import os
 
-API_KEY = ""
+API_KEY = os.environ.get("POLYGON_API_KEY", "")
+POLYGON_BASE_URL = os.environ.get("POLYGON_BASE_URL", "https://api.polygon.io")
 MAX_THREADS = os.cpu_count()
 
+# "pool": one spawn process per CPU, "async": whole universe on one event loop
+FETCH_MODE = "pool"
+ASYNC_CONCURRENCY = 64
+
+# Polygon request budget shared by every worker process (0 disables the limiter)
+RATE_LIMIT_PER_SEC = 80
+RATE_LIMIT_BURST = 20
+
 OUTPUT_DIR = "expiry_data"
 TICKER_DIR = "../../option_tickers"
+# Parquet dataset of contracts, partitioned date=YYYY-MM-DD/symbol=SYM
+CONTRACT_DATASET_DIR = "../../option_tickers/dataset"
+# Also write the old one-CSV-per-contract files into TICKER_DIR
+LEGACY_CONTRACT_FILES = False
+# Append-only SQLite history of updater cycles, keyed by option ticker and cycle time
+HISTORY_DB = "../../option_tickers/Updater/history.sqlite"
+# Also write a full OptionContracts_YYYYMMDD_HHMM.csv every cycle
+UPDATER_CSV_SNAPSHOTS = False
+# "full": re-snapshot every chain each cycle, "chain": only the contracts of the morning
+# OptionChain_YYYYMMDD.csv, fetched with expiration_date / strike_price filtered snapshots
+UPDATE_SCOPE = "full"
+# Updater cycles start on timeframe boundaries; symbols not started within this share
+# of the timeframe are carried over to the next cycle
+UPDATER_DEADLINE_FRACTION = 0.8
+# Change events of every updater cycle: None, "stream" (XADD, trimmed to UPDATER_STREAM_MAXLEN) or "pubsub"
+UPDATER_EVENTS = None
+UPDATER_EVENTS_KEY = "OptionUpdater:changes"
+UPDATER_STREAM_MAXLEN = 1000
 ATM_TICKER_DIR = "../../option_chain_ATM_tickers"
 
-REDIS_HOST = 'localhost'
-REDIS_PORT = 6379
+REDIS_HOST = os.environ.get("REDIS_HOST", 'localhost')
+REDIS_PORT = int(os.environ.get("REDIS_PORT", 6379))
 REDIS_PASSWORD = None
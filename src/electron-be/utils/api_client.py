@@ -1,3 +1,9 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from itertools import chain
+from operator import attrgetter, itemgetter
+
 import requests
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
@@ -5,10 +11,21 @@ import redis
 from loguru import logger
 
 # Import your config variables
-from config_chain import API_KEY, REDIS_HOST, REDIS_PORT, REDIS_PASSWORD
+from config_chain import API_KEY, POLYGON_BASE_URL, REDIS_HOST, REDIS_PORT, REDIS_PASSWORD
+from config_chain import PAGINATION_EXPIRY_BOUNDS_DAYS, PAGINATION_SPLITS, HTTP_REPLAY_MODE, HTTP_REPLAY_DIR
+from config_chain import MULTI_SNAPSHOT_TICKERS, MULTI_SNAPSHOT_THREADS
+from utils.metrics import HTTP_SECONDS, HTTP_RESPONSES, HTTP_RETRIES, PAGES, endpoint_label
+from utils.http_replay import ReplayAdapter, ReplayStore
+from utils.http_cache import reference_cache, cached_strike_window, within_strikes
+from utils.rate_limiter import retry_after_seconds
+from utils.snapshot_records import decode_page, decode_snapshot_page
 
 _SESSION = None
 _API_KEY = None
+_LIMITER = None
+_REDIS_POOL = None
+
+RATE_LIMIT_RETRIES = 5
 
 
 def build_session():
@@ -16,25 +33,67 @@ def build_session():
     retry = Retry(
         total=5,
         backoff_factor=0.5,  # 0.5, 1.0, 2.0, ...
-        status_forcelist=[429, 500, 502, 503, 504],
+        # 429s are handled in limited_get so every worker backs off together
+        status_forcelist=[500, 502, 503, 504],
         allowed_methods=frozenset(["GET"]),
         raise_on_status=False,
     )
-    adapter = HTTPAdapter(max_retries=retry, pool_connections=100, pool_maxsize=100)
+    adapter_kwargs = dict(max_retries=retry, pool_connections=100, pool_maxsize=100)
+    if HTTP_REPLAY_MODE:
+        adapter = ReplayAdapter(ReplayStore(HTTP_REPLAY_DIR), HTTP_REPLAY_MODE, **adapter_kwargs)
+    else:
+        adapter = HTTPAdapter(**adapter_kwargs)
     s.mount("http://", adapter)
     s.mount("https://", adapter)
     s.headers.update({"Connection": "keep-alive"})
     return s
 
 
-def init_pool_worker(api_key=API_KEY):
-    global _SESSION, _API_KEY
+def init_pool_worker(api_key=API_KEY, limiter=None):
+    global _SESSION, _API_KEY, _LIMITER
     _API_KEY = api_key
     _SESSION = build_session()
+    _LIMITER = limiter
+
+
+def limited_get(sess, url, params):
+    """
+    GET through the shared rate limiter. A 429 pauses every worker for the
+    Retry-After time (or an exponential backoff) before the request is retried.
+    """
+    endpoint = endpoint_label(url)
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        if _LIMITER is not None:
+            _LIMITER.acquire()
+        with HTTP_SECONDS.time(endpoint=endpoint):
+            resp = sess.get(url, params=params)
+        HTTP_RESPONSES.inc(endpoint=endpoint, status=resp.status_code)
+        retries = getattr(resp.raw, "retries", None)  # urllib3 Retry of 5xx answers
+        if retries is not None and retries.history:
+            HTTP_RETRIES.inc(len(retries.history), endpoint=endpoint, reason="5xx")
+        if resp.status_code != 429 or attempt == RATE_LIMIT_RETRIES:
+            return resp
+        HTTP_RETRIES.inc(endpoint=endpoint, reason="429")
+        wait = retry_after_seconds(resp.headers.get("Retry-After"), default=0.5 * (2 ** attempt))
+        logger.debug(f"429 from Polygon, backing off {wait:.1f}s")
+        if _LIMITER is not None:
+            _LIMITER.pause(wait)
+        else:
+            time.sleep(wait)
+    return resp
+
+
+def get_redis():
+    """Redis client backed by one connection pool per process, created on first use."""
+    global _REDIS_POOL
+    if _REDIS_POOL is None:
+        _REDIS_POOL = redis.ConnectionPool(host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PASSWORD, db=0,
+                                           decode_responses=True)
+    return redis.Redis(connection_pool=_REDIS_POOL)
 
 
 def fetch_redis(ticker, attribute="last"):
-    redisConn = redis.Redis(host=REDIS_HOST, port=REDIS_PORT, password=REDIS_PASSWORD, db=0, decode_responses=True)
+    redisConn = get_redis()
     quotePrice = redisConn.hgetall("TRADE_US_" + ticker)
     try:
         if quotePrice != None:
@@ -44,10 +103,135 @@ def fetch_redis(ticker, attribute="last"):
         return None
 
 
+def fetch_redis_bulk(tickers, attribute="last"):
+    """
+    Read one TRADE_US_<ticker> attribute for many tickers in a single pipelined round trip.
+
+    Args:
+        tickers (list): Stock symbols
+        attribute (str): Hash field to read
+
+    Returns:
+        dict: ticker -> float, or None when the hash or field is missing
+    """
+    tickers = list(tickers)
+    pipe = get_redis().pipeline(transaction=False)
+    for ticker in tickers:
+        pipe.hget("TRADE_US_" + ticker, attribute)
+    prices = {}
+    for ticker, value in zip(tickers, pipe.execute()):
+        try:
+            prices[ticker] = float(value) if value is not None else None
+        except ValueError:
+            prices[ticker] = None
+        if prices[ticker] is None:
+            logger.warning(f"Attribute {attribute} not found for symbols {ticker} in Redis")
+    return prices
+
+
+def expiry_partitions(edges, start_date=None, end_date=None):
+    """
+    Split an expiration window into disjoint Polygon expiration_date filters.
+
+    Args:
+        edges (list): Boundary dates, each one starts a new partition.
+        start_date (datetime.date): Lower bound of the window, open if None.
+        end_date (datetime.date): Upper bound of the window, open if None.
+
+    Returns:
+        list: One params dict per partition, together covering the whole window.
+    """
+    edges = sorted(e for e in set(edges)
+                   if (start_date is None or e > start_date) and (end_date is None or e <= end_date))
+    partitions = []
+    lower = start_date
+    for edge in edges:
+        partition = {"expiration_date.lt": edge.isoformat()}
+        if lower is not None:
+            partition["expiration_date.gte"] = lower.isoformat()
+        partitions.append(partition)
+        lower = edge
+    last = {}
+    if lower is not None:
+        last["expiration_date.gte"] = lower.isoformat()
+    if end_date is not None:
+        last["expiration_date.lte"] = end_date.isoformat()
+    partitions.append(last)
+    return partitions
+
+
+# The first page is requested by expiration date, so the partitions can pick up where it stops
+EXPIRY_SORT = {"sort": "expiration_date", "order": "asc"}
+
+
+def split_first_page(results, expiry_of):
+    """
+    Split the first page of a chain sorted by expiration date that has a next_url.
+
+    Its expiries before the last one are complete. The last one may go on on the
+    next page, so the rest of the chain is requested from that expiry on.
+
+    Args:
+        results (list): First page results
+        expiry_of: Result -> its 'YYYY-MM-DD' expiration date
+
+    Returns:
+        tuple: (results to keep, datetime.date the partitions start at, None for an empty page)
+    """
+    if not results:
+        return [], None
+    last = expiry_of(results[-1])
+    return [r for r in results if expiry_of(r) < last], date.fromisoformat(last)
+
+
+def snapshot_partition_edges():
+    today = date.today()
+    return [today + timedelta(days=d) for d in PAGINATION_EXPIRY_BOUNDS_DAYS]
+
+
+def reference_partition_edges(start_date, end_date):
+    step = (end_date - start_date) / PAGINATION_SPLITS
+    return [start_date + step * i for i in range(1, PAGINATION_SPLITS)]
+
+
+def walk_pages(sess, url, params, apikey, decode=decode_page):
+    """
+    Follow next_url from url until the last page.
+
+    Args:
+        decode: Page body -> dict with 'results' and 'next_url', e.g. decode_snapshot_page
+
+    Returns:
+        list: One results list per page. Raises requests.HTTPError on a bad status.
+    """
+    pages = []
+    while url:
+        resp = limited_get(sess, url, params)
+        resp.raise_for_status()
+        data = decode(resp.content)
+        pages.append(data.get("results", []))
+        url = data.get("next_url")
+        params = {"apiKey": apikey}
+    return pages
+
+
+def walk_partitions(sess, url, params, partitions, apikey, decode=decode_page):
+    """Walk every expiry partition on its own thread so a long chain pages in parallel."""
+    with ThreadPoolExecutor(max_workers=len(partitions)) as executor:
+        futures = [executor.submit(walk_pages, sess, url, {**params, **partition}, apikey, decode)
+                   for partition in partitions]
+        return [page for future in futures for page in future.result()]
+
+
 def fetch_contract_option(ticker, contract_type, max_limit=250, apikey=API_KEY):
     """
     Fetch call option chain data from Polygon.io API for a given ticker
 
+    A chain that does not fit on one page keeps that page and requests the
+    expiries after it as expiration_date partitions (PAGINATION_EXPIRY_BOUNDS_DAYS)
+    that are paged concurrently, so names like SPY no longer walk dozens of
+    next_url pages in series.
+
     Args:
         ticker (str): Stock symbol to fetch options for
         api_key (str): Polygon.io API key
@@ -59,46 +243,82 @@ def fetch_contract_option(ticker, contract_type, max_limit=250, apikey=API_KEY):
     if apikey is None or len(apikey) == 0:
         logger.warning(f"Missing API")
         return
-    url = f"https://api.polygon.io/v3/snapshot/options/{ticker}"
+    url = f"{POLYGON_BASE_URL}/v3/snapshot/options/{ticker}"
     if contract_type == None:
-        params = {"limit": max_limit, "apiKey": apikey}
+        params = {"limit": max_limit, "apiKey": apikey, **EXPIRY_SORT}
     else:
-        params = {'contract_type': contract_type, "limit": max_limit, "apiKey": apikey}
+        params = {'contract_type': contract_type, "limit": max_limit, "apiKey": apikey, **EXPIRY_SORT}
 
-    all_results = []
     sess = _SESSION or build_session()
+    start = time.perf_counter()
     try:
-        if max_limit < 250:
-            try:
-                resp = sess.get(url, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-                all_results.extend(data.get("results", []))
-            except requests.HTTPError as e:
-                if resp.status_code == 401:
-                    logger.warning(f"Please check your API key: {apikey}")
-                else:
-                    logger.warning(f"Error fetching data: {resp.status_code}")
-                return None
-
-            return {'results': all_results} if all_results else None
-        else:
-            while url:
-                try:
-                    resp = sess.get(url, params=params)
-                    resp.raise_for_status()
-                    data = resp.json()
-                    all_results.extend(data.get("results", []))
-                    url = data.get("next_url")
-                    params = {"apiKey": apikey} if url else {}
-                except requests.HTTPError as e:
-                    if resp.status_code == 401:
-                        logger.warning(f"Please check your API key: {apikey}")
-                    else:
-                        logger.warning(f"Error fetching data: {resp.status_code}")
-                    return None
-
-            return {'results': all_results} if all_results else None
+        try:
+            resp = limited_get(sess, url, params)
+            resp.raise_for_status()
+            data = decode_snapshot_page(resp.content)
+            pages = [data.get("results", [])]
+            if max_limit >= 250 and data.get("next_url"):
+                kept, resume = split_first_page(pages[0], attrgetter('expiration_date'))
+                partitions = expiry_partitions(snapshot_partition_edges(), resume)
+                pages = [kept] + walk_partitions(sess, url, params, partitions, apikey, decode_snapshot_page)
+        except requests.HTTPError as e:
+            if e.response.status_code == 401:
+                logger.warning(f"Please check your API key: {apikey}")
+            else:
+                logger.warning(f"Error fetching data: {e.response.status_code}")
+            return None
+
+        all_results = list(chain.from_iterable(pages))
+        PAGES.observe(len(pages), endpoint=endpoint_label(url))
+        logger.debug(f"Fetched {len(all_results)} contracts for {ticker} in {len(pages)} pages, "
+                     f"{time.perf_counter() - start:.2f}s")
+        return {'results': all_results} if all_results else None
+
+    except Exception as e:
+        logger.warning(f"Fetch failed for {ticker} | Error: {e}")
+        return None
+
+
+def fetch_contract_windows(ticker, partitions, max_limit=250, apikey=API_KEY):
+    """
+    Snapshot only some slices of a chain instead of the whole of it.
+
+    Args:
+        ticker (str): Stock symbol to fetch options for
+        partitions (list): Filter params per slice, e.g.
+            {'expiration_date': '2025-01-17', 'strike_price.gte': 140, 'strike_price.lte': 160};
+            the slices are paged concurrently
+        max_limit (int): Maximum number of results per page
+
+    Returns:
+        dict: {'results': [...]} or None if error occurs
+    """
+    global _SESSION
+    if apikey is None or len(apikey) == 0:
+        logger.warning(f"Missing API")
+        return
+    if not partitions:
+        return None
+    url = f"{POLYGON_BASE_URL}/v3/snapshot/options/{ticker}"
+    params = {"limit": max_limit, "apiKey": apikey}
+
+    sess = _SESSION or build_session()
+    start = time.perf_counter()
+    try:
+        try:
+            pages = walk_partitions(sess, url, params, partitions, apikey, decode_snapshot_page)
+        except requests.HTTPError as e:
+            if e.response.status_code == 401:
+                logger.warning(f"Please check your API key: {apikey}")
+            else:
+                logger.warning(f"Error fetching data: {e.response.status_code}")
+            return None
+
+        all_results = list(chain.from_iterable(pages))
+        PAGES.observe(len(pages), endpoint=endpoint_label(url))
+        logger.debug(f"Fetched {len(all_results)} contracts for {ticker} from {len(partitions)} windows, "
+                     f"{time.perf_counter() - start:.2f}s")
+        return {'results': all_results} if all_results else None
 
     except Exception as e:
         logger.warning(f"Fetch failed for {ticker} | Error: {e}")
@@ -106,9 +326,38 @@ def fetch_contract_option(ticker, contract_type, max_limit=250, apikey=API_KEY):
 
 
 def fetch_reference_option(ticker, top_sp, bottom_sp, start_date, end_date, max_limit=1000, apikey=API_KEY):
+    """
+    Reference contracts of ticker with strikes in [bottom_sp, top_sp], served from the
+    on-disk reference cache when REFERENCE_CACHE is on.
+
+    On a miss the strike window widened to REFERENCE_CACHE_STRIKE_GRID is fetched and
+    cached, so a later call whose window moved with the price still hits.
+
+    Returns:
+        list: Reference contracts, or None if error occurs.
+    """
+    cache = reference_cache()
+    if cache is None:
+        return _fetch_reference_listing(ticker, top_sp, bottom_sp, start_date, end_date, max_limit, apikey)
+    results = cache.get(ticker, bottom_sp, top_sp, start_date, end_date)
+    if results is not None:
+        return results
+    low, high = cached_strike_window(bottom_sp, top_sp)
+    results = _fetch_reference_listing(ticker, high, low, start_date, end_date, max_limit, apikey)
+    if results is None:
+        return None
+    cache.put(ticker, low, high, start_date, end_date, results)
+    return within_strikes(results, bottom_sp, top_sp)
+
+
+def _fetch_reference_listing(ticker, top_sp, bottom_sp, start_date, end_date, max_limit=1000, apikey=API_KEY):
     """
     Fetch call option chain data from Polygon.io API for a given ticker.
 
+    When the first page has a next_url it is kept, and the rest of the window, from
+    the page's last expiry to end_date, is split into PAGINATION_SPLITS expiry
+    partitions that are paged concurrently.
+
     Args:
         ticker (str): Stock symbol to fetch options for.
         max_limit (int): Maximum number of results per page.
@@ -125,36 +374,45 @@ def fetch_reference_option(ticker, top_sp, bottom_sp, start_date, end_date, max_
         logger.warning("Missing API key.")
         return None
 
-    url = "https://api.polygon.io/v3/reference/options/contracts"
+    url = f"{POLYGON_BASE_URL}/v3/reference/options/contracts"
     params = {
         "underlying_ticker": ticker,
         "strike_price.gte": bottom_sp,
         "strike_price.lte": top_sp,
+        "apiKey": apikey,
+        "limit": max_limit,
+        **EXPIRY_SORT,
+    }
+    window = {
         "expiration_date.gte": start_date.isoformat(),
         "expiration_date.lte": end_date.isoformat(),
-        "apiKey": apikey,
-        "limit": max_limit
     }
 
-    all_results = []
     sess = _SESSION or build_session()
+    start = time.perf_counter()
 
     try:
-        while url:
-            try:
-                resp = sess.get(url, params=params)
-                resp.raise_for_status()
-                data = resp.json()
-                all_results.extend(data.get("results", []))
-                url = data.get("next_url")
-                params = {"apiKey": apikey} if url else {}
-            except requests.HTTPError:
-                if resp.status_code == 401:
-                    logger.warning(f"Invalid API key: {apikey}")
-                else:
-                    logger.warning(f"HTTP error {resp.status_code} while fetching data.")
-                return None
+        try:
+            resp = limited_get(sess, url, {**params, **window})
+            resp.raise_for_status()
+            data = decode_page(resp.content)
+            pages = [data.get("results", [])]
+            if data.get("next_url"):
+                kept, resume = split_first_page(pages[0], itemgetter('expiration_date'))
+                resume = resume or start_date
+                partitions = expiry_partitions(reference_partition_edges(resume, end_date), resume, end_date)
+                pages = [kept] + walk_partitions(sess, url, params, partitions, apikey)
+        except requests.HTTPError as e:
+            if e.response.status_code == 401:
+                logger.warning(f"Invalid API key: {apikey}")
+            else:
+                logger.warning(f"HTTP error {e.response.status_code} while fetching data.")
+            return None
 
+        all_results = list(chain.from_iterable(pages))
+        PAGES.observe(len(pages), endpoint=endpoint_label(url))
+        logger.debug(f"Fetched {len(all_results)} reference contracts for {ticker} in {len(pages)} pages, "
+                     f"{time.perf_counter() - start:.2f}s")
         return all_results
 
     except Exception as e:
@@ -165,12 +423,12 @@ def fetch_reference_option(ticker, top_sp, bottom_sp, start_date, end_date, max_
 def fetch_option_snapshot(ticker, option_ticker):
     global _SESSION, _API_KEY
 
-    url = f"https://api.polygon.io/v3/snapshot/options/{ticker}/{option_ticker}"
+    url = f"{POLYGON_BASE_URL}/v3/snapshot/options/{ticker}/{option_ticker}"
     params = {"apiKey": _API_KEY}
 
     sess = _SESSION or build_session()  # fallback for non-pool usage
     try:
-        response = sess.get(url, params=params)
+        response = limited_get(sess, url, params)
         response.raise_for_status()
         data = response.json()
         if not data or "results" not in data:
@@ -179,4 +437,47 @@ def fetch_option_snapshot(ticker, option_ticker):
         return data
     except requests.exceptions.RequestException as e:
         logger.warning(f"Fetch failed for {ticker} {option_ticker} | {e}")
-        return None
\ No newline at end of file
+        return None
+
+def fetch_option_snapshots(option_tickers, batch_size=MULTI_SNAPSHOT_TICKERS, apikey=None):
+    """
+    Snapshot many single contracts at once through the unified /v3/snapshot endpoint.
+
+    Tickers are requested batch_size at a time with ticker.any_of, and the
+    batches are paged on MULTI_SNAPSHOT_THREADS threads, so the number of
+    requests grows with the batches instead of with the contracts.
+
+    Args:
+        option_tickers (list): Option tickers like O:AAPL250117C00150000
+        batch_size (int): Tickers per request
+
+    Returns:
+        dict: option ticker -> snapshot result, tickers without a result are left out
+    """
+    apikey = apikey or _API_KEY or API_KEY
+    option_tickers = list(dict.fromkeys(option_tickers))
+    if not option_tickers:
+        return {}
+    url = f"{POLYGON_BASE_URL}/v3/snapshot"
+    sess = _SESSION or build_session()
+
+    def fetch_batch(batch):
+        params = {"ticker.any_of": ",".join(batch), "limit": batch_size, "apiKey": apikey}
+        try:
+            pages = walk_pages(sess, url, params, apikey)
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Fetch failed for {len(batch)} contracts from {batch[0]} | {e}")
+            return []
+        PAGES.observe(len(pages), endpoint=endpoint_label(url))
+        return list(chain.from_iterable(pages))
+
+    batches = [option_tickers[i:i + batch_size] for i in range(0, len(option_tickers), batch_size)]
+    with ThreadPoolExecutor(max_workers=min(MULTI_SNAPSHOT_THREADS, len(batches))) as executor:
+        results = list(chain.from_iterable(executor.map(fetch_batch, batches)))
+    snapshots = {}
+    for result in results:
+        option_ticker = result.get("ticker") or (result.get("details") or {}).get("ticker")
+        if option_ticker and not result.get("error"):
+            snapshots[option_ticker] = result
+    logger.debug(f"Snapshotted {len(snapshots)}/{len(option_tickers)} contracts in {len(batches)} batches")
+    return snapshots
@@ -0,0 +1,335 @@
+import asyncio
+import time
+from itertools import chain
+from operator import attrgetter, itemgetter
+
+import aiohttp
+from loguru import logger
+
+from config_chain import API_KEY, POLYGON_BASE_URL, ASYNC_CONCURRENCY, HTTP_REPLAY_MODE, HTTP_REPLAY_DIR
+from config_chain import ASYNC_TIMEOUT_SEC, ASYNC_CONNECT_TIMEOUT_SEC
+from utils.api_client import expiry_partitions, snapshot_partition_edges, reference_partition_edges
+from utils.api_client import EXPIRY_SORT, split_first_page
+from utils.metrics import HTTP_SECONDS, HTTP_RESPONSES, HTTP_RETRIES, PAGES, endpoint_label
+from utils.http_replay import ReplayStore
+from utils.http_cache import reference_cache, cached_strike_window, within_strikes
+from utils.rate_limiter import retry_after_seconds
+from utils.snapshot_records import decode_page, decode_snapshot_page
+
+_SESSION = None
+_SEMAPHORE = None
+_API_KEY = None
+_LIMITER = None
+_REPLAY = None
+
+RETRY_TOTAL = 5
+RETRY_BACKOFF = 0.5  # 0.5, 1.0, 2.0, ...
+RETRY_STATUS = frozenset([429, 500, 502, 503, 504])
+
+
+async def init_async_client(api_key=API_KEY, concurrency=ASYNC_CONCURRENCY, limiter=None):
+    """
+    Open the shared aiohttp session for the running event loop.
+
+    Args:
+        api_key (str): Polygon.io API key used when callers do not pass one.
+        concurrency (int): Maximum number of requests in flight at once.
+        limiter (SharedTokenBucket): Optional requests-per-second budget.
+    """
+    global _SESSION, _SEMAPHORE, _API_KEY, _LIMITER, _REPLAY
+    _API_KEY = api_key
+    _LIMITER = limiter
+    _REPLAY = ReplayStore(HTTP_REPLAY_DIR) if HTTP_REPLAY_MODE else None
+    _SEMAPHORE = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency, ttl_dns_cache=300)
+    timeout = aiohttp.ClientTimeout(total=ASYNC_TIMEOUT_SEC, sock_connect=ASYNC_CONNECT_TIMEOUT_SEC)
+    _SESSION = aiohttp.ClientSession(connector=connector, timeout=timeout, headers={"Connection": "keep-alive"})
+
+
+async def cancel_pending(tasks):
+    """Cancel the tasks not done yet and wait for them, so none is left using the session when it closes."""
+    pending = [task for task in tasks if not task.done()]
+    for task in pending:
+        task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+
+
+async def close_async_client():
+    global _SESSION, _SEMAPHORE
+    if _SESSION is not None:
+        await _SESSION.close()
+    _SESSION = None
+    _SEMAPHORE = None
+
+
+async def _get_json(url, params, decode=decode_page):
+    """
+    GET a Polygon URL and decode the body, retrying like the sync session's urllib3 Retry.
+
+    Dropped connections and timeouts are retried with the same backoff as 5xx answers.
+
+    Args:
+        decode: Body bytes -> page dict, e.g. decode_snapshot_page
+
+    Returns:
+        tuple: (status_code, json_body or None)
+
+    Raises:
+        aiohttp.ClientConnectionError, asyncio.TimeoutError: The last attempt's error
+    """
+    if _SESSION is None:
+        raise RuntimeError("Async client not initialised, call init_async_client() first")
+
+    endpoint = endpoint_label(url)
+    status = None
+    for attempt in range(RETRY_TOTAL + 1):
+        if _LIMITER is not None:
+            await _LIMITER.acquire_async()
+        if HTTP_REPLAY_MODE == "replay":
+            return _replay(url, params, decode)
+        try:
+            async with _SEMAPHORE:
+                start = time.perf_counter()
+                async with _SESSION.get(url, params=params) as resp:
+                    status = resp.status
+                    body = await resp.read()
+                    HTTP_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint)
+                    HTTP_RESPONSES.inc(endpoint=endpoint, status=status)
+                    if _REPLAY is not None and status != 429:
+                        _REPLAY.save(resp.url, None, status, resp.headers, body)
+                    if status < 400:
+                        return status, decode(body)
+                    retry_after = resp.headers.get("Retry-After")
+        except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+            if attempt == RETRY_TOTAL:
+                raise
+            HTTP_RETRIES.inc(endpoint=endpoint, reason="connection")
+            logger.debug(f"{type(e).__name__} from Polygon, retrying {endpoint}")
+            await asyncio.sleep(RETRY_BACKOFF * (2 ** attempt))
+            continue
+        if status not in RETRY_STATUS or attempt == RETRY_TOTAL:
+            break
+        HTTP_RETRIES.inc(endpoint=endpoint, reason="429" if status == 429 else "5xx")
+        wait = RETRY_BACKOFF * (2 ** attempt)
+        if status == 429:
+            wait = retry_after_seconds(retry_after, default=wait)
+            if _LIMITER is not None:
+                # the limiter holds every caller back, not just this one
+                _LIMITER.pause(wait)
+                continue
+        await asyncio.sleep(wait)
+    return status, None
+
+
+def _replay(url, params, decode):
+    recorded = _REPLAY.load(url, params)
+    if recorded is None:
+        logger.warning(f"No recording for {ReplayStore.request_key(url, params)}")
+        return None, None
+    status, _, body = recorded
+    return status, decode(body) if status < 400 else None
+
+
+async def walk_pages(url, params, apikey, decode=decode_page):
+    """
+    Follow next_url from url until the last page.
+
+    Returns:
+        tuple: (status_code, list of per-page results or None on a bad status)
+    """
+    pages = []
+    status = None
+    while url:
+        status, data = await _get_json(url, params, decode)
+        if data is None:
+            return status, None
+        pages.append(data.get("results", []))
+        url = data.get("next_url")
+        params = {"apiKey": apikey}
+    return status, pages
+
+
+async def walk_partitions(url, params, partitions, apikey, decode=decode_page):
+    """Page every expiry partition concurrently on the event loop."""
+    walks = await asyncio.gather(*[walk_pages(url, {**params, **partition}, apikey, decode)
+                                   for partition in partitions])
+    for status, pages in walks:
+        if pages is None:
+            return status, None
+    return 200, [page for _, pages in walks for page in pages]
+
+
+async def fetch_contract_option(ticker, contract_type, max_limit=250, apikey=None):
+    """
+    Async version of utils.api_client.fetch_contract_option.
+
+    Args:
+        ticker (str): Stock symbol to fetch options for
+        contract_type (str): 'call', 'put' or None for both sides
+        max_limit (int): Maximum number of results per page
+
+    Returns:
+        dict: {'results': [...]} or None if error occurs
+    """
+    apikey = apikey or _API_KEY
+    if not apikey:
+        logger.warning(f"Missing API")
+        return None
+    url = f"{POLYGON_BASE_URL}/v3/snapshot/options/{ticker}"
+    if contract_type is None:
+        params = {"limit": max_limit, "apiKey": apikey, **EXPIRY_SORT}
+    else:
+        params = {'contract_type': contract_type, "limit": max_limit, "apiKey": apikey, **EXPIRY_SORT}
+
+    start = time.perf_counter()
+    try:
+        status, data = await _get_json(url, params, decode_snapshot_page)
+        pages = [data.get("results", [])] if data is not None else None
+        if data is not None and max_limit >= 250 and data.get("next_url"):
+            kept, resume = split_first_page(pages[0], attrgetter('expiration_date'))
+            status, rest = await walk_partitions(url, params, expiry_partitions(snapshot_partition_edges(), resume),
+                                                 apikey, decode_snapshot_page)
+            pages = None if rest is None else [kept] + rest
+        if pages is None:
+            if status == 401:
+                logger.warning(f"Please check your API key: {apikey}")
+            else:
+                logger.warning(f"Error fetching data: {status}")
+            return None
+
+        all_results = list(chain.from_iterable(pages))
+        PAGES.observe(len(pages), endpoint=endpoint_label(url))
+        logger.debug(f"Fetched {len(all_results)} contracts for {ticker} in {len(pages)} pages, "
+                     f"{time.perf_counter() - start:.2f}s")
+        return {'results': all_results} if all_results else None
+
+    except Exception as e:
+        logger.warning(f"Fetch failed for {ticker} | Error: {e}")
+        return None
+
+
+async def fetch_contract_windows(ticker, partitions, max_limit=250, apikey=None):
+    """
+    Async version of utils.api_client.fetch_contract_windows.
+
+    Args:
+        ticker (str): Stock symbol to fetch options for
+        partitions (list): Filter params per slice (expiration_date, strike_price.gte/lte)
+        max_limit (int): Maximum number of results per page
+
+    Returns:
+        dict: {'results': [...]} or None if error occurs
+    """
+    apikey = apikey or _API_KEY
+    if not apikey:
+        logger.warning(f"Missing API")
+        return None
+    if not partitions:
+        return None
+    url = f"{POLYGON_BASE_URL}/v3/snapshot/options/{ticker}"
+    params = {"limit": max_limit, "apiKey": apikey}
+
+    start = time.perf_counter()
+    try:
+        status, pages = await walk_partitions(url, params, partitions, apikey, decode_snapshot_page)
+        if pages is None:
+            if status == 401:
+                logger.warning(f"Please check your API key: {apikey}")
+            else:
+                logger.warning(f"Error fetching data: {status}")
+            return None
+
+        all_results = list(chain.from_iterable(pages))
+        PAGES.observe(len(pages), endpoint=endpoint_label(url))
+        logger.debug(f"Fetched {len(all_results)} contracts for {ticker} from {len(partitions)} windows, "
+                     f"{time.perf_counter() - start:.2f}s")
+        return {'results': all_results} if all_results else None
+
+    except Exception as e:
+        logger.warning(f"Fetch failed for {ticker} | Error: {e}")
+        return None
+
+
+async def fetch_reference_option(ticker, top_sp, bottom_sp, start_date, end_date, max_limit=1000, apikey=None):
+    """
+    Async version of utils.api_client.fetch_reference_option, sharing its on-disk cache.
+
+    Returns:
+        list: Reference contracts, or None if error occurs.
+    """
+    cache = reference_cache()
+    if cache is None:
+        return await _fetch_reference_listing(ticker, top_sp, bottom_sp, start_date, end_date, max_limit, apikey)
+    results = await asyncio.to_thread(cache.get, ticker, bottom_sp, top_sp, start_date, end_date)
+    if results is not None:
+        return results
+    low, high = cached_strike_window(bottom_sp, top_sp)
+    results = await _fetch_reference_listing(ticker, high, low, start_date, end_date, max_limit, apikey)
+    if results is None:
+        return None
+    await asyncio.to_thread(cache.put, ticker, low, high, start_date, end_date, results)
+    return within_strikes(results, bottom_sp, top_sp)
+
+
+async def _fetch_reference_listing(ticker, top_sp, bottom_sp, start_date, end_date, max_limit=1000, apikey=None):
+    apikey = apikey or _API_KEY
+    if not apikey:
+        logger.warning("Missing API key.")
+        return None
+
+    url = f"{POLYGON_BASE_URL}/v3/reference/options/contracts"
+    params = {
+        "underlying_ticker": ticker,
+        "strike_price.gte": bottom_sp,
+        "strike_price.lte": top_sp,
+        "apiKey": apikey,
+        "limit": max_limit,
+        **EXPIRY_SORT,
+    }
+    window = {
+        "expiration_date.gte": start_date.isoformat(),
+        "expiration_date.lte": end_date.isoformat(),
+    }
+
+    start = time.perf_counter()
+    try:
+        status, data = await _get_json(url, {**params, **window})
+        pages = [data.get("results", [])] if data is not None else None
+        if data is not None and data.get("next_url"):
+            kept, resume = split_first_page(pages[0], itemgetter('expiration_date'))
+            resume = resume or start_date
+            partitions = expiry_partitions(reference_partition_edges(resume, end_date), resume, end_date)
+            status, rest = await walk_partitions(url, params, partitions, apikey)
+            pages = None if rest is None else [kept] + rest
+        if pages is None:
+            if status == 401:
+                logger.warning(f"Invalid API key: {apikey}")
+            else:
+                logger.warning(f"HTTP error {status} while fetching data.")
+            return None
+
+        all_results = list(chain.from_iterable(pages))
+        PAGES.observe(len(pages), endpoint=endpoint_label(url))
+        logger.debug(f"Fetched {len(all_results)} reference contracts for {ticker} in {len(pages)} pages, "
+                     f"{time.perf_counter() - start:.2f}s")
+        return all_results
+
+    except Exception as e:
+        logger.warning(f"Fetch failed for {ticker} | Error: {e}")
+        return None
+
+
+async def fetch_option_snapshot(ticker, option_ticker):
+    """Async version of utils.api_client.fetch_option_snapshot."""
+    url = f"{POLYGON_BASE_URL}/v3/snapshot/options/{ticker}/{option_ticker}"
+    params = {"apiKey": _API_KEY}
+
+    try:
+        status, data = await _get_json(url, params)
+        if not data or "results" not in data:
+            logger.warning(f"No results for {ticker} {option_ticker} (status {status})")
+            return None
+        return data
+    except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+        logger.warning(f"Fetch failed for {ticker} {option_ticker} | {type(e).__name__} {e}")
+        return None
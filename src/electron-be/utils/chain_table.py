@@ -0,0 +1,113 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from utils.data_processing import convert_atm_string_to_number
+
+# Columns the preview can filter and sort on
+VIEW_COLUMNS = ('Symbol', 'Expiry_X', 'ATM_X')
+# Filtered/sorted row orders kept per table
+VIEW_CACHE_SIZE = 32
+
+
+class ChainTable:
+    """
+    One OptionChain CSV parsed once, with cached row orders for its filtered
+    and sorted views, so serving a page is a slice of page_size rows.
+
+    Tables are immutable; ChainTableCache swaps in a new one when the file changes.
+    """
+
+    def __init__(self, path, stat):
+        self.path = path
+        self.version = (stat.st_mtime_ns, stat.st_size)
+        self.etag = f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+        self.df = pd.read_csv(path)
+        self.total = len(self.df)
+        # ATM-5 .. ATM5 sort by distance from the money, not as strings
+        self._sort_keys = {
+            'Symbol': self.df['Symbol'].to_numpy(),
+            'Expiry_X': self.df['Expiry_X'].to_numpy(),
+            'ATM_X': self.df['ATM_X'].map(convert_atm_string_to_number).to_numpy(),
+        }
+        self._views = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _filter(self, filters):
+        mask = np.ones(self.total, dtype=bool)
+        for column, values in filters:
+            series = self.df[column]
+            if column == 'Expiry_X':
+                values = [int(v) for v in values]
+            mask &= series.isin(values).to_numpy()
+        return np.flatnonzero(mask)
+
+    def view(self, filters=(), sort=()):
+        """
+        Row positions of one filtered and sorted view, computed once per table.
+
+        Args:
+            filters (tuple): (column, tuple of accepted values) pairs, ANDed
+            sort (tuple): Column names, `-` prefix for descending; file order breaks ties
+
+        Raises:
+            ValueError: for a column outside VIEW_COLUMNS or a non-integer Expiry_X
+        """
+        key = (filters, sort)
+        with self._lock:
+            if key in self._views:
+                self._views.move_to_end(key)
+                return self._views[key]
+        for column in [c for c, _ in filters] + [c.lstrip('-') for c in sort]:
+            if column not in VIEW_COLUMNS:
+                raise ValueError(f"Cannot filter or sort on {column}, expected one of {list(VIEW_COLUMNS)}")
+        rows = self._filter(filters) if filters else np.arange(self.total)
+        # stable sorts from the last key to the first give a multi-column order
+        for column in reversed(sort):
+            keys = self._sort_keys[column.lstrip('-')][rows]
+            if column.startswith('-'):
+                # stable descending: sort the reversed keys, then map back, so ties stay in file order
+                order = len(keys) - 1 - np.argsort(keys[::-1], kind='stable')[::-1]
+            else:
+                order = np.argsort(keys, kind='stable')
+            rows = rows[order]
+        with self._lock:
+            self._views[key] = rows
+            while len(self._views) > VIEW_CACHE_SIZE:
+                self._views.popitem(last=False)
+        return rows
+
+    def page(self, page, page_size, filters=(), sort=()):
+        """
+        Returns:
+            tuple: (rows of the page as a DataFrame, total rows of the view)
+        """
+        rows = self.view(filters, sort)
+        offset = (page - 1) * page_size
+        return self.df.iloc[rows[offset:offset + page_size]], len(rows)
+
+
+class ChainTableCache:
+    """Keeps the last loaded ChainTable and reloads it when the file's mtime or size changes."""
+
+    def __init__(self):
+        self._table = None
+        self._lock = threading.Lock()
+
+    def get(self, path):
+        """
+        Raises:
+            FileNotFoundError: when path does not exist
+        """
+        stat = os.stat(path)
+        table = self._table
+        if table is not None and table.path == path and table.version == (stat.st_mtime_ns, stat.st_size):
+            return table
+        with self._lock:
+            table = self._table
+            if table is None or table.path != path or table.version != (stat.st_mtime_ns, stat.st_size):
+                table = self._table = ChainTable(path, stat)
+            return table
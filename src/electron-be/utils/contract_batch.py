@@ -0,0 +1,103 @@
+from itertools import chain, repeat
+
+import pandas as pd
+
+# Output columns of the contract and updater farmers, the old OptionContracts_*.csv layout
+CONTRACT_COLUMNS = [
+    'Date', 'Time', 'Option_Ticker', 'Strike_Price', 'Expiry', 'Contract_Type', 'Expiry_X', 'ATM_X',
+    'IV', 'Open_interest', 'Delta', 'Gamma', 'Theta', 'Vega', 'Bid', 'Ask',
+    'Open', 'High', 'Low', 'Close', 'Volume', 'VWAP',
+]
+
+
+class ContractBatch:
+    """
+    Rows of one ticker kept as columns (struct of arrays).
+
+    Date and Time are shared by every row of a batch and stored once. The other
+    columns are sequences of equal length, so a batch pickles back from a pool
+    worker without repeating the column names per contract and turns into a
+    DataFrame column by column.
+    """
+    __slots__ = ("date", "time", "columns")
+
+    def __init__(self, date_str, time_str, columns):
+        """
+        Args:
+            date_str (str): YYYY-MM-DD of every row
+            time_str (str): HH:MM of every row
+            columns (dict): Column name -> sequence, in output order, without Date and Time
+        """
+        self.date = date_str
+        self.time = time_str
+        self.columns = columns
+
+    def __len__(self):
+        return len(next(iter(self.columns.values()), ()))
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def records(self):
+        """Row dicts with Date and Time, for the writers that store one contract at a time."""
+        names = ['Date', 'Time', *self.columns]
+        for values in zip(*self.columns.values()):
+            yield dict(zip(names, (self.date, self.time, *values)))
+
+    def to_frame(self):
+        return batches_frame([self])
+
+
+def batches_frame(batches):
+    """
+    One DataFrame out of many batches with the same columns, built column by column.
+
+    Returns:
+        pd.DataFrame: Date, Time and the batch columns; empty if every batch is
+    """
+    batches = [batch for batch in batches if batch]
+    if not batches:
+        return pd.DataFrame()
+    data = {
+        'Date': list(chain.from_iterable(repeat(batch.date, len(batch)) for batch in batches)),
+        'Time': list(chain.from_iterable(repeat(batch.time, len(batch)) for batch in batches)),
+    }
+    for name in batches[0].columns:
+        data[name] = list(chain.from_iterable(batch.columns[name] for batch in batches))
+    return pd.DataFrame(data)
+
+
+def snapshot_batch(picks, date_str, time_str):
+    """
+    ContractBatch of selected SnapshotContracts, in the CONTRACT_COLUMNS layout.
+
+    Args:
+        picks (list): (SnapshotContract, Expiry_X, ATM_X label) per selected contract
+    """
+    if not picks:
+        return ContractBatch(date_str, time_str, {name: () for name in CONTRACT_COLUMNS[2:]})
+    contracts, days, labels = zip(*picks)
+    (tickers, strikes, expiries, types, iv, oi, delta, gamma, theta, vega,
+     bid, ask, open_, high, low, close, volume, vwap) = zip(*contracts)
+    return ContractBatch(date_str, time_str, {
+        'Option_Ticker': tickers,
+        'Strike_Price': strikes,
+        'Expiry': expiries,
+        'Contract_Type': [str(contract_type).capitalize() for contract_type in types],
+        'Expiry_X': days,
+        'ATM_X': labels,
+        'IV': iv,
+        'Open_interest': oi,
+        'Delta': delta,
+        'Gamma': gamma,
+        'Theta': theta,
+        'Vega': vega,
+        'Bid': bid,
+        'Ask': ask,
+        'Open': open_,
+        'High': high,
+        'Low': low,
+        'Close': close,
+        'Volume': volume,
+        'VWAP': vwap,
+    })
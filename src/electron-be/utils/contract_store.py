@@ -0,0 +1,213 @@
+import csv
+import os
+import re
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+from loguru import logger
+
+from config_contract import CONTRACT_DATASET_DIR
+
+OPTION_SYMBOL_RE = re.compile(r'O:([A-Z]+[0-9]?)(\d{6})')
+KEY_RE = re.compile(r'([A-Z]+[0-9]?)_[CP]_\d{8}_')
+
+# Fixed column types, so a partition whose column is all None still matches the others
+CONTRACT_TYPES = {
+    'Date': pa.string(), 'Time': pa.string(), 'Option_Ticker': pa.string(), 'Contract_Key': pa.string(),
+    'Strike_Price': pa.float64(), 'Expiry': pa.string(), 'Contract_Type': pa.string(),
+    'Expiry_X': pa.int64(), 'ATM_X': pa.string(), 'IV': pa.float64(), 'Open_interest': pa.float64(),
+    'Delta': pa.float64(), 'Gamma': pa.float64(), 'Theta': pa.float64(), 'Vega': pa.float64(),
+    'Bid': pa.float64(), 'Ask': pa.float64(), 'Open': pa.float64(), 'High': pa.float64(),
+    'Low': pa.float64(), 'Close': pa.float64(), 'Volume': pa.float64(), 'VWAP': pa.float64(),
+    'Last_trade': pa.float64(), 'Last_update': pa.string(),
+}
+# Read schema, so partitions written before a column existed load it as null
+DATASET_SCHEMA = pa.schema([*CONTRACT_TYPES.items(), ('date', pa.string()), ('symbol', pa.string())])
+
+
+def contract_symbol(option_ticker, ticker):
+    """Root symbol of an OCC option ticker (O:BRKB... -> BRKB), `ticker` if it cannot be parsed."""
+    match = OPTION_SYMBOL_RE.search(option_ticker or '')
+    return match.group(1) if match else ticker
+
+
+def contract_file_stem(option, ticker):
+    """
+    Build the {SYM}_{C|P}_{expiry}_{strike} name used by the legacy per-contract files and Redis hashes.
+
+    Args:
+        option: Option contract dict (or row) with Option_Ticker, Expiry, Strike_Price, Contract_Type
+        ticker (str): Stock symbol, used when the option ticker cannot be parsed
+    """
+    unique_symbol = contract_symbol(option['Option_Ticker'], ticker)
+    expiry = str(option['Expiry']).replace('-', '')
+    strike = str(option['Strike_Price']).replace('.0', '')
+    type = 'C' if str(option['Contract_Type']) == 'Call' else 'P'
+    return f"{unique_symbol}_{type}_{expiry}_{strike}"
+
+
+def contract_keys(df, ticker):
+    """
+    contract_file_stem of every row of a contract DataFrame, column at a time.
+
+    Returns:
+        tuple: (keys, root symbols) as Series aligned with df
+    """
+    symbols = df['Option_Ticker'].astype(str).str.extract(OPTION_SYMBOL_RE, expand=True)[0].fillna(ticker)
+    types = np.where(df['Contract_Type'].astype(str) == 'Call', 'C', 'P')
+    expiries = df['Expiry'].astype(str).str.replace('-', '', regex=False)
+    strikes = df['Strike_Price'].astype(str).str.replace('.0', '', regex=False)
+    return symbols + '_' + types + '_' + expiries + '_' + strikes, symbols
+
+
+def contracts_table(df):
+    """Arrow table of a contract DataFrame with the CONTRACT_TYPES column types applied."""
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    for i, name in enumerate(table.column_names):
+        wanted = CONTRACT_TYPES.get(name)
+        if wanted is not None and table.schema.field(i).type != wanted:
+            table = table.set_column(i, name, table.column(i).cast(wanted))
+    return table
+
+
+def write_contracts(ticker, options, root=CONTRACT_DATASET_DIR):
+    """
+    Write one ticker's contracts into the Parquet dataset, hive partitioned by date and symbol.
+
+    Every (date, symbol) partition holds a single file that is replaced on re-runs,
+    the same overwrite semantics the per-contract CSV files had.
+
+    Args:
+        ticker (str): Stock symbol
+        options (ContractBatch): Selected contracts of the ticker
+        root (str): Dataset directory
+
+    Returns:
+        list: Paths written
+    """
+    if not options:
+        return []
+    df = options.to_frame()
+    df['Contract_Key'], symbols = contract_keys(df, ticker)
+
+    return [write_partition(part, date, symbol, root)
+            for (date, symbol), part in df.groupby([df['Date'], symbols], sort=False)]
+
+
+def _partition_path(date, symbol, root):
+    return os.path.join(root, f"date={date}", f"symbol={symbol}", "part-0.parquet")
+
+
+def write_partition(df, date, symbol, root=CONTRACT_DATASET_DIR):
+    """Replace the single file of one (date, symbol) partition with df, returns its path."""
+    path = _partition_path(date, symbol, root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = os.path.join(os.path.dirname(path), ".part-0.parquet.tmp")
+    pq.write_table(contracts_table(df), tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+
+def read_partition(date, symbol, root=CONTRACT_DATASET_DIR):
+    """Contracts of one (date, symbol) partition without the partition columns, None if it is not stored."""
+    path = _partition_path(date, symbol, root)
+    if not os.path.exists(path):
+        return None
+    return pq.read_table(path).to_pandas()
+
+
+def _dataset(root):
+    return ds.dataset(root, format="parquet", partitioning="hive", schema=DATASET_SCHEMA)
+
+
+def read_contracts(date=None, symbol=None, root=CONTRACT_DATASET_DIR):
+    """
+    Load contracts from the dataset, pruning to the requested partitions.
+
+    Args:
+        date (str): YYYY-MM-DD, all dates if None
+        symbol (str): Root symbol, all symbols if None
+
+    Returns:
+        pd.DataFrame: Matching contracts with 'date' and 'symbol' partition columns
+    """
+    if not os.path.isdir(root):
+        return pd.DataFrame()
+    condition = None
+    for field, value in (("date", date), ("symbol", symbol)):
+        if value is not None:
+            expr = ds.field(field) == value
+            condition = expr if condition is None else condition & expr
+    return _dataset(root).to_table(filter=condition).to_pandas()
+
+
+def lookup_contract(key, date, root=CONTRACT_DATASET_DIR):
+    """
+    Fetch a single contract for one day.
+
+    Args:
+        key (str): Option ticker (O:AAPL250117C00150000) or legacy key (AAPL_C_20250117_150)
+        date (str): YYYY-MM-DD
+
+    Returns:
+        dict: The contract row, or None if it is not stored
+    """
+    if key.startswith('O:'):
+        symbol, column = contract_symbol(key, None), 'Option_Ticker'
+    else:
+        match = KEY_RE.match(key)
+        symbol, column = (match.group(1) if match else None), 'Contract_Key'
+    if symbol is None:
+        logger.warning(f"Cannot parse contract key {key}")
+        return None
+    partition = _partition_path(date, symbol, root)
+    if not os.path.exists(partition):
+        return None
+    table = pq.read_table(partition, filters=[(column, '==', key)])
+    if table.num_rows == 0:
+        return None
+    return table.slice(0, 1).to_pylist()[0]
+
+
+def export_legacy_files(options, ticker, DIR):
+    """
+    Write the legacy layout, one single-row {SYM}_{C|P}_{expiry}_{strike}.csv per contract.
+
+    Args:
+        options (list): List of option contract dictionaries
+        ticker (str): Stock symbol
+        DIR (str): Output directory
+    """
+    os.makedirs(DIR, exist_ok=True)
+    for option in options:
+        try:
+            filename = f"{DIR}/{contract_file_stem(option, ticker)}.csv"
+            with open(filename, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=list(option))
+                writer.writeheader()
+                writer.writerow(option)
+        except Exception as e:
+            logger.warning(f"Error processing contract for {ticker}: {str(e)}")
+            continue
+
+
+def export_legacy_day(date, DIR, root=CONTRACT_DATASET_DIR):
+    """Rebuild the legacy per-contract files of one day from the dataset."""
+    df = read_contracts(date=date, root=root)
+    if df.empty:
+        return 0
+    export_legacy_frame(df, DIR)
+    return len(df)
+
+
+def export_legacy_frame(df, DIR):
+    """Legacy per-contract files of dataset rows (with the 'symbol' column), one file per row."""
+    # the updater columns only appear in the files of contracts that were updated
+    columns = [c for c in df.columns if c not in ('Contract_Key', 'date', 'symbol')
+               and not (c in ('Last_trade', 'Last_update') and df[c].isna().all())]
+    for symbol, part in df.groupby('symbol', sort=False):
+        part = part[columns].astype(object)
+        export_legacy_files(part.where(part.notna(), None).to_dict(orient="records"), symbol, DIR)
@@ -1,46 +1,158 @@
+from collections import OrderedDict
 from datetime import datetime
+import numpy as np
 from loguru import logger
 from config_chain import ATM_STRIKE_PRICE_SETTING
-def get_ATM(underlying_price, strike_prices, settings):
+
+
+LADDER_CACHE_SIZE = 20000
+
+
+class StrikeLadder:
     """
-    Find ATM (At-The-Money) strike and surrounding strikes with dynamic range.
+    Sorted, de-duplicated strikes of one (symbol, expiry), searched with binary search.
+
+    `fingerprint` is the length and a hash of the strikes it was built from, in the
+    order given; the cache rebuilds the ladder whenever a chain shows up with other
+    strikes (new, relisted or adjusted ones, or a strike-windowed subset of the chain).
+    """
+    __slots__ = ("strikes", "fingerprint")
+
+    def __init__(self, strike_prices):
+        strike_prices = np.asarray(strike_prices, dtype=float)
+        self.strikes = np.unique(strike_prices)
+        self.fingerprint = ladder_fingerprint(strike_prices)
+
+    def __len__(self):
+        return len(self.strikes)
+
+    def atm_positions(self, prices):
+        """
+        Index of the strike closest to every price; ties go to the lower strike.
+
+        Args:
+            prices (np.ndarray): Underlying prices
+
+        Returns:
+            np.ndarray: Ladder positions, one per price
+        """
+        prices = np.asarray(prices, dtype=float)
+        strikes = self.strikes
+        pos = np.searchsorted(strikes, prices)
+        upper = np.minimum(pos, len(strikes) - 1)
+        lower = np.maximum(pos - 1, 0)
+        take_lower = (pos == len(strikes)) | ((pos > 0) & (prices - strikes[lower] <= strikes[upper] - prices))
+        return np.where(take_lower, lower, upper)
+
+    def window(self, underlying_price, settings):
+        """
+        ATM window around one price.
+
+        Returns:
+            tuple: (ATM position, lowest strike, highest strike) of the +/- settings window
+        """
+        pos = int(self.atm_positions([underlying_price])[0])
+        settings = int(settings)
+        low = self.strikes[max(pos - settings, 0)]
+        high = self.strikes[min(pos + settings, len(self.strikes) - 1)]
+        return pos, low, high
+
+    def labels(self, underlying_price, settings):
+        """Strike -> 'ATM' / 'ATM-i' / 'ATMi' map, the get_ATM result."""
+        pos, low, high = self.window(underlying_price, settings)
+        lo = int(np.searchsorted(self.strikes, low))
+        hi = int(np.searchsorted(self.strikes, high))
+        return {strike: "ATM" if i == pos else f"ATM{i - pos}"
+                for i, strike in zip(range(lo, hi + 1), self.strikes[lo:hi + 1].tolist())}
+
+
+_LADDERS = OrderedDict()
+
+
+def ladder_fingerprint(strike_prices):
+    """Length and hash of the strike bytes: one pass over the chain instead of np.unique's sort."""
+    strike_prices = np.ascontiguousarray(strike_prices, dtype=float)
+    return len(strike_prices), hash(strike_prices.tobytes())
+
+
+def strike_ladder(symbol, expiry, strike_prices):
+    """
+    Cached StrikeLadder of one (symbol, expiry), LRU bounded by LADDER_CACHE_SIZE.
 
     Args:
-        underlying_price (float): Current price of the underlying asset
-        strike_prices (list): List of available strike prices
-        settings (int): Number of strikes to return on each side of ATM
-                      (e.g., 2 means 2 below + ATM + 2 above = 5 strikes total)
+        symbol (str): Stock symbol
+        expiry (str): YYYY-MM-DD
+        strike_prices: Strikes of every contract of that expiry, used to (re)build the ladder
+    """
+    key = (symbol, str(expiry))
+    ladder = _LADDERS.get(key)
+    if ladder is None or ladder.fingerprint != ladder_fingerprint(strike_prices):
+        ladder = StrikeLadder(strike_prices)
+        _LADDERS[key] = ladder
+        if len(_LADDERS) > LADDER_CACHE_SIZE:
+            _LADDERS.popitem(last=False)
+    else:
+        _LADDERS.move_to_end(key)
+    return ladder
 
-    Returns:
-        list: Strikes centered around ATM (may contain duplicates at boundaries)
+
+def resolve_atm_batch(symbol, pairs, strikes_by_expiry, settings):
     """
-    if not strike_prices:
-        return []
+    Resolve many (underlying price, expiry) pairs of one symbol at once.
 
-    # Remove duplicates and sort
-    unique_strikes = sorted(list(set(strike_prices)))
+    Prices are grouped by expiry and searched in one vectorised pass per ladder,
+    the ladders coming from the strike_ladder cache.
 
-    atm_strike = min(unique_strikes, key=lambda x: abs(x - underlying_price))
-    atm_index = unique_strikes.index(atm_strike)
-    n = len(unique_strikes)
+    Args:
+        symbol (str): Stock symbol
+        pairs (list): (underlying_price, expiry 'YYYY-MM-DD') tuples
+        strikes_by_expiry (dict): expiry 'YYYY-MM-DD' -> strikes of every contract of that expiry
+        settings (int): Number of strikes on each side of ATM
 
-    atm_map = {atm_strike: "ATM"}
+    Returns:
+        list: get_ATM style strike -> label maps, in the order of `pairs`
 
-    # Get strikes below ATM
-    for i in range(1, settings + 1):
-        strike_index = max(atm_index - i, 0)
-        strike_price = unique_strikes[strike_index]
-        if strike_price not in atm_map:
-            atm_map[strike_price] = f"ATM-{i}"
+    Raises:
+        KeyError: An expiry of `pairs` has no strikes in strikes_by_expiry
+    """
+    settings = int(settings)
+    results = [{} for _ in pairs]
+    by_expiry = {}
+    for i, (price, expiry) in enumerate(pairs):
+        by_expiry.setdefault(str(expiry), []).append(i)
+    for expiry, slots in by_expiry.items():
+        if expiry not in strikes_by_expiry:
+            raise KeyError(f"No strikes for {symbol} {expiry}")
+        ladder = strike_ladder(symbol, expiry, strikes_by_expiry[expiry])
+        if not len(ladder):
+            continue  # no strikes listed: nothing is at the money
+        positions = ladder.atm_positions([pairs[i][0] for i in slots])
+        strikes = ladder.strikes.tolist()
+        for slot, pos in zip(slots, positions.tolist()):
+            lo, hi = max(pos - settings, 0), min(pos + settings, len(strikes) - 1)
+            results[slot] = {strikes[i]: "ATM" if i == pos else f"ATM{i - pos}" for i in range(lo, hi + 1)}
+    return results
 
-    # Get strikes above ATM
-    for i in range(1, settings + 1):
-        strike_index = min(atm_index + i, n - 1)
-        strike_price = unique_strikes[strike_index]
-        if strike_price not in atm_map:
-            atm_map[strike_price] = f"ATM{i}"
 
-    return atm_map
+def get_ATM(underlying_price, strike_prices, settings, ladder=None):
+    """
+    Find ATM (At-The-Money) strike and surrounding strikes with dynamic range.
+
+    Args:
+        underlying_price (float): Current price of the underlying asset
+        strike_prices (list): List of available strike prices
+        settings (int): Number of strikes to return on each side of ATM
+                      (e.g., 2 means 2 below + ATM + 2 above = 5 strikes total)
+        ladder (StrikeLadder): Prebuilt ladder (see strike_ladder), skips sorting strike_prices
+
+    Returns:
+        dict: Strike -> 'ATM', 'ATM-i' or 'ATMi' for the strikes centered around ATM
+    """
+    if ladder is None:
+        if not strike_prices:
+            return []
+        ladder = StrikeLadder(strike_prices)
+    return ladder.labels(underlying_price, settings)
 
 def find_target_expiries(data, ticker, target_days):
     """
@@ -134,4 +246,161 @@ def get_top_bottom_strikes(underlying_price, buffer=10):
     top_sp = underlying_price + gap + buffer
     bottom_sp = underlying_price - gap - buffer
 
-    return top_sp, bottom_sp
\ No newline at end of file
+    return top_sp, bottom_sp
+
+
+def to_day_array(expiry_strings):
+    """YYYY-MM-DD strings -> datetime64[D] array, malformed dates become NaT."""
+    try:
+        return np.array(expiry_strings, dtype='datetime64[D]')
+    except ValueError:
+        days = np.empty(len(expiry_strings), dtype='datetime64[D]')
+        for i, value in enumerate(expiry_strings):
+            try:
+                days[i] = np.datetime64(value, 'D')
+            except ValueError:
+                days[i] = np.datetime64('NaT')
+        return days
+
+
+def select_atm_contracts(expiries, strikes, underlying_price, target_days, settings, today=None, symbol=None):
+    """
+    Columnar find_target_expiries + get_ATM over a whole chain.
+
+    The chain is sorted by expiration once; every target expiry is then a slice of it,
+    and the ATM window of that slice is found with searchsorted on its strike ladder.
+    When two expiries are equally close to a target the earlier one is used.
+
+    Args:
+        expiries (np.ndarray): datetime64[D] expiration of every contract
+        strikes (np.ndarray): Strike price of every contract
+        underlying_price (float): Current price of the underlying asset
+        target_days (list): Target days to expiry
+        settings (int): Number of strikes on each side of ATM
+        symbol (str): When given, strike ladders are taken from the strike_ladder cache
+
+    Returns:
+        list: (expiry 'YYYY-MM-DD', target days, contract indices in chain order, ATM labels)
+              for every target, like the (expiry, days) pairs of find_target_expiries
+    """
+    today = np.datetime64(today or datetime.now().date(), 'D')
+    future = np.unique(expiries[expiries > today])
+    if future.size == 0:
+        return []
+    days_out = (future - today).astype(np.int64)
+
+    order = np.argsort(expiries, kind='stable')
+    sorted_expiries = expiries[order]
+
+    selections = []
+    for target in sorted(set(target_days)):
+        expiry = future[int(np.argmin(np.abs(days_out - target)))]
+        lo, hi = np.searchsorted(sorted_expiries, [expiry, expiry + 1])
+        indices = np.sort(order[lo:hi])
+        group_strikes = strikes[indices]
+
+        if symbol is None:
+            ladder = StrikeLadder(group_strikes)
+        else:
+            ladder = strike_ladder(symbol, expiry, group_strikes)
+        pos, low, high = ladder.window(underlying_price, settings)
+
+        in_window = (group_strikes >= low) & (group_strikes <= high)
+        offsets = np.searchsorted(ladder.strikes, group_strikes[in_window]) - pos
+        labels = ["ATM" if offset == 0 else f"ATM{offset}" for offset in offsets.tolist()]
+        selections.append((str(expiry), target, indices[in_window], labels))
+    return selections
+
+
+class ChainWindow:
+    """
+    ATM window the morning OptionChain picked for one (symbol, expiry, target days).
+
+    While the underlying stays between the half-way points to the neighbouring strikes
+    the ATM strike, and so the whole window, is unchanged and the morning labels are reused.
+    """
+    __slots__ = ("expiry", "target", "strikes", "labels", "atm_pos")
+
+    def __init__(self, expiry, target, labels):
+        """
+        Args:
+            expiry (str): YYYY-MM-DD
+            target (int): Expiry_X the window was picked for
+            labels (dict): Strike -> ATM_X label of the morning rows
+        """
+        self.expiry = str(expiry)
+        self.target = int(target)
+        self.labels = labels
+        self.strikes = sorted(labels)
+        atm = [strike for strike, label in labels.items() if label == "ATM"]
+        self.atm_pos = self.strikes.index(atm[0]) if atm else None
+
+    def moved(self, underlying_price):
+        """True when the ATM strike at `underlying_price` is not the morning one."""
+        if underlying_price is None:
+            return False
+        if self.atm_pos is None or len(self.strikes) < 2:
+            return True
+        pos, strikes = self.atm_pos, self.strikes
+        lower = (strikes[pos - 1] + strikes[pos]) / 2 if pos > 0 else float("-inf")
+        upper = (strikes[pos] + strikes[pos + 1]) / 2 if pos < len(strikes) - 1 else float("inf")
+        # ties go to the lower strike, like StrikeLadder.atm_positions
+        return not (lower < underlying_price <= upper)
+
+    def strike_range(self, underlying_price, settings):
+        """
+        Strikes to snapshot for this window.
+
+        Returns:
+            tuple: (lowest, highest) strike; (None, None) when the whole expiry is needed
+        """
+        if not self.moved(underlying_price):
+            return self.strikes[0], self.strikes[-1]
+        if len(self.strikes) < 2:
+            return None, None
+        # widest morning spacing, so a wider-spaced part of the ladder still fills the window
+        step = max(b - a for a, b in zip(self.strikes, self.strikes[1:]))
+        reach = (int(settings) + 1) * step
+        return underlying_price - reach, underlying_price + reach
+
+
+def chain_windows(chain_df):
+    """
+    Morning OptionChain rows -> ChainWindows per symbol.
+
+    Args:
+        chain_df (pd.DataFrame): OptionChain_YYYYMMDD.csv (Symbol, Expiry_Date, Expiry_X, SP_Price_X, ATM_X)
+
+    Returns:
+        dict: symbol -> list of ChainWindow
+    """
+    windows = {}
+    for (symbol, expiry, target), rows in chain_df.groupby(['Symbol', 'Expiry_Date', 'Expiry_X'], sort=False):
+        labels = dict(zip(rows['SP_Price_X'].astype(float).tolist(), rows['ATM_X'].tolist()))
+        windows.setdefault(symbol, []).append(ChainWindow(expiry, target, labels))
+    return windows
+
+
+def window_partitions(windows, underlying_price, settings):
+    """
+    Snapshot filters covering every window of one symbol, one per expiry.
+
+    Returns:
+        list: {'expiration_date', 'strike_price.gte', 'strike_price.lte'} params
+    """
+    ranges = {}
+    for window in windows:
+        low, high = window.strike_range(underlying_price, settings)
+        if window.expiry in ranges:
+            prev_low, prev_high = ranges[window.expiry]
+            low = None if low is None or prev_low is None else min(low, prev_low)
+            high = None if high is None or prev_high is None else max(high, prev_high)
+        ranges[window.expiry] = (low, high)
+    partitions = []
+    for expiry, (low, high) in ranges.items():
+        partition = {'expiration_date': expiry}
+        if low is not None:
+            partition['strike_price.gte'] = low
+            partition['strike_price.lte'] = high
+        partitions.append(partition)
+    return partitions
@@ -0,0 +1,104 @@
+import os
+import sqlite3
+from datetime import datetime, timezone
+
+import pandas as pd
+
+from config_contract import HISTORY_DB
+from utils.contract_batch import CONTRACT_COLUMNS
+from utils.metrics import WRITE_SECONDS
+
+# Columns of the updater rows, in the order of the old OptionContracts_*.csv files
+HISTORY_COLUMNS = CONTRACT_COLUMNS
+
+
+def _connect(path):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS snapshots ("
+        "Cycle_TS TEXT NOT NULL, "
+        + ", ".join(HISTORY_COLUMNS)
+        + ", PRIMARY KEY (Option_Ticker, Cycle_TS))"
+    )
+    conn.execute("CREATE INDEX IF NOT EXISTS snapshots_cycle ON snapshots (Cycle_TS)")
+    return conn
+
+
+def cycle_timestamp(when=None):
+    """UTC ISO timestamp of an updater cycle; sorts correctly across DST changes."""
+    when = when or datetime.now(timezone.utc)
+    return when.astimezone(timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+@WRITE_SECONDS.time(target="history")
+def append_snapshot(df, cycle_ts=None, path=HISTORY_DB):
+    """
+    Append one updater cycle to the history table, in a single transaction.
+
+    Args:
+        df (pd.DataFrame): Updater rows of the cycle (batches_frame of the ContractBatches)
+        cycle_ts (str): Cycle timestamp from cycle_timestamp(), now if None
+
+    Returns:
+        str: The cycle timestamp rows were stored under
+    """
+    cycle_ts = cycle_ts or cycle_timestamp()
+    # plain Python scalars for sqlite3, NaN/None as NULL
+    values = df.reindex(columns=HISTORY_COLUMNS).astype(object)
+    values = values.where(values.notna(), None)
+    rows = [(cycle_ts, *row) for row in values.itertuples(index=False, name=None)]
+    placeholders = ", ".join("?" * (len(HISTORY_COLUMNS) + 1))
+    conn = _connect(path)
+    try:
+        with conn:
+            conn.executemany(f"INSERT OR REPLACE INTO snapshots VALUES ({placeholders})", rows)
+    finally:
+        conn.close()
+    return cycle_ts
+
+
+def latest_snapshot(limit=None, path=HISTORY_DB):
+    """
+    Rows of the most recent cycle.
+
+    Returns:
+        pd.DataFrame: Same columns as the old OptionContracts_*.csv, plus Cycle_TS
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['Cycle_TS', *HISTORY_COLUMNS])
+    query = "SELECT * FROM snapshots WHERE Cycle_TS = (SELECT MAX(Cycle_TS) FROM snapshots)"
+    if limit:
+        query += f" LIMIT {int(limit)}"
+    conn = _connect(path)
+    try:
+        return pd.read_sql_query(query, conn)
+    finally:
+        conn.close()
+
+
+def contract_history(option_ticker, start=None, end=None, path=HISTORY_DB):
+    """
+    Every stored cycle of one contract, oldest first.
+
+    Args:
+        option_ticker (str): e.g. O:AAPL250117C00150000
+        start (str): Optional inclusive lower Cycle_TS bound
+        end (str): Optional inclusive upper Cycle_TS bound
+    """
+    if not os.path.exists(path):
+        return pd.DataFrame(columns=['Cycle_TS', *HISTORY_COLUMNS])
+    query = "SELECT * FROM snapshots WHERE Option_Ticker = ?"
+    params = [option_ticker]
+    if start:
+        query += " AND Cycle_TS >= ?"
+        params.append(start)
+    if end:
+        query += " AND Cycle_TS <= ?"
+        params.append(end)
+    conn = _connect(path)
+    try:
+        return pd.read_sql_query(query + " ORDER BY Cycle_TS", conn, params=params)
+    finally:
+        conn.close()
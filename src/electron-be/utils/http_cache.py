@@ -0,0 +1,165 @@
+import math
+import os
+import sqlite3
+import threading
+import time
+import zlib
+
+from loguru import logger
+
+from config_chain import REFERENCE_CACHE, REFERENCE_CACHE_DB, REFERENCE_CACHE_TTL_SEC, REFERENCE_CACHE_MAX_BYTES
+from config_chain import REFERENCE_CACHE_STRIKE_GRID
+
+try:
+    import orjson
+
+    _dumps, _loads = orjson.dumps, orjson.loads
+except ImportError:
+    import json
+
+    def _dumps(value):
+        return json.dumps(value, separators=(",", ":")).encode()
+
+    _loads = json.loads
+
+COUNTERS = ("hits", "misses", "bytes_saved", "evictions")
+
+_CACHE = None
+
+
+class ReferenceCache:
+    """
+    SQLite cache of reference contract listings with a TTL and LRU eviction by size.
+
+    Entries are the decoded results of a whole listing for a ticker, a strike
+    window and an expiry window, zlib-compressed JSON. A lookup is served by any
+    entry whose strike window covers the requested one; a new expiry window (the
+    next day) replaces the ticker's older entries.
+    Every worker process opens the same file (WAL), and the hit/miss/bytes
+    counters are kept in it too, so they add up across processes and restarts.
+    bytes_saved counts the JSON size of the results a hit did not re-download.
+    """
+
+    def __init__(self, path=REFERENCE_CACHE_DB, ttl=REFERENCE_CACHE_TTL_SEC, max_bytes=REFERENCE_CACHE_MAX_BYTES):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS listings (key TEXT PRIMARY KEY, ticker TEXT NOT NULL, "
+                           "expiry_window TEXT NOT NULL, low REAL NOT NULL, high REAL NOT NULL, body BLOB NOT NULL, "
+                           "size INTEGER NOT NULL, raw_size INTEGER NOT NULL, created REAL NOT NULL, "
+                           "accessed REAL NOT NULL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS listings_window ON listings (ticker, expiry_window)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS listings_accessed ON listings (accessed)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        self._conn.executemany("INSERT OR IGNORE INTO counters VALUES (?, 0)", [(name,) for name in COUNTERS])
+
+    def _count(self, **increments):
+        self._conn.executemany("UPDATE counters SET value = value + ? WHERE name = ?",
+                               [(value, name) for name, value in increments.items()])
+
+    def get(self, ticker, bottom_sp, top_sp, start_date, end_date):
+        """
+        Contracts with strikes in [bottom_sp, top_sp] out of any fresh cached listing of
+        ticker and the expiry window that covers those strikes.
+
+        Returns:
+            list: Cached contracts, or None on a miss or a database error
+        """
+        try:
+            with self._lock:
+                results = self._get(ticker, bottom_sp, top_sp, expiry_window(start_date, end_date))
+        except sqlite3.Error as e:
+            logger.warning(f"Reference cache read failed for {ticker}: {e}")
+            return None
+        return None if results is None else within_strikes(results, bottom_sp, top_sp)
+
+    def put(self, ticker, low, high, start_date, end_date, results):
+        """Cache the listing of ticker for strikes in [low, high] and the expiry window."""
+        try:
+            with self._lock:
+                self._put(ticker, low, high, expiry_window(start_date, end_date), results)
+        except sqlite3.Error as e:
+            logger.warning(f"Reference cache write failed for {ticker}: {e}")
+
+    def _get(self, ticker, bottom_sp, top_sp, window):
+        now = time.time()
+        row = self._conn.execute(
+            "SELECT key, body, raw_size FROM listings WHERE ticker = ? AND expiry_window = ? AND low <= ? "
+            "AND high >= ? AND created >= ? ORDER BY high - low LIMIT 1",
+            (ticker, window, bottom_sp, top_sp, now - self.ttl)).fetchone()
+        if row is None:
+            self._count(misses=1)
+            return None
+        self._conn.execute("UPDATE listings SET accessed = ? WHERE key = ?", (now, row[0]))
+        self._count(hits=1, bytes_saved=row[2])
+        return _loads(zlib.decompress(row[1]))
+
+    def _put(self, ticker, low, high, window, results):
+        raw = _dumps(results)
+        body = zlib.compress(raw, 1)
+        now = time.time()
+        self._conn.execute("DELETE FROM listings WHERE ticker = ? AND (expiry_window != ? OR created < ?)",
+                           (ticker, window, now - self.ttl))
+        self._conn.execute("INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                           (f"{ticker}|{window}|{low:g}|{high:g}", ticker, window, low, high, body, len(body),
+                            len(raw), now, now))
+        self._evict()
+
+    def _evict(self):
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM listings").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        evicted = []
+        for key, size in self._conn.execute("SELECT key, size FROM listings ORDER BY accessed"):
+            if total <= self.max_bytes:
+                break
+            evicted.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM listings WHERE key = ?", evicted)
+        self._count(evictions=len(evicted))
+        logger.debug(f"Reference cache over {self.max_bytes} bytes, evicted {len(evicted)} listings")
+
+    def stats(self):
+        with self._lock:
+            return self._stats()
+
+    def _stats(self):
+        counters = dict(self._conn.execute("SELECT name, value FROM counters").fetchall())
+        entries, size = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM listings").fetchone()
+        lookups = counters["hits"] + counters["misses"]
+        return {**counters, "entries": entries, "size_bytes": size,
+                "hit_ratio": counters["hits"] / lookups if lookups else None}
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM listings")
+            self._conn.execute("UPDATE counters SET value = 0")
+
+
+def reference_cache():
+    """The process-wide ReferenceCache, opened on first use; None when REFERENCE_CACHE is off."""
+    global _CACHE
+    if _CACHE is None and REFERENCE_CACHE:
+        _CACHE = ReferenceCache()
+    return _CACHE
+
+
+def cached_strike_window(bottom_sp, top_sp, grid=REFERENCE_CACHE_STRIKE_GRID):
+    """
+    [bottom_sp, top_sp] widened by one grid step and rounded out to multiples of grid,
+    the strike window that is fetched and cached.
+    """
+    return math.floor(bottom_sp / grid - 1) * grid, math.ceil(top_sp / grid + 1) * grid
+
+
+def expiry_window(start_date, end_date):
+    return f"{start_date.isoformat()}|{end_date.isoformat()}"
+
+
+def within_strikes(results, bottom_sp, top_sp):
+    """Contracts of a cached (wider) listing inside the requested strike window."""
+    return [c for c in results if bottom_sp <= c.get("strike_price", bottom_sp - 1) <= top_sp]
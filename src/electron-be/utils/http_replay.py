@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import json
+import os
+from urllib.parse import urlsplit, parse_qsl, unquote
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+# Response headers kept in a recording, the rest is dropped
+KEPT_HEADERS = ("Content-Type", "Retry-After")
+
+
+class ReplayMiss(requests.ConnectionError):
+    """No recording for a request made in replay mode."""
+
+
+class ReplayStore:
+    """
+    Recorded Polygon responses, one gzip file per request under path.
+
+    A request is identified by its path and query with apiKey removed, so a
+    recording made against the live API or bench/fake_polygon.py replays under
+    any key and base URL. Files are written atomically, spawn workers can
+    record into the same directory.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+    @staticmethod
+    def request_key(url, params=None):
+        parts = urlsplit(str(url))
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        query += [(k, str(v)) for k, v in (params or {}).items()]
+        return unquote(parts.path) + "?" + "&".join(f"{k}={v}" for k, v in sorted(query) if k != "apiKey")
+
+    def _file(self, key):
+        return os.path.join(self.path, hashlib.sha1(key.encode()).hexdigest() + ".gz")
+
+    def save(self, url, params, status, headers, body):
+        key = self.request_key(url, params)
+        meta = {"key": key, "status": status, "headers": {h: headers[h] for h in KEPT_HEADERS if h in headers}}
+        path = self._file(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with gzip.open(tmp, "wb", compresslevel=1) as f:
+            f.write(json.dumps(meta).encode() + b"\n" + body)
+        os.replace(tmp, path)
+
+    def load(self, url, params=None):
+        """
+        Returns:
+            tuple: (status, headers, body), or None when the request was not recorded
+        """
+        try:
+            with gzip.open(self._file(self.request_key(url, params)), "rb") as f:
+                meta, body = f.read().split(b"\n", 1)
+        except FileNotFoundError:
+            return None
+        meta = json.loads(meta)
+        return meta["status"], meta["headers"], body
+
+
+class ReplayAdapter(HTTPAdapter):
+    """
+    HTTPAdapter that records every response into a ReplayStore ("record") or
+    answers from it without touching the network ("replay").
+    """
+
+    def __init__(self, store, mode, **kwargs):
+        if mode not in ("record", "replay"):
+            raise ValueError(f"Unknown HTTP replay mode {mode}, expected record or replay")
+        self.store = store
+        self.mode = mode
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        if self.mode == "record":
+            resp = super().send(request, **kwargs)
+            if resp.status_code != 429:  # throttling is not part of the recording
+                self.store.save(request.url, None, resp.status_code, resp.headers, resp.content)
+            return resp
+
+        recorded = self.store.load(request.url)
+        if recorded is None:
+            raise ReplayMiss(f"No recording for {self.store.request_key(request.url)}", request=request)
+        resp = requests.Response()
+        resp.status_code, headers, resp._content = recorded
+        resp.headers = CaseInsensitiveDict(headers)
+        resp.url = request.url
+        resp.request = request
+        resp.reason = "Replayed"
+        resp.encoding = "utf-8"
+        return resp
@@ -0,0 +1,192 @@
+import threading
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+from loguru import logger
+from tqdm import tqdm
+
+# Finished jobs kept for status/result lookups
+JOB_HISTORY = 50
+FINAL_STATES = frozenset(["succeeded", "failed", "cancelled"])
+
+
+class JobCancelled(Exception):
+    """Raised from a job's progress report once cancel() was requested."""
+
+
+def _now():
+    return datetime.now(timezone.utc).isoformat()
+
+
+class Job:
+    """
+    One background farmer run.
+
+    The farmer reports progress through report(), which is also where a
+    requested cancellation takes effect (JobCancelled). `version` grows on every
+    change so watchers can tell whether there is anything new to send.
+    """
+
+    def __init__(self, kind):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.state = "queued"
+        self.created = _now()
+        self.started = None
+        self.finished = None
+        self.progress = {"total": None, "done": 0, "succeeded": 0, "failed": 0,
+                         "rate": None, "requests": None, "requests_per_sec": None, "elapsed": 0.0}
+        self.result = None
+        self.error = None
+        self.version = 0
+        self._cancel = threading.Event()
+        self._finished = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def done(self):
+        return self.state in FINAL_STATES
+
+    def _set(self, **fields):
+        with self._lock:
+            for name, value in fields.items():
+                setattr(self, name, value)
+            self.version += 1
+
+    def report(self, **progress):
+        """Update the progress counters; raises JobCancelled when the job should stop."""
+        with self._lock:
+            self.progress.update(progress)
+            self.version += 1
+        if self._cancel.is_set():
+            raise JobCancelled(self.id)
+
+    def cancel(self):
+        self._cancel.set()
+        self._set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "state": self.state,
+                "cancel_requested": self._cancel.is_set(),
+                "created": self.created,
+                "started": self.started,
+                "finished": self.finished,
+                "progress": dict(self.progress),
+                "error": self.error,
+                "version": self.version,
+            }
+
+
+class JobManager:
+    """Runs jobs on background threads, at most one running job per kind."""
+
+    def __init__(self, history=JOB_HISTORY):
+        self.history = history
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind, func):
+        """
+        Start func(job) on a new thread unless a job of this kind is still running.
+
+        Returns:
+            tuple: (Job, created); the running job and False when one already exists,
+                   so several clients end up watching the same run
+        """
+        with self._lock:
+            for job in reversed(self._jobs.values()):
+                if job.kind == kind and not job.done:
+                    return job, False
+            job = Job(kind)
+            self._jobs[job.id] = job
+            finished = [job_id for job_id, old in self._jobs.items() if old.done]
+            for job_id in finished[:max(0, len(finished) - self.history)]:
+                del self._jobs[job_id]
+        threading.Thread(target=self._run, args=(job, func), name=f"job-{kind}", daemon=True).start()
+        return job, True
+
+    def _run(self, job, func):
+        job._set(state="running", started=_now())
+        try:
+            result = func(job)
+            job._set(state="succeeded", result=result, finished=_now())
+        except JobCancelled:
+            logger.info(f"Job {job.kind} {job.id} cancelled")
+            job._set(state="cancelled", finished=_now())
+        except (Exception, SystemExit) as e:
+            logger.exception(f"Job {job.kind} {job.id} failed")
+            job._set(state="failed", error=str(e) or type(e).__name__, finished=_now())
+        finally:
+            job._finished.set()
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self):
+        with self._lock:
+            return [job.snapshot() for job in self._jobs.values()]
+
+
+class Progress:
+    """
+    tqdm bar whose counters are also published to a Job.
+
+    Args:
+        total (int): Number of tickers
+        desc (str): tqdm description
+        job (Job): Receives the counters, None for command line runs
+        succeeded: item -> bool, splits finished items into succeeded and failed
+        limiter (SharedTokenBucket): Source of the HTTP request count, if any
+    """
+
+    def __init__(self, total, desc, job=None, succeeded=None, limiter=None):
+        self.bar = tqdm(total=total, desc=desc)
+        self.job = job
+        self.succeeded = succeeded
+        self.limiter = limiter
+        self.ok = self.failed = 0
+        self._issued = limiter.issued if limiter is not None else None
+        if job is not None:
+            job.report(total=total, done=0, succeeded=0, failed=0)
+
+    def update(self, item):
+        self.bar.update(1)
+        if self.succeeded is not None:
+            if self.succeeded(item):
+                self.ok += 1
+            else:
+                self.failed += 1
+        if self.job is None:
+            return
+        stats = self.bar.format_dict
+        elapsed = stats["elapsed"] or 0.0
+        requests = self.limiter.issued - self._issued if self.limiter is not None else None
+        self.job.report(
+            done=stats["n"], total=stats["total"], succeeded=self.ok, failed=self.failed, elapsed=elapsed,
+            rate=stats["n"] / elapsed if elapsed else None,
+            requests=requests,
+            requests_per_sec=requests / elapsed if requests is not None and elapsed else None,
+        )
+
+    def close(self):
+        self.bar.close()
+
+
+def track(iterable, total, desc, job=None, succeeded=None, limiter=None):
+    """tqdm(iterable) that also reports to `job`, see Progress."""
+    progress = Progress(total, desc, job, succeeded, limiter)
+    try:
+        for item in iterable:
+            progress.update(item)
+            yield item
+    finally:
+        progress.close()
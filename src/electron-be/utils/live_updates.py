@@ -0,0 +1,119 @@
+import asyncio
+import json
+import math
+import threading
+
+from loguru import logger
+
+# Cycles buffered per subscriber before it is considered too slow and resynced
+SUBSCRIBER_QUEUE = 8
+# Columns that change every cycle without the contract changing
+VOLATILE_COLUMNS = ('Date', 'Time')
+
+
+def _json_value(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if hasattr(value, "item"):  # numpy scalar
+        return _json_value(value.item())
+    return value
+
+
+class CycleBroadcaster:
+    """
+    Fans every finished updater cycle out to the WebSocket subscribers.
+
+    publish() runs on the updater thread once per cycle. It diffs the cycle
+    against the previous one by Option_Ticker and encodes one `cycle` message
+    with only the new or changed rows and the removed tickers; every subscriber
+    gets that same string, so watchers cost neither Polygon requests nor disk
+    reads. A new subscriber first receives a `snapshot` of the whole last cycle.
+    """
+
+    def __init__(self, queue_size=SUBSCRIBER_QUEUE):
+        self.queue_size = queue_size
+        self.cycle_ts = None
+        self._rows = {}  # Option_Ticker -> row dict of the last cycle
+        self._subscribers = {}  # asyncio.Queue -> its event loop
+        self._lock = threading.Lock()
+
+    def _snapshot_message(self):
+        return json.dumps({"type": "snapshot", "cycle_ts": self.cycle_ts, "rows": list(self._rows.values())})
+
+    def seed(self, df, cycle_ts):
+        """Start from a stored cycle (latest_snapshot) without notifying anyone."""
+        with self._lock:
+            if self.cycle_ts is None and df is not None and len(df):
+                self._rows = self._index(df)
+                self.cycle_ts = cycle_ts
+
+    @staticmethod
+    def _index(df):
+        columns = [c for c in df.columns if c != 'Cycle_TS']
+        key = columns.index('Option_Ticker')
+        return {
+            row[key]: dict(zip(columns, map(_json_value, row)))
+            for row in df[columns].itertuples(index=False, name=None)
+        }
+
+    def publish(self, df, cycle_ts):
+        """
+        Diff one cycle against the previous and push it to every subscriber.
+
+        Args:
+            df (pd.DataFrame): Rows of the finished cycle (run_updatecontract)
+            cycle_ts (str): Its cycle timestamp
+
+        Returns:
+            dict: Counts of changed and removed rows
+        """
+        rows = self._index(df) if df is not None and len(df) else {}
+        with self._lock:
+            previous = self._rows
+            changed = [
+                row for ticker, row in rows.items()
+                if ticker not in previous or any(
+                    previous[ticker].get(name) != value
+                    for name, value in row.items() if name not in VOLATILE_COLUMNS)
+            ]
+            removed = [ticker for ticker in previous if ticker not in rows]
+            self._rows, self.cycle_ts = rows, cycle_ts
+            message = json.dumps({"type": "cycle", "cycle_ts": cycle_ts, "total": len(rows),
+                                  "changed": changed, "removed": removed})
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            loop.call_soon_threadsafe(self._deliver, queue, message)
+        logger.debug(f"Cycle {cycle_ts} pushed to {len(subscribers)} subscribers, "
+                     f"{len(changed)} changed, {len(removed)} removed")
+        return {"changed": len(changed), "removed": len(removed)}
+
+    def _deliver(self, queue, message):
+        # on the subscriber's loop
+        if queue.full():
+            # too slow to keep up with the diffs: replace the backlog with the full state
+            while not queue.empty():
+                queue.get_nowait()
+            with self._lock:
+                message = self._snapshot_message()
+        queue.put_nowait(message)
+
+    def subscribe(self):
+        """
+        Register the calling event loop's subscriber.
+
+        Returns:
+            asyncio.Queue: Encoded messages, the first one a snapshot of the last cycle
+        """
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            queue.put_nowait(self._snapshot_message())
+            self._subscribers[queue] = asyncio.get_running_loop()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+    @property
+    def subscribers(self):
+        return len(self._subscribers)
@@ -0,0 +1,296 @@
+import glob
+import json
+import os
+import shutil
+import threading
+import time
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+
+from config_chain import METRICS_DIR
+
+try:
+    import psutil
+except ImportError:
+    psutil = None
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+PAGE_BUCKETS = (1, 2, 3, 5, 10, 20, 50)
+DURATION_BUCKETS = (0.1, 0.5, 1, 2.5, 5, 15, 30, 60, 120, 300, 600, 900)
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+_LOCK = threading.Lock()
+_REGISTRY = {}
+_DIRTY = False
+_COLLECT_LOCK = threading.Lock()
+# Set by reset() in the API process and inherited by the workers it spawns. Only
+# those workers write files, so CLI runs are not counted as the API's own.
+SESSION_ENV = "METRICS_SESSION"
+# totals of the session's exited workers, folded in by collect()
+RETIRED_FILE = "retired.json"
+# the start time keeps a reused pid from overwriting an old worker's totals
+_PROCESS_NAME = f"{os.getpid()}-{time.time_ns()}.json"
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}  # label values tuple -> value
+        _REGISTRY[name] = self
+
+    def _key(self, labels):
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        global _DIRTY
+        key = self._key(labels)
+        with _LOCK:
+            self.values[key] = self.values.get(key, 0) + amount
+            _DIRTY = True
+
+
+class Gauge(_Metric):
+    """Set in the API process only, gauges are not aggregated across workers."""
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with _LOCK:
+            self.values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+        """Values are stored as per-bucket counts (last one +Inf) followed by the sum."""
+        global _DIRTY
+        key = self._key(labels)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with _LOCK:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = [0] * (len(self.buckets) + 1) + [0.0]
+            counts[index] += 1
+            counts[-1] += value
+            _DIRTY = True
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the duration of a with block, or of every call when used as a decorator."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+
+HTTP_SECONDS = Histogram("polygon_request_seconds", "Latency of Polygon HTTP requests", ("endpoint",))
+HTTP_RESPONSES = Counter("polygon_responses_total", "Polygon HTTP responses by status", ("endpoint", "status"))
+HTTP_RETRIES = Counter("polygon_retries_total", "Polygon requests retried, by reason (429, 5xx, connection)",
+                       ("endpoint", "reason"))
+PAGES = Histogram("polygon_pages_per_fetch", "Pages fetched per ticker call", ("endpoint",), PAGE_BUCKETS)
+TASK_SECONDS = Histogram("farmer_task_seconds", "Time to fetch and process one ticker", ("task",),
+                         DURATION_BUCKETS)
+WORKER_BUSY = Counter("worker_busy_seconds_total", "Time worker processes spent running tasks")
+WORKER_TASKS = Counter("worker_tasks_total", "Tasks run by worker processes")
+WORKER_PROCESSES = Gauge("worker_pool_processes", "Worker processes of the running pool")
+POOL_START = Histogram("worker_pool_start_seconds", "Time to start a worker pool", ("pool",), DURATION_BUCKETS)
+STAGE_SECONDS = Histogram("farmer_stage_seconds", "Time of each stage of a farmer run", ("farmer", "stage"),
+                          DURATION_BUCKETS)
+RUN_SECONDS = Histogram("farmer_run_seconds", "Wall time of farmer runs", ("farmer",), DURATION_BUCKETS)
+WRITE_SECONDS = Histogram("storage_write_seconds", "Time of storage writes", ("target",), DURATION_BUCKETS)
+CYCLE_SECONDS = Histogram("updater_cycle_seconds", "Wall time of updater cycles", (), DURATION_BUCKETS)
+TIMEFRAME = Gauge("updater_timeframe_seconds", "Configured time between updater cycles")
+CYCLE_OVERRUNS = Counter("updater_cycle_overruns_total", "Updater cycles that took longer than the timeframe")
+CYCLE_INTERVAL = Histogram("updater_cycle_interval_seconds", "Time between the starts of consecutive updater cycles",
+                           (), DURATION_BUCKETS + (1800, 3600))
+CARRIED_SYMBOLS = Counter("updater_carried_symbols_total", "Symbols not started before an updater cycle's deadline")
+
+
+def endpoint_label(url):
+    """Polygon endpoint of url without tickers: snapshot_chain, snapshot_contract, snapshot_multi or reference."""
+    path = urlsplit(str(url)).path
+    if path.rstrip("/") == "/v3/snapshot":
+        return "snapshot_multi"
+    if path.startswith("/v3/snapshot/options/"):
+        return "snapshot_contract" if path.count("/") > 4 else "snapshot_chain"
+    if path.startswith("/v3/reference/options/"):
+        return "reference"
+    return "other"
+
+
+def _session_dir():
+    session = os.environ.get(SESSION_ENV)
+    return os.path.join(METRICS_DIR, session) if session else None
+
+
+def flush():
+    """
+    Write this process's counters and histograms to its file in the API session's directory.
+
+    Called by worker processes after every task, so the API process can add
+    them up in collect() even after the worker exited. A no-op outside the
+    API's workers.
+    """
+    global _DIRTY
+    directory = _session_dir()
+    if directory is None or os.environ[SESSION_ENV] == str(os.getpid()):
+        return  # CLI run, or the API process itself: collect() reads its memory
+    with _LOCK:
+        if not _DIRTY:
+            return
+        snapshot = {m.name: [[list(k), v] for k, v in m.values.items()]
+                    for m in _REGISTRY.values() if m.kind != "gauge"}
+        _DIRTY = False
+    path = os.path.join(directory, _PROCESS_NAME)
+    try:
+        os.makedirs(directory, exist_ok=True)
+        with open(f"{path}.tmp", "w") as f:
+            json.dump(snapshot, f)
+        os.replace(f"{path}.tmp", path)
+    except OSError:
+        _DIRTY = True  # try again after the next task
+
+
+def reset():
+    """
+    Start a metrics session (API start): drop the files of earlier sessions and
+    CLI runs, counters then restart from zero. Workers spawned afterwards write
+    into this session only.
+    """
+    shutil.rmtree(METRICS_DIR, ignore_errors=True)
+    os.environ[SESSION_ENV] = str(os.getpid())
+
+
+def _pid_alive(pid):
+    if psutil is not None:
+        return psutil.pid_exists(pid)
+    if os.name == "nt":
+        return True  # os.kill would terminate it; files are pruned with psutil only
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _add(metric, merged, key, value):
+    if metric.kind != "histogram":
+        merged[key] = merged.get(key, 0) + value
+    elif key in merged:
+        merged[key] = [a + b for a, b in zip(merged[key], value)]
+    else:
+        merged[key] = list(value)
+
+
+def _merge(merged, snapshot):
+    for name, series in snapshot.items():
+        metric = _REGISTRY.get(name)
+        if metric is None or metric.kind == "gauge":
+            continue
+        target = merged.setdefault(name, {})
+        for key, value in series:
+            _add(metric, target, tuple(key), value)
+
+
+def _load(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # missing, or a worker is replacing it
+
+
+def _retire(directory, paths):
+    """Fold the files of exited workers into RETIRED_FILE and delete them."""
+    retired_path = os.path.join(directory, RETIRED_FILE)
+    merged = {}
+    _merge(merged, _load(retired_path) or {})
+    folded = []
+    for path in paths:
+        snapshot = _load(path)
+        if snapshot is not None:
+            _merge(merged, snapshot)
+            folded.append(path)
+    if not folded:
+        return
+    try:
+        with open(f"{retired_path}.tmp", "w") as f:
+            json.dump({name: [[list(k), v] for k, v in series.items()] for name, series in merged.items()}, f)
+        os.replace(f"{retired_path}.tmp", retired_path)
+        for path in folded:
+            os.remove(path)
+    except OSError:
+        pass  # the files stay and are folded next time
+
+
+def collect():
+    """
+    Returns:
+        dict: metric -> {label values: value}, this process plus every worker of its session
+    """
+    with _LOCK:
+        merged = {m.name: {k: (list(v) if m.kind == "histogram" else v) for k, v in m.values.items()}
+                  for m in _REGISTRY.values()}
+    directory = _session_dir()
+    if directory is None:
+        return merged
+    with _COLLECT_LOCK:  # scrapes fold retired files one at a time
+        exited = []
+        for path in glob.glob(os.path.join(directory, "*-*.json")):
+            try:
+                pid = int(os.path.basename(path).split("-", 1)[0])
+            except ValueError:
+                continue
+            if not _pid_alive(pid):
+                exited.append(path)
+        if exited:
+            _retire(directory, exited)
+        for path in glob.glob(os.path.join(directory, "*.json")):
+            snapshot = _load(path)
+            if snapshot is not None:
+                _merge(merged, snapshot)
+    return merged
+
+
+def _labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{n}="{str(v)}"' for n, v in pairs) + "}"
+
+
+def render():
+    """Every metric in the Prometheus text exposition format."""
+    lines = []
+    for name, series in collect().items():
+        metric = _REGISTRY[name]
+        lines.append(f"# HELP {name} {metric.documentation}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        for key, value in sorted(series.items()):
+            if metric.kind != "histogram":
+                lines.append(f"{name}{_labels(metric.labelnames, key)} {value}")
+                continue
+            cumulative = 0
+            for bound, count in zip(metric.buckets + ("+Inf",), value[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else f"{bound:g}"
+                lines.append(f"{name}_bucket{_labels(metric.labelnames, key, ('le', le))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(metric.labelnames, key)} {value[-1]}")
+            lines.append(f"{name}_count{_labels(metric.labelnames, key)} {cumulative}")
+    return "\n".join(lines) + "\n"
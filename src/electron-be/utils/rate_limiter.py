@@ -0,0 +1,96 @@
+import asyncio
+import time
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from multiprocessing import get_context
+
+_TOKENS, _LAST_REFILL, _PAUSED_UNTIL, _ISSUED = range(4)
+
+
+class SharedTokenBucket:
+    """
+    Token bucket kept in shared memory so every pool worker draws from one budget.
+
+    Pass the instance to the workers through the Pool initializer (initargs), it
+    cannot be pickled into regular task arguments.
+    """
+
+    def __init__(self, rate, burst=None, ctx=None):
+        """
+        Args:
+            rate (float): Requests per second allowed across all processes.
+            burst (int): Bucket size, how many requests may go out back to back.
+            ctx: multiprocessing context the workers are started from.
+        """
+        ctx = ctx or get_context('spawn')
+        self.rate = float(rate)
+        self.burst = float(burst or rate)
+        self._state = ctx.Array('d', [self.burst, time.monotonic(), 0.0, 0.0])
+
+    def _take(self):
+        """Take a token if one is free; otherwise return how long to wait."""
+        with self._state.get_lock():
+            state = self._state
+            now = time.monotonic()
+            if state[_PAUSED_UNTIL] > now:
+                return state[_PAUSED_UNTIL] - now
+            state[_TOKENS] = min(self.burst, state[_TOKENS] + (now - state[_LAST_REFILL]) * self.rate)
+            state[_LAST_REFILL] = now
+            if state[_TOKENS] >= 1:
+                state[_TOKENS] -= 1
+                state[_ISSUED] += 1
+                return 0.0
+            return (1 - state[_TOKENS]) / self.rate
+
+    @property
+    def issued(self):
+        """Requests let through so far, by every process."""
+        return int(self._state[_ISSUED])
+
+    def acquire(self):
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            time.sleep(wait)
+
+    async def acquire_async(self):
+        while True:
+            wait = self._take()
+            if not wait:
+                return
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds):
+        """Stop every worker for `seconds`, e.g. after a 429 with Retry-After."""
+        with self._state.get_lock():
+            now = time.monotonic()
+            self._state[_PAUSED_UNTIL] = max(self._state[_PAUSED_UNTIL], now + seconds)
+            self._state[_TOKENS] = 0.0
+            self._state[_LAST_REFILL] = self._state[_PAUSED_UNTIL]
+
+
+def build_rate_limiter(rate, burst=None, ctx=None):
+    """Return a SharedTokenBucket, or None when rate limiting is disabled (rate of 0/None)."""
+    if not rate:
+        return None
+    return SharedTokenBucket(rate, burst, ctx)
+
+
+def retry_after_seconds(value, default):
+    """
+    Parse a Retry-After header, either delta-seconds or an HTTP date.
+
+    Returns:
+        float: Seconds to wait, `default` when the header is missing or malformed.
+    """
+    if not value:
+        return default
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, (parsedate_to_datetime(value) - datetime.now(timezone.utc)).total_seconds())
+    except (TypeError, ValueError):
+        return default
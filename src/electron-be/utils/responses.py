@@ -0,0 +1,101 @@
+import json
+import math
+
+import numpy as np
+import pandas as pd
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse, Response
+
+try:
+    import orjson
+except ImportError:  # the stdlib encoder, with NaN/inf replaced by hand
+    orjson = None
+
+try:
+    import pyarrow as pa
+except ImportError:  # format=arrow answers 406 without it
+    pa = None
+
+# Response layouts of frame_response
+FORMATS = ("records", "columns", "arrow")
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+
+def _default(value):
+    # pd.NA / NaT and numpy scalars orjson does not serialize on its own
+    if value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _finite(value):
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    if isinstance(value, dict):
+        return {k: _finite(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_finite(v) for v in value]
+    return value
+
+
+def dumps(content):
+    """JSON bytes with NaN and +-inf as null; NumPy arrays and scalars are serialized directly."""
+    if orjson is not None:
+        return orjson.dumps(content, default=_default, option=orjson.OPT_SERIALIZE_NUMPY)
+    return json.dumps(_finite(content), default=_default, separators=(",", ":")).encode()
+
+
+class FastJSONResponse(JSONResponse):
+    """JSONResponse rendered with dumps(), the API's default response class."""
+
+    def render(self, content):
+        return dumps(content)
+
+
+def _column_values(series):
+    values = series.to_numpy()
+    if values.dtype.kind in "biuf" and values.flags.c_contiguous:
+        return values  # serialized straight from the buffer, NaN -> null
+    return series.tolist()
+
+
+def frame_records(df):
+    """Row dicts of df with plain Python values, cheaper than df.to_dict(orient="records")."""
+    columns = list(df.columns)
+    return [dict(zip(columns, row)) for row in zip(*(df[c].tolist() for c in columns))]
+
+
+def frame_columns(df):
+    """Columnar payload: {"columns": [...], "data": {column: values}, "rows": n}."""
+    return {
+        "columns": list(df.columns),
+        "data": {c: _column_values(df[c]) for c in df.columns},
+        "rows": len(df),
+    }
+
+
+def frame_payload(df, fmt="records"):
+    return frame_columns(df) if fmt == "columns" else frame_records(df)
+
+
+def frame_response(df, fmt="records", headers=None):
+    """
+    Serialize df as records (list of row objects), columns (one array per column)
+    or arrow (Arrow IPC stream), NaN and +-inf as null.
+
+    Raises:
+        HTTPException: 400 for an unknown format, 406 for arrow without pyarrow
+    """
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {fmt}, expected one of {list(FORMATS)}")
+    if fmt == "arrow":
+        if pa is None:
+            raise HTTPException(status_code=406, detail="Arrow responses need pyarrow installed")
+        table = pa.Table.from_pandas(df.replace([np.inf, -np.inf], np.nan), preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return Response(content=sink.getvalue().to_pybytes(), media_type=ARROW_MEDIA_TYPE, headers=headers)
+    return FastJSONResponse(content=frame_payload(df, fmt), headers=headers)
@@ -0,0 +1,95 @@
+import math
+import time
+from collections import deque
+
+from loguru import logger
+
+from config_contract import UPDATER_DEADLINE_FRACTION
+from utils.metrics import CYCLE_INTERVAL, CARRIED_SYMBOLS
+
+
+def next_boundary(now, period):
+    """First multiple of period seconds (since the epoch) after now, e.g. the next :00/:15/:30/:45."""
+    return (math.floor(now / period) + 1) * period
+
+
+def past_deadline(deadline):
+    """True once the wall-clock deadline (time.time()) of an updater cycle has passed."""
+    return deadline is not None and time.time() >= deadline
+
+
+class UpdateScheduler:
+    """
+    Cadence and symbol order of the updater loop.
+
+    Cycles start on wall-clock boundaries of the timeframe instead of a
+    timeframe after the previous cycle ended, so they do not drift. Symbols are
+    only dispatched until the cycle's deadline (UPDATER_DEADLINE_FRACTION of the
+    timeframe); the ones not started by then are carried over. Each cycle runs
+    the symbols that have waited the most cycles first, the slowest first among
+    those, so carried symbols go first and long fetches do not end up past the
+    deadline.
+    """
+
+    def __init__(self, deadline_fraction=UPDATER_DEADLINE_FRACTION, smoothing=0.3, window=20):
+        self.deadline_fraction = deadline_fraction
+        self.smoothing = smoothing
+        self.cycle = 0
+        self.last_cycle = {}  # symbol -> cycle it was last run in
+        self.cost = {}  # symbol -> smoothed seconds per update
+        self.carried = []
+        self.starts = deque(maxlen=window)
+        self.last = {}
+
+    def start_cycle(self, now, period):
+        """
+        Returns:
+            float: time.time() after which no more symbols are dispatched
+        """
+        self.cycle += 1
+        if self.starts:
+            CYCLE_INTERVAL.observe(now - self.starts[-1])
+        self.starts.append(now)
+        return now + period * self.deadline_fraction
+
+    def wait_seconds(self, now, period):
+        """Seconds until the boundary after the current cycle's start, 0 when it already passed."""
+        return max(0.0, next_boundary(self.starts[-1], period) - now) if self.starts else 0.0
+
+    def order(self, symbols):
+        """symbols sorted by cycles waited (never run first), then by their last duration."""
+        return sorted(symbols, key=lambda s: (self.last_cycle.get(s, 0), -self.cost.get(s, 0.0)))
+
+    def record(self, results):
+        """
+        Book one cycle's results.
+
+        Args:
+            results (dict): symbol -> seconds it took, or None when it was not started before the deadline
+        """
+        carried = []
+        for symbol, elapsed in results.items():
+            if elapsed is None:
+                carried.append(symbol)
+                continue
+            self.last_cycle[symbol] = self.cycle
+            previous = self.cost.get(symbol)
+            self.cost[symbol] = elapsed if previous is None else \
+                previous + self.smoothing * (elapsed - previous)
+        self.carried = carried
+        if carried:
+            CARRIED_SYMBOLS.inc(len(carried))
+            logger.warning(f"Updater deadline reached, {len(carried)} symbols carried over to the next cycle")
+        self.last = {"run": len(results) - len(carried), "carried": len(carried)}
+
+    def cadence(self, period):
+        """
+        Returns:
+            dict: target and achieved seconds between cycle starts (median of the last cycles,
+            so the shorter first one before the loop reaches a boundary does not count), and the
+            symbols run and carried over in the last cycle
+        """
+        starts = list(self.starts)
+        intervals = sorted(b - a for a, b in zip(starts, starts[1:]))
+        achieved = intervals[len(intervals) // 2] if intervals else None
+        return {"target_sec": period, "achieved_sec": achieved, "cycles": self.cycle, **self.last}
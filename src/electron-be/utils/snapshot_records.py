@@ -0,0 +1,60 @@
+from collections import namedtuple
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:  # plain json is slower but decodes the same pages
+    import json
+    loads = json.loads
+
+# The snapshot fields the farmers read, flattened out of details / greeks / last_quote / day
+SnapshotContract = namedtuple('SnapshotContract', [
+    'ticker', 'strike_price', 'expiration_date', 'contract_type',
+    'implied_volatility', 'open_interest', 'delta', 'gamma', 'theta', 'vega',
+    'bid', 'ask', 'open', 'high', 'low', 'close', 'volume', 'vwap',
+])
+
+_EMPTY = {}
+
+
+def project_snapshot(contract):
+    """
+    Project one snapshot contract dict onto a SnapshotContract.
+
+    Returns:
+        SnapshotContract: or None when the contract has no strike or expiration date
+    """
+    details = contract.get('details') or _EMPTY
+    strike, expiry = details.get('strike_price'), details.get('expiration_date')
+    if strike is None or expiry is None:
+        return None
+    greeks = contract.get('greeks') or _EMPTY
+    quote = contract.get('last_quote') or _EMPTY
+    day = contract.get('day') or _EMPTY
+    return SnapshotContract(
+        details.get('ticker'), strike, expiry, details.get('contract_type', ''),
+        contract.get('implied_volatility'), contract.get('open_interest'),
+        greeks.get('delta'), greeks.get('gamma'), greeks.get('theta'), greeks.get('vega'),
+        quote.get('bid'), quote.get('ask'),
+        day.get('open'), day.get('high'), day.get('low'), day.get('close'), day.get('volume'), day.get('vwap'),
+    )
+
+
+def decode_page(body):
+    """Decode a Polygon page as is."""
+    return loads(body)
+
+
+def decode_snapshot_page(body):
+    """
+    Decode a snapshot chain page, keeping only SnapshotContract records.
+
+    The nested page dict is dropped as soon as it is projected, so a worker holds
+    one page of full contracts at a time instead of the whole chain.
+
+    Returns:
+        dict: {'results': [SnapshotContract, ...], 'next_url': str or None}
+    """
+    page = loads(body)
+    records = [project_snapshot(contract) for contract in page.get('results') or ()]
+    return {'results': [record for record in records if record is not None], 'next_url': page.get('next_url')}
@@ -1,54 +1,60 @@
 import os
+import queue
+import threading
 import time
 
+import numpy as np
 import pandas as pd
-import redis
 from loguru import logger
 from datetime import datetime, timedelta, timezone
-
-from utils.api_client import fetch_option_snapshot
-from config_contract import TICKER_DIR
-import config_chain
-import config_contract
+from zoneinfo import ZoneInfo
+
+from utils.api_client import fetch_option_snapshots, get_redis
+from utils.contract_store import contract_file_stem, write_contracts, export_legacy_files, export_legacy_frame
+from utils.contract_store import OPTION_SYMBOL_RE, read_partition, write_partition
+from utils.snapshot_records import loads
+from utils.contract_batch import batches_frame
+from utils.metrics import WRITE_SECONDS
+from config_contract import TICKER_DIR, LEGACY_CONTRACT_FILES, CONTRACT_DATASET_DIR
+from config_contract import UPDATER_EVENTS, UPDATER_EVENTS_KEY, UPDATER_STREAM_MAXLEN
+from config_chain import LEGACY_REDIS_CHAIN, CHAIN_WRITE_QUEUE
 
 import re
+
+try:
+    import orjson
+
+    def _dumps(value):
+        return orjson.dumps(value)
+except ImportError:
+    import json
+
+    def _dumps(value):
+        return json.dumps(value, separators=(",", ":"))
+
+REDIS_BATCH_SIZE = 500
+
+
+@WRITE_SECONDS.time(target="contract_dataset")
 def save_contract_option_tickers(ticker, options, DIR):
     """
-    Save individual option contracts to separate CSV files
+    Save option contracts to the Parquet contract dataset (utils.contract_store)
+
+    With LEGACY_CONTRACT_FILES the old one-CSV-per-contract layout is also written to DIR.
 
     Args:
         ticker (str): Stock symbol
-        options (list): List of option contract dictionaries
+        options (ContractBatch): Selected contracts of the ticker
     """
     if not options:
         logger.warning(f"No call contract options found for {ticker}")
         return
-    os.makedirs(DIR, exist_ok=True)
-
-    # Create DataFrame first
-    df = pd.DataFrame(options)
-
-    # Iterate through each option contract
-    for _, row in df.iterrows():
-        try:
-            # Format filename components      
-            option_ticker = row['Option_Ticker']
-            match = re.search(r'O:([A-Z]+[0-9]?)(\d{6})', option_ticker)
-            if match:
-                unique_symbol = match.group(1)
-            else:
-                unique_symbol = ticker
-            expiry = str(row['Expiry']).replace('-', '')
-            strike = str(row['Strike_Price']).replace('.0', '')
-            option_type = str(row['Contract_Type'])
-            type = 'C' if option_type == 'Call' else 'P'
-            # Create filename
-            filename = f"{DIR}/{unique_symbol}_{type}_{expiry}_{strike}.csv"
-            # Convert single row to DataFrame and save
-            row.to_frame().T.to_csv(filename, index=False)
-        except Exception as e:
-            logger.warning(f"Error processing contract for {ticker}: {str(e)}")
-            continue
+    try:
+        write_contracts(ticker, options)
+    except Exception as e:
+        logger.warning(f"Error saving contracts for {ticker}: {str(e)}")
+    if LEGACY_CONTRACT_FILES:
+        export_legacy_files(options.records(), ticker, DIR)
 
 
 def save_full_contract_option_tickers(ticker, options, DIR, name):
@@ -82,123 +88,450 @@ def save_full_contract_option_tickers(ticker, options, DIR, name):
         logger.warning(f"Error processing contract for {ticker}: {str(e)}")
 
 
-def update_chain(csv_path):
+SNAPSHOT_UPDATE_COLUMNS = ["Gamma", "Open_interest", "Contract_price", "Last_trade", "Expiry", "Strike"]
+
+
+def snapshot_updates(snapshots):
     """
-    Load the per-contract CSV if it exists, update metrics,
-    or create a new DataFrame if not.
+    Flatten fetch_option_snapshots results into one row per option ticker.
+
+    Returns:
+        DataFrame: SNAPSHOT_UPDATE_COLUMNS indexed by option ticker
     """
-    utc_now = datetime.now(timezone.utc)
-    utc_plus8 = utc_now + timedelta(hours=8)
-    if os.path.exists(csv_path):
-        df = pd.read_csv(csv_path)
-        for _, row in df.iterrows():
-            ticker = row['Symbol']
-            option_ticker = row['Ticker']
-
-            contract = fetch_option_snapshot(ticker, option_ticker)
-            if not contract or 'results' not in contract:
-                logger.warning(f"Missing data for {option_ticker}")
-                continue
+    rows = []
+    for option_ticker, result in snapshots.items():
+        details = result.get('details') or {}
+        rows.append((option_ticker, (result.get('greeks') or {}).get('gamma'), result.get('open_interest'),
+                     (result.get('underlying_asset') or {}).get('price'), (result.get('last_trade') or {}).get('price'),
+                     details.get('expiration_date'), details.get('strike_price')))
+    return pd.DataFrame(rows, columns=["Ticker"] + SNAPSHOT_UPDATE_COLUMNS).set_index("Ticker")
+
 
-            gamma = contract['results']['greeks']['gamma']
-            oi = contract['results']['open_interest']
-            last_trade = contract['results']['last_trade']['price']
-            Contract_price = contract['results']['underlying_asset']['price']
+def _last_update_stamp():
+    utc_plus8 = datetime.now(timezone.utc) + timedelta(hours=8)
+    return utc_plus8.strftime('%m/%d/%Y %H:%M UTC+8')
 
-            df.loc[_, ["Gamma", "Open_interest", "Contract_price", "Last_trade"]] = [gamma, oi, Contract_price,
-                                                                                     last_trade]
-            df.loc[_, ["Last_update"]] = [utc_plus8.strftime('%m/%d/%Y %H:%M UTC+8')]
-        df.to_csv(csv_path, index=False)
-        logger.info(f"Successful Updated {csv_path}")
 
+def _fetch_updates(df):
+    """Snapshot every option ticker of df in batches, logs the ones Polygon did not return."""
+    option_tickers = df['Ticker'].dropna().astype(str).unique().tolist()
+    updates = snapshot_updates(fetch_option_snapshots(option_tickers))
+    missing = len(option_tickers) - len(updates)
+    if missing:
+        absent = [t for t in option_tickers if t not in updates.index]
+        logger.warning(f"Missing data for {missing} contracts, e.g. {', '.join(absent[:5])}")
+    return updates
 
-def update_contract_full(csv_path):
+
+def update_chain(csv_path):
     """
-    Load the per-contract CSV if it exists, update metrics,
-    or create a new DataFrame if not.
+    Refresh Gamma, Open_interest, Contract_price and Last_trade of every contract of
+    a chain CSV from one batched snapshot, then write the CSV once.
     """
-    utc_now = datetime.now(timezone.utc)
-    utc_plus8 = utc_now + timedelta(hours=8)
-    if os.path.exists(csv_path):
-        df = pd.read_csv(csv_path)
-        for _, row in df.iterrows():
-            option_ticker = row['Ticker']
-            ticker = row['Symbol']
-            type = 'C' if row['Type'].lower() == 'call' else 'P'
-
-            contract = fetch_option_snapshot(ticker, option_ticker)
-            if not contract or 'results' not in contract:
-                logger.warning(f"Missing data for {option_ticker}")
-                continue
+    if not os.path.exists(csv_path):
+        return
+    df = pd.read_csv(csv_path)
+    updates = _fetch_updates(df)
+    found = df['Ticker'].isin(updates.index)
+    for column in ["Gamma", "Open_interest", "Contract_price", "Last_trade"]:
+        fresh = df['Ticker'].map(updates[column])
+        df[column] = fresh.where(found, df[column]) if column in df else fresh
+    df['Last_update'] = np.where(found, _last_update_stamp(), df['Last_update'] if 'Last_update' in df else None)
+    df.to_csv(csv_path, index=False)
+    logger.info(f"Successful Updated {found.sum()}/{len(df)} contracts of {csv_path}")
+
+
+def update_contract_full(csv_path, date=None, root=CONTRACT_DATASET_DIR):
+    """
+    Refresh Gamma, Open_interest and Last_trade of every contract of a chain CSV
+    in the contract dataset (the legacy per-contract files too with LEGACY_CONTRACT_FILES).
 
-            expiry = str(contract['results']['details']['expiration_date']).replace('-', '')
-            strike = str(contract['results']['details']['strike_price']).replace('.0', '')
+    The contracts are snapshotted in batches; each (date, symbol) partition is read
+    once, merged and written once, however many of its contracts are listed.
 
-            update_path = f"{ticker}_{type}_{expiry}_{strike}.csv"
-            path_call = os.path.join(TICKER_DIR, update_path)
+    Args:
+        csv_path (str): Chain CSV with Symbol and Ticker (option ticker) columns
+        date (str): YYYY-MM-DD partition to update, today in New York if None
+        root (str): Dataset directory
+    """
+    if not os.path.exists(csv_path):
+        return
+    df = pd.read_csv(csv_path)
+    updates = _fetch_updates(df)
+    df = df[df['Ticker'].isin(updates.index)].drop_duplicates('Ticker', keep='last')
+    if df.empty:
+        return
+    date = date or datetime.now(ZoneInfo("America/New_York")).strftime('%Y-%m-%d')
+    symbols = df['Ticker'].astype(str).str.extract(OPTION_SYMBOL_RE, expand=True)[0].fillna(df['Symbol'])
+    stamp = _last_update_stamp()
+    updated = missing = 0
+    for symbol, tickers in df['Ticker'].groupby(symbols, sort=False):
+        part = read_partition(date, symbol, root)
+        if part is None:
+            logger.warning(f"No contracts of {symbol} stored for {date}")
+            missing += len(tickers)
+            continue
+        found = part['Option_Ticker'].isin(tickers)
+        if not found.any():
+            missing += len(tickers)
+            continue
+        for column in ("Gamma", "Open_interest", "Last_trade"):
+            fresh = part['Option_Ticker'].map(updates[column])
+            part[column] = fresh.where(found, part[column]) if column in part else fresh.where(found)
+        part['Last_update'] = np.where(found, stamp, part['Last_update'] if 'Last_update' in part else None)
+        write_partition(part, date, symbol, root)
+        if LEGACY_CONTRACT_FILES:
+            export_legacy_frame(part[found].assign(symbol=symbol), TICKER_DIR)
+        updated += int(found.sum())
+        missing += len(tickers) - int(found.sum())
+    if missing:
+        logger.warning(f"{missing} contracts of {csv_path} are not in the {date} dataset")
+    logger.info(f"Successful Updated {updated} contracts of the {date} dataset from {csv_path}")
+
+
+def chain_redis_key(edt_time, symbol=None):
+    """OptionChain_YYYYMMDD:{symbol} value key, or OptionChain_YYYYMMDD:symbols (the index set) without symbol."""
+    return f"OptionChain_{edt_time.strftime('%Y%m%d')}:{symbol or 'symbols'}"
+
+
+class ChainRedisWriter:
+    """
+    Stores the day's option chain one symbol per key, so readers fetch only the symbols they need.
 
-            df_update = pd.read_csv(path_call)
-            gamma = contract['results']['greeks']['gamma']
-            oi = contract['results']['open_interest']
-            last_trade = contract['results']['last_trade']['price']
+    Each OptionChain_YYYYMMDD:{SYM} holds that symbol's rows as compact columnar
+    JSON ({column: [values]}); OptionChain_YYYYMMDD:symbols indexes them. write()
+    can be called as results arrive, every symbol is readable as soon as it was
+    written. finish() deletes the symbols of an earlier run of the same day
+    that were not written again, unless this run wrote none.
+    """
 
-            df_update.loc[0, ["Gamma", "Open_interest", "Last_trade"]] = [gamma, oi, last_trade]
-            df_update.loc[0, ["Last_update"]] = [utc_plus8.strftime('%m/%d/%Y %H:%M UTC+8')]
-            df_update.to_csv(path_call, index=False)
-            logger.info(f"Successful Updated {path_call}")
-            
-            
-def save_to_redis(df, edt_time):
-    """Converts an entire DataFrame to a single JSON string and saves it to Redis."""
-    # Define a single key for the entire dataset
-    r = redis.Redis(host=config_chain.REDIS_HOST, port=config_chain.REDIS_PORT, password=config_chain.REDIS_PASSWORD, db=0)
+    def __init__(self, edt_time, batch_size=REDIS_BATCH_SIZE):
+        """
+        Args:
+            edt_time (datetime): Day of the chain
+            batch_size (int): Symbols per pipeline flush
+        """
+        self.edt_time = edt_time
+        self.batch_size = batch_size
+        self.index_key = chain_redis_key(edt_time)
+        self.symbols = set()
+        self._redis = get_redis()
+        self._stale = self._redis.smembers(self.index_key)
+
+    @WRITE_SECONDS.time(target="redis_chain")
+    def write(self, df):
+        """Store the symbols of df (whole symbols, one row per contract) and add them to the index."""
+        if df.empty:
+            return
+        pipe = self._redis.pipeline(transaction=False)
+        # one stable sort by symbol and one tolist per column, then every symbol is a slice
+        codes, uniques = pd.factorize(df['Symbol'])
+        order = np.argsort(codes, kind='stable')
+        bounds = np.searchsorted(codes[order], np.arange(len(uniques) + 1))
+        columns = {c: df[c].to_numpy()[order].tolist() for c in df.columns}
+        symbols = list(uniques)
+        for first in range(0, len(symbols), self.batch_size):
+            last = min(first + self.batch_size, len(symbols))
+            for i in range(first, last):
+                pipe.set(chain_redis_key(self.edt_time, symbols[i]),
+                         _dumps({c: values[bounds[i]:bounds[i + 1]] for c, values in columns.items()}))
+            pipe.sadd(self.index_key, *symbols[first:last])
+            pipe.execute()
+        self.symbols.update(symbols)
+
+    def finish(self, legacy_df=None):
+        """
+        Args:
+            legacy_df (pd.DataFrame): Whole chain for the single OptionChain_YYYYMMDD
+                blob, written when LEGACY_REDIS_CHAIN is set
+        """
+        if not self.symbols:
+            logger.warning(f"No option chain symbols written, keeping the earlier ones under {self.index_key}")
+            return
+        stale = self._stale - self.symbols
+        pipe = self._redis.pipeline(transaction=False)
+        if stale:
+            pipe.delete(*(chain_redis_key(self.edt_time, symbol) for symbol in stale))
+            pipe.srem(self.index_key, *stale)
+        if LEGACY_REDIS_CHAIN and legacy_df is not None:
+            pipe.set(f"OptionChain_{self.edt_time.strftime('%Y%m%d')}", legacy_df.to_json(orient="records", indent=4))
+        pipe.execute()
+        logger.info(f"Saved the option chain of {len(self.symbols)} symbols to Redis under {self.index_key}")
+
+
+def save_to_redis(df, edt_time, batch_size=REDIS_BATCH_SIZE):
+    """
+    Save a whole day's option chain with ChainRedisWriter.
 
-    key = f"OptionChain_{edt_time.strftime('%Y%m%d')}"
+    Args:
+        df (pd.DataFrame): run_optionchain output, one row per contract
+        edt_time (datetime): Day of the chain
+    """
+    writer = ChainRedisWriter(edt_time, batch_size)
+    writer.write(df)
+    writer.finish(df)
 
-    logger.info("Converting entire DataFrame to a JSON string...")
-    json_data = df.to_json(orient="records", indent=4)
 
-    logger.info(f"Saving option chain Redis in key: '{key}'")
+class ChainStreamWriter:
+    """
+    Writes run_optionchain results while the run is still going, so nothing waits
+    for the slowest ticker and memory does not grow with the universe.
 
-    r.set(key, json_data)
+    put() hands a ticker's ContractBatch to a writer thread through a bounded
+    queue (a full queue holds the producer back). The thread takes whatever is
+    pending, appends it to the CSV (flushed, so a crash keeps the rows written
+    so far) and stores its symbols with ChainRedisWriter.
+    """
 
-    logger.info("Save complete.")
+    def __init__(self, csv_path, edt_time, max_pending=CHAIN_WRITE_QUEUE):
+        """
+        Args:
+            csv_path (str): The day's OptionChain_YYYYMMDD.csv, replaced
+            edt_time (datetime): Day of the chain
+            max_pending (int): Batches queued before put() blocks
+        """
+        self.csv_path = csv_path
+        self.rows = 0
+        self.redis_error = None
+        self._error = None
+        self._redis = ChainRedisWriter(edt_time)
+        self._queue = queue.Queue(maxsize=max_pending)
+        self._file = open(csv_path, "w", newline="")
+        self._thread = threading.Thread(target=self._run, name="chain-writer", daemon=True)
+        self._thread.start()
+
+    def put(self, batch):
+        """
+        Raises:
+            Exception: The error that stopped the CSV writer
+        """
+        if self._error is not None:
+            raise self._error
+        if batch:
+            self._queue.put(batch)
+
+    def _drain(self, first):
+        batches = [first]
+        while len(batches) < self._queue.maxsize:
+            try:
+                batch = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if batch is None:
+                self._queue.put(None)  # seen again by _run
+                break
+            batches.append(batch)
+        return batches
+
+    def _run(self):
+        while True:
+            batch = self._queue.get()
+            if batch is None:
+                return
+            if self._error is not None:
+                continue  # keep draining so put() never blocks forever
+            try:
+                df = batches_frame(self._drain(batch))
+                with WRITE_SECONDS.time(target="csv_chain"):
+                    df.to_csv(self._file, header=self.rows == 0, index=False)
+                    self._file.flush()
+            except Exception as e:
+                # the thread keeps draining, put() and close() raise the error
+                self._error = e
+                continue
+            self.rows += len(df)
+            if self.redis_error is None:
+                try:
+                    self._redis.write(df)
+                except Exception as e:
+                    # the CSV goes on; the error is raised by close()
+                    self.redis_error = e
+                    logger.warning(f"Writing the option chain to Redis failed, CSV only from now: {str(e)}")
+
+    def close(self, complete=True):
+        """
+        Wait for the queued batches, close the CSV and finish the Redis index.
+
+        Args:
+            complete (bool): False when the run failed or was cancelled: what was
+                written stays, but earlier symbols are not dropped from Redis.
+                A run that wrote no rows never drops them either
+
+        Returns:
+            int: Rows written
+
+        Raises:
+            Exception: The CSV or Redis error met while writing
+        """
+        self._queue.put(None)
+        self._thread.join()
+        self._file.close()
+        if not complete:
+            return self.rows
+        if self._error is not None:
+            raise self._error
+        if self.redis_error is not None:
+            raise self.redis_error
+        legacy_df = pd.read_csv(self.csv_path) if LEGACY_REDIS_CHAIN and self.rows else None
+        self._redis.finish(legacy_df)
+        return self.rows
+
+
+def load_chain_from_redis(edt_time, symbols=None):
+    """
+    Read the chain save_to_redis stored, for a few symbols or all of them.
 
+    Args:
+        edt_time (datetime): Day of the chain
+        symbols (list): Symbols to read, every indexed symbol if None
 
-def save_single_to_redis(options, ticker, DIR):
-    """Converts an entire DataFrame to a single JSON string and saves it to Redis."""
-    # Define a single key for the entire dataset
+    Returns:
+        pd.DataFrame: Rows of the symbols found, in the order asked; empty if none
+    """
+    r = get_redis()
+    if symbols is None:
+        symbols = sorted(r.smembers(chain_redis_key(edt_time)))
+    if not symbols:
+        return pd.DataFrame()
+    values = r.mget([chain_redis_key(edt_time, symbol) for symbol in symbols])
+    frames = [pd.DataFrame(loads(value)) for value in values if value is not None]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+
+@WRITE_SECONDS.time(target="redis_contracts")
+def save_single_to_redis(options, ticker, batch_size=REDIS_BATCH_SIZE):
+    """
+    Write every contract as its own Redis hash, straight from the in-memory batch.
 
-    os.makedirs(DIR, exist_ok=True)
+    Hashes are keyed {SYM}_{C|P}_{expiry}_{strike} like the per-contract CSV files and
+    sent through one non-transactional pipeline, flushed every batch_size contracts.
 
-    # Create DataFrame first
-    df = pd.DataFrame(options)
-    r = redis.Redis(host=config_contract.REDIS_HOST, port=config_contract.REDIS_PORT,
-                    password=config_contract.REDIS_PASSWORD, db=0)
-    # Iterate through each option contract
-    for _, row in df.iterrows():
-        key = row.get('Option_Ticker', f"{ticker}_UNKNOWN")
+    Args:
+        options (ContractBatch): Selected contracts of the ticker
+        ticker (str): Stock symbol, used when the option ticker cannot be parsed
+        batch_size (int): Contracts per pipeline flush
+    """
+    if not options:
+        return
+    pipe = get_redis().pipeline(transaction=False)
+    queued = 0
+    for option in options.records():
+        key = option.get('Option_Ticker', f"{ticker}_UNKNOWN")
         try:
-            # Format filename components
-            option_ticker = row['Option_Ticker']
-            match = re.search(r'O:([A-Z]+[0-9]?)(\d{6})', option_ticker)
-            if match:
-                unique_symbol = match.group(1)
-            else:
-                unique_symbol = ticker
-                
-            expiry = str(row['Expiry']).replace('-', '')
-            strike = str(row['Strike_Price']).replace('.0', '')
-            option_type = str(row['Contract_Type'])
-            type = 'C' if option_type == 'Call' else 'P'
-
-            df = pd.read_csv(f"{DIR}/{unique_symbol}_{type}_{expiry}_{strike}.csv")
-
-            key = f"{unique_symbol}_{type}_{expiry}_{strike}"
-
-            row_dict = df.iloc[0].to_dict()
-            
-            r.hset(key, mapping=row_dict)
+            key = contract_file_stem(option, ticker)
+            # same text the old CSV round trip produced, missing values were stored as 'nan'
+            mapping = {field: 'nan' if value is None else value for field, value in option.items()}
+            pipe.hset(key, mapping=mapping)
+            queued += 1
         except Exception as e:
             logger.warning(f"Skipping contract for {key} due to an error. | Error: {e}")
-            continue
\ No newline at end of file
+            continue
+        if queued >= batch_size:
+            pipe.execute()
+            queued = 0
+    if queued:
+        pipe.execute()
+
+
+def _redis_text(value):
+    # the text redis-py stores for the value; missing values were always written as 'nan'
+    if value is None:
+        return 'nan'
+    return value if isinstance(value, str) else repr(value)
+
+
+class ContractPublisher:
+    """
+    Writes updater cycles to the per-contract Redis hashes, sending only what changed.
+
+    Keeps the fields last written for every contract (in the process that runs the
+    cycles) and HSETs just the fields whose stored text differs, plus Date/Time so
+    a hash shows when it last changed. Contracts seen for the first time, e.g. after
+    a restart, are written in full. OptionUpdater:last_cycle carries the time of the
+    latest cycle, changed or not.
+
+    The loop, /optionupdater/run and updater jobs share one publisher, so cycles
+    publish one at a time. A field counts as published once its pipeline ran, and
+    the state is dropped when the New York trading date changes.
+
+    With UPDATER_EVENTS set, each cycle also emits one change event with
+    cycle_ts and changes ({key: {field: value}} as JSON): a stream entry with those
+    two fields, or one JSON message on the pub/sub channel.
+    """
+    VOLATILE_FIELDS = ('Date', 'Time')
+
+    def __init__(self, events=UPDATER_EVENTS, events_key=UPDATER_EVENTS_KEY, stream_maxlen=UPDATER_STREAM_MAXLEN,
+                 batch_size=REDIS_BATCH_SIZE):
+        self.events = events
+        self.events_key = events_key
+        self.stream_maxlen = stream_maxlen
+        self.batch_size = batch_size
+        self._published = {}  # hash key -> {field: text}
+        self._date = None  # trading date of _published
+        self._lock = threading.Lock()
+
+    def reset(self):
+        """Forget the published state; the next cycle rewrites every contract."""
+        with self._lock:
+            self._published.clear()
+
+    @WRITE_SECONDS.time(target="redis_publish")
+    def publish(self, batches, cycle_ts):
+        """
+        Args:
+            batches (list): (ticker, ContractBatch) of the cycle
+            cycle_ts (str): Cycle timestamp
+
+        Returns:
+            dict: contracts seen, contracts written and fields written
+        """
+        with self._lock:
+            today = datetime.now(ZoneInfo("America/New_York")).date()
+            if today != self._date:
+                # yesterday's contracts are not updated again
+                self._published.clear()
+                self._date = today
+            return self._publish(batches, cycle_ts)
+
+    def _publish(self, batches, cycle_ts):
+        pipe = get_redis().pipeline(transaction=False)
+        changes = {}
+        pending = {}  # queued in pipe, recorded once it ran
+        contracts = fields = queued = 0
+        for ticker, options in batches:
+            for option in options.records():
+                try:
+                    key = contract_file_stem(option, ticker)
+                except Exception as e:
+                    logger.warning(f"Skipping contract {option.get('Option_Ticker')} due to an error. | Error: {e}")
+                    continue
+                contracts += 1
+                mapping = {field: _redis_text(value) for field, value in option.items()}
+                previous = self._published.get(key)
+                if previous is None:
+                    changed = mapping
+                else:
+                    changed = {field: text for field, text in mapping.items()
+                               if field not in self.VOLATILE_FIELDS and previous.get(field) != text}
+                    if not changed:
+                        continue
+                    changed.update((field, mapping[field]) for field in self.VOLATILE_FIELDS if field in mapping)
+                pending[key] = mapping
+                pipe.hset(key, mapping=changed)
+                changes[key] = changed
+                fields += len(changed)
+                queued += 1
+                if queued >= self.batch_size:
+                    pipe.execute()
+                    self._published.update(pending)
+                    pending.clear()
+                    queued = 0
+        pipe.set("OptionUpdater:last_cycle", cycle_ts)
+        if self.events == "stream" and changes:
+            pipe.xadd(self.events_key, {"cycle_ts": cycle_ts, "changes": _dumps(changes)},
+                      maxlen=self.stream_maxlen, approximate=True)
+        elif self.events == "pubsub" and changes:
+            pipe.publish(self.events_key, _dumps({"cycle_ts": cycle_ts, "changes": changes}))
+        pipe.execute()
+        self._published.update(pending)
+        return {"contracts": contracts, "written": len(changes), "fields": fields}
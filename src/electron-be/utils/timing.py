@@ -0,0 +1,85 @@
+import time
+
+from loguru import logger
+
+from utils import metrics
+
+
+def timed_call(func, *args):
+    """
+    Run func(*args) and measure it. Module level so functools.partial(timed_call, f)
+    can be sent to spawn workers, which flush their metrics after every task.
+
+    Returns:
+        tuple: (func result, elapsed seconds)
+    """
+    start = time.perf_counter()
+    try:
+        result = func(*args)
+    finally:
+        elapsed = time.perf_counter() - start
+        metrics.TASK_SECONDS.observe(elapsed, task=_task_name(func))
+        metrics.WORKER_BUSY.inc(elapsed)
+        metrics.WORKER_TASKS.inc()
+        metrics.flush()
+    return result, elapsed
+
+
+async def timed_call_async(func, *args):
+    """Coroutine version of timed_call."""
+    start = time.perf_counter()
+    result = await func(*args)
+    elapsed = time.perf_counter() - start
+    metrics.TASK_SECONDS.observe(elapsed, task=_task_name(func))
+    return result, elapsed
+
+
+def _task_name(func):
+    return f"{func.__module__}.{func.__name__}"
+
+
+def log_slowest(timings, total_time, top=10):
+    """
+    Log the slowest tickers of a run so we can see whether they gate the wall time.
+
+    Args:
+        timings (dict): ticker -> elapsed seconds
+        total_time (float): Wall time of the whole run in seconds
+        top (int): How many tickers to report
+    """
+    if not timings:
+        return
+    slowest = sorted(timings.items(), key=lambda item: item[1], reverse=True)[:top]
+    ordered = sorted(timings.values())
+    median = ordered[len(ordered) // 2]
+    logger.debug(f"Per-ticker time: median {median:.2f}s, max {slowest[0][1]:.2f}s "
+                 f"({slowest[0][1] / total_time:.0%} of the {total_time:.1f}s run)")
+    logger.debug("Slowest tickers: " + ", ".join(f"{t} {s:.2f}s" for t, s in slowest))
+
+
+# farmer name -> {stage: seconds} of its last run, read by bench/bench_suite.py
+LAST_STAGES = {}
+
+
+class StageClock:
+    """
+    Split a farmer run into stages: lap(stage) books the time since the previous
+    lap (and observes farmer_stage_seconds), done() logs the split and keeps it
+    in LAST_STAGES.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.stages = {}
+        self._start = self._last = time.perf_counter()
+
+    def lap(self, stage):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + now - self._last
+        metrics.STAGE_SECONDS.observe(now - self._last, farmer=self.name, stage=stage)
+        self._last = now
+
+    def done(self):
+        LAST_STAGES[self.name] = dict(self.stages)
+        metrics.RUN_SECONDS.observe(time.perf_counter() - self._start, farmer=self.name)
+        logger.debug(f"{self.name} stages: " + ", ".join(f"{s} {t:.2f}s" for s, t in self.stages.items()))
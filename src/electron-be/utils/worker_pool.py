@@ -0,0 +1,161 @@
+import importlib
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from concurrent.futures.process import BrokenProcessPool
+from multiprocessing import get_context
+
+from loguru import logger
+
+from config_chain import API_KEY, MAX_THREADS, RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST
+from utils.api_client import init_pool_worker
+from utils.rate_limiter import build_rate_limiter
+from utils.metrics import POOL_START, WORKER_PROCESSES
+
+# Imported in every worker when the pool starts, so the first job does not pay for it
+WARM_MODULES = ("OptionChainFarmer", "OptionContractsFarmer", "UpdateContractsFarmer")
+
+_POOL = None
+
+
+def _warm_up(modules):
+    for name in modules:
+        importlib.import_module(name)
+    return os.getpid()
+
+
+class WorkerPool:
+    """
+    Long-lived spawn worker processes shared by every farmer run.
+
+    Workers keep their HTTP session, rate limiter and Redis connection pool
+    (init_pool_worker) between jobs. A worker that dies breaks the executor;
+    the pool is then rebuilt and the tasks that had not finished are resubmitted once.
+    """
+
+    def __init__(self, processes=MAX_THREADS, api_key=API_KEY, warm_modules=WARM_MODULES):
+        """
+        Args:
+            processes (int): Number of worker processes
+            api_key (str): Polygon.io API key handed to init_pool_worker
+            warm_modules (tuple): Modules every worker imports at start
+        """
+        self.processes = processes
+        self.api_key = api_key
+        self.warm_modules = warm_modules
+        self.restarts = 0
+        self._ctx = get_context('spawn')
+        # one request budget for every job running on the pool
+        self.limiter = build_rate_limiter(RATE_LIMIT_PER_SEC, RATE_LIMIT_BURST, self._ctx)
+        self._executor = None
+        self._lock = threading.Lock()
+
+    def _spawn(self):
+        start = time.perf_counter()
+        executor = ProcessPoolExecutor(max_workers=self.processes, mp_context=self._ctx,
+                                       initializer=init_pool_worker, initargs=(self.api_key, self.limiter))
+        pids = set(executor.map(_warm_up, [self.warm_modules] * self.processes))
+        POOL_START.observe(time.perf_counter() - start, pool="warm")
+        WORKER_PROCESSES.set(self.processes)
+        logger.info(f"Worker pool ready, {len(pids)} warm processes")
+        return executor
+
+    def start(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = self._spawn()
+            return self._executor
+
+    def _restart(self, broken):
+        with self._lock:
+            # another job may already have replaced it
+            if self._executor is broken:
+                logger.warning("Worker process died, restarting the worker pool")
+                broken.shutdown(wait=False, cancel_futures=True)
+                self._executor = self._spawn()
+                self.restarts += 1
+
+    def imap_unordered(self, func, iterable):
+        """
+        Results of func over iterable in completion order, like Pool.imap_unordered.
+
+        Raises:
+            BrokenProcessPool: when the resubmitted tasks crash a worker again
+        """
+        pending = list(iterable)
+        for attempt in range(2):
+            executor = self.start()
+            finished = set()
+            futures = {}
+            try:
+                for i, item in enumerate(pending):
+                    futures[executor.submit(func, item)] = i
+                for future in as_completed(futures):
+                    result = future.result()
+                    finished.add(futures[future])
+                    yield result
+                return
+            except BrokenProcessPool:
+                self._restart(executor)
+                if attempt:
+                    raise
+                pending = [item for i, item in enumerate(pending) if i not in finished]
+                logger.warning(f"Resubmitting {len(pending)} tasks lost with the crashed worker")
+            finally:
+                # caller stopped early (job cancelled, error): drop what has not started yet
+                for future in futures:
+                    future.cancel()
+
+    def shutdown(self):
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True, cancel_futures=True)
+                self._executor = None
+                WORKER_PROCESSES.set(0)
+
+
+def start_pool(**kwargs):
+    """Start the process-wide warm pool (FastAPI lifespan); later farmer runs use it."""
+    global _POOL
+    if _POOL is None:
+        _POOL = WorkerPool(**kwargs)
+        _POOL.start()
+    return _POOL
+
+
+def stop_pool():
+    global _POOL
+    if _POOL is not None:
+        _POOL.shutdown()
+        _POOL = None
+
+
+def shared_limiter(rate=RATE_LIMIT_PER_SEC, burst=RATE_LIMIT_BURST, ctx=None):
+    """The warm pool's rate limiter when one runs, so every job draws from one budget; otherwise a new one."""
+    if _POOL is not None:
+        return _POOL.limiter
+    return build_rate_limiter(rate, burst, ctx)
+
+
+def run_tasks(func, args_list, processes=MAX_THREADS, limiter=None, api_key=API_KEY):
+    """
+    imap_unordered of func over args_list on the warm pool, or on a one-off spawn Pool
+    when none was started (command line runs).
+
+    Args:
+        processes (int): Size of the one-off pool
+        limiter (SharedTokenBucket): Budget of the one-off pool; the warm pool has its own
+    """
+    if _POOL is not None:
+        yield from _POOL.imap_unordered(func, args_list)
+        return
+    start = time.perf_counter()
+    with get_context('spawn').Pool(processes=processes, initializer=init_pool_worker,
+                                   initargs=(api_key, limiter)) as pool:
+        POOL_START.observe(time.perf_counter() - start, pool="oneoff")
+        WORKER_PROCESSES.set(processes)
+        try:
+            yield from pool.imap_unordered(func, args_list)
+        finally:
+            WORKER_PROCESSES.set(0)
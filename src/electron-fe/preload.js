@@ -15,19 +15,57 @@ async function textFetch(path, opts = {}) {
 }
 // expose safe, minimal API to the renderer
 contextBridge.exposeInMainWorld('api', {
-  
-  runOptionChain: () =>
-    jsonFetch('/optionchain/run', { method: 'POST' }),
 
-  runUpdater: () =>
-      jsonFetch('/optionupdater/run', {method: 'POST'}),
-  
-  previewCSV: (page = 1, pageSize = 200) =>
-    jsonFetch(`/optionchain/preview.csv?page=${page}&page_size=${pageSize}`),
-  
-  Export: () =>
-      jsonFetch(`/optioncontract/run`, {method: 'POST'})
+  startUpdater: () =>
+      jsonFetch('/optionupdater/start', {method: 'POST'}),
+
+  stopUpdater: () =>
+      jsonFetch('/optionupdater/stop', {method: 'POST'}),
+
+  // pushes every updater cycle to onMessage ({type: 'snapshot'|'cycle', ...}); returns a close function
+  watchUpdates: (onMessage, onClose) => {
+    const ws = new WebSocket(`${BASE.replace(/^http/, 'ws')}/optionupdater/ws`);
+    ws.onmessage = (e) => onMessage(JSON.parse(e.data));
+    ws.onclose = () => onClose && onClose();
+    return () => ws.close();
+  },
   
+  // view: optional {symbol, expiry_x, atm_x, sort}, comma separated values
+  previewCSV: (page = 1, pageSize = 200, view = {}) => {
+    const params = new URLSearchParams({page, page_size: pageSize});
+    Object.entries(view).forEach(([k, v]) => { if (v) params.set(k, v); });
+    return jsonFetch(`/optionchain/preview.csv?${params}`);
+  },
+
+  // background farmer runs: kind is optionchain, optioncontract or optionupdater
+  startJob: (kind) =>
+      jsonFetch(`/jobs/${kind}`, {method: 'POST'}),
+
+  jobStatus: (id) =>
+      jsonFetch(`/jobs/${id}`),
+
+  cancelJob: (id) =>
+      jsonFetch(`/jobs/${id}/cancel`, {method: 'POST'}),
+
+  jobResult: (id) =>
+      jsonFetch(`/jobs/${id}/result`),
+
+  // calls onUpdate(snapshot) on every progress event; resolves with the final snapshot
+  watchJob: (id, onUpdate) => new Promise((resolve, reject) => {
+    const source = new EventSource(`${BASE}/jobs/${id}/events`);
+    source.addEventListener('progress', (e) => onUpdate(JSON.parse(e.data)));
+    source.addEventListener('done', (e) => {
+      source.close();
+      const job = JSON.parse(e.data);
+      onUpdate(job);
+      resolve(job);
+    });
+    source.onerror = () => {
+      source.close();
+      reject(new Error('Lost the job event stream'));
+    };
+  })
+
 });
 
 contextBridge.exposeInMainWorld('folder', {
@@ -3,20 +3,35 @@ const tableWrap = document.getElementById('table-wrap');
 const pageInfo  = document.getElementById('pageInfo');
 const btnPrev   = document.getElementById('prevPage');
 const btnNext   = document.getElementById('nextPage');
-const intervalEl = document.getElementById('intervalSec');
+
+function progressText(job) {
+  const p = job.progress || {};
+  const rate = p.rate ? ` · ${p.rate.toFixed(1)} tickers/s` : '';
+  const reqs = p.requests_per_sec ? ` · ${p.requests_per_sec.toFixed(1)} req/s` : '';
+  return `${job.kind} ${job.state}: ${p.done ?? 0}/${p.total ?? '?'} tickers`
+      + ` (${p.succeeded ?? 0} ok, ${p.failed ?? 0} failed)${rate}${reqs}`;
+}
+
+// start (or join) a background job and follow its progress; returns its result
+async function runJob(kind) {
+  const started = await window.api.startJob(kind);
+  statusEl.textContent = progressText(started);
+  const job = await window.api.watchJob(started.job_id, (j) => { statusEl.textContent = progressText(j); });
+  if (job.state !== 'succeeded') {
+    throw new Error(`${kind} ${job.state}${job.error ? `: ${job.error}` : ''}`);
+  }
+  return window.api.jobResult(job.job_id);
+}
+
 document.getElementById('run').onclick = async () => {
-  running = false;
+  stopWatching();
   try {
     tableWrap.innerHTML = `<table></table>`;
     statusEl.textContent = 'Running...';
-    console.log('[DEBUG] Run button clicked');
-
-    console.log('[DEBUG] Calling runOptionChain API');
-    const res = await window.api.runOptionChain();
+    const res = await runJob('optionchain');
     console.log('[DEBUG] API response:', res);
 
     statusEl.textContent = 'Done\n' + JSON.stringify(res, null, 2);
-    console.log('[DEBUG] Status element updated');
   } catch (e) {
     statusEl.textContent = `Error: ${e.message}`;
     console.error('[DEBUG] Exception caught:', e);
@@ -24,34 +39,51 @@ document.getElementById('run').onclick = async () => {
 };
 
 let running = false;
-async function runLoop() {
-  while (running) {
-    try {
-      tableWrap.innerHTML = `<table></table>`;
-      statusEl.textContent = 'Running...';
-      console.log('[DEBUG] Run button clicked');
-
-      console.log('[DEBUG] Calling runOptionChain API');
-      const rows = await window.api.runUpdater();
-      const raw = intervalEl.value;
-      statusEl.textContent = `Rows: ${rows.length}, Wait for another ${raw}s`;
-      console.log('[DEBUG] response rows:', rows?.length ?? 0);
-      const cols = Object.keys(rows[0]);
-      const thead = `<thead><tr>${cols.map(c => `<th>${c}</th>`).join('')}</tr></thead>`;
-      console.log(thead);
-      const tbody = `<tbody>${
-          rows.map(r => `<tr>${cols.map(c => `<td>${r[c] ?? ''}</td>`).join('')}</tr>`).join('')
-      }</tbody>`;
-      tableWrap.innerHTML = `<table>${thead}${tbody}</table>`;
-    } catch (e) {
-      statusEl.textContent = `Error: ${e.message}`;
-      console.error('[DEBUG] Exception caught:', e);
-    }
+let closeUpdates = null;
+const UPDATER_ROWS = 200;
+const liveRows = new Map();  // Option_Ticker -> row of the last pushed cycle
+
+function renderLive(cycleTs) {
+  const rows = Array.from(liveRows.values()).slice(0, UPDATER_ROWS);
+  statusEl.textContent = `Rows: ${liveRows.size}, cycle ${cycleTs ?? '-'}`;
+  if (!rows.length) {
+    tableWrap.innerHTML = '<div class="muted">Waiting for the first cycle…</div>';
+    return;
+  }
+  const cols = Object.keys(rows[0]);
+  const thead = `<thead><tr>${cols.map(c => `<th>${c}</th>`).join('')}</tr></thead>`;
+  const tbody = `<tbody>${
+      rows.map(r => `<tr>${cols.map(c => `<td>${r[c] ?? ''}</td>`).join('')}</tr>`).join('')
+  }</tbody>`;
+  tableWrap.innerHTML = `<table>${thead}${tbody}</table>`;
+}
+
+function applyUpdate(msg) {
+  if (msg.type === 'snapshot') {
+    liveRows.clear();
+    msg.rows.forEach(r => liveRows.set(r.Option_Ticker, r));
+  } else {
+    msg.changed.forEach(r => liveRows.set(r.Option_Ticker, r));
+    msg.removed.forEach(t => liveRows.delete(t));
+  }
+  console.log('[DEBUG] cycle', msg.cycle_ts, msg.type, msg.changed?.length ?? msg.rows.length);
+  renderLive(msg.cycle_ts);
+}
+
+// stop repainting the table from the updater; the backend loop keeps running
+function stopWatching() {
+  running = false;
+  if (closeUpdates) closeUpdates();
+}
+
+function watchUpdates() {
+  closeUpdates = window.api.watchUpdates(applyUpdate, () => {
+    closeUpdates = null;
     if (running) {
-      const sec = Math.max(5, Number(intervalEl.value) || 60);
-      await new Promise(r => setTimeout(r, sec * 1000));
+      // backend restarted or the socket dropped: reconnect, the snapshot resyncs the table
+      setTimeout(() => { if (running && !closeUpdates) watchUpdates(); }, 2000);
     }
-  }
+  });
 }
 
 
@@ -62,20 +94,36 @@ document.getElementById('updater').onclick = async () => {
     return;
   }
   running = true;
-  statusEl.textContent = 'Started updater loop';
-  runLoop();
+  try {
+    await window.api.startUpdater();
+    statusEl.textContent = 'Started updater loop';
+    tableWrap.innerHTML = `<table></table>`;
+    watchUpdates();
+  } catch (e) {
+    running = false;
+    statusEl.textContent = `Error: ${e.message}`;
+  }
 };
 
-document.getElementById('stop').onclick = () => {
-  running = false;
-  statusEl.textContent = 'Stopped';
+document.getElementById('stop').onclick = async () => {
+  stopWatching();
+  try {
+    await window.api.stopUpdater();
+    statusEl.textContent = 'Stopped';
+  } catch (e) {
+    statusEl.textContent = `Error: ${e.message}`;
+  }
 };
 
 document.getElementById('export').onclick = async () => {
-  running = false;
+  stopWatching();
   statusEl.textContent = 'Farming contract…';
-  const data = await window.api.Export();
-  statusEl.textContent = "Done, all csv saved in Option Ticker folder";
+  try {
+    await runJob('optioncontract');
+    statusEl.textContent = "Done, contracts saved in Option Ticker folder";
+  } catch (e) {
+    statusEl.textContent = `Error: ${e.message}`;
+  }
 };
 
 